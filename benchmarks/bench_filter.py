@@ -0,0 +1,82 @@
+"""Microbenchmark for the skip rules: paths classified per second.
+
+Compares the module-level ``should_skip`` helper (which has to stat every
+path to find out whether it is a directory) with a prebuilt ``FileFilter``
+that is given the is-directory hint, as ``os.walk`` and ``os.scandir`` do.
+
+Usage:
+    python benchmarks/bench_filter.py [--count N] [--repeat R]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codedump.codedump import FileFilter, should_skip
+
+SAMPLE_NAMES = [
+    'main.py', 'module.pyi', 'index.ts', 'App.tsx', 'style.css', 'README', 'LICENSE',
+    'Makefile', '.gitignore', '.bashrc', 'server.log', 'server.log.3', 'log.txt',
+    'notes.bak', 'draft.tmp', 'file.swp', 'backup~', 'image.png', 'archive.tar.gz',
+    'lib.so', 'data.json', 'config.yaml', 'Cargo.toml', 'go.mod', 'main.rs',
+]
+SAMPLE_DIRS = ['src', 'lib', 'node_modules', '__pycache__', '.git', 'build', 'pkg.egg-info', 'docs']
+
+
+def make_entries(count, seed=0):
+    """Build a deterministic list of (name, is_dir) pairs."""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            entries.append((rng.choice(SAMPLE_DIRS), True))
+        else:
+            entries.append((rng.choice(SAMPLE_NAMES), False))
+    return entries
+
+
+def best_rate(func, entries, repeat):
+    """Return the best paths/sec over ``repeat`` runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(entries)
+        best = min(best, time.perf_counter() - start)
+    return len(entries) / best if best else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark codedump skip rules.')
+    parser.add_argument('--count', type=int, default=200000, help='Number of paths to classify')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs (best is reported)')
+    args = parser.parse_args()
+
+    entries = make_entries(args.count)
+    file_filter = FileFilter()
+
+    def run_helper(entries):
+        for name, _ in entries:
+            should_skip(name)
+
+    def run_filter(entries):
+        skip_directory = file_filter.skip_directory
+        skip_file = file_filter.skip_file
+        for name, is_dir in entries:
+            if is_dir:
+                skip_directory(name)
+            else:
+                skip_file(name)
+
+    helper_rate = best_rate(run_helper, entries, args.repeat)
+    filter_rate = best_rate(run_filter, entries, args.repeat)
+
+    print(f"should_skip(path)            : {helper_rate:>12,.0f} paths/sec")
+    print(f"FileFilter with is_dir hint  : {filter_rate:>12,.0f} paths/sec")
+    print(f"Speedup                      : {filter_rate / helper_rate:>12.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark the ignore-file aware traversal on a synthetic tree.
+
+Builds a deterministic tree (100k+ files by default) with nested
+``.gitignore``/``.codedumpignore`` files and generated directories, then
+times ``walk_files`` with and without ignore files.
+
+Usage:
+    python benchmarks/bench_ignore.py [--files N] [--keep DIR]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codedump.codedump import walk_files
+
+EXTENSIONS = ['.py', '.js', '.ts', '.md', '.json', '.gen.py', '.min.js', '.log']
+
+
+def build_tree(root, files, seed=0, fanout=8, per_dir=40):
+    """Create ``files`` empty files under ``root`` with nested ignore files."""
+    rng = random.Random(seed)
+    created = 0
+    dirs = [root]
+    index = 0
+    while created < files:
+        parent = dirs[index % len(dirs)]
+        index += 1
+        for d in range(fanout):
+            if created >= files:
+                break
+            name = 'generated' if rng.random() < 0.1 else f'pkg{d}'
+            path = os.path.join(parent, name)
+            if os.path.isdir(path):
+                continue
+            os.makedirs(path)
+            dirs.append(path)
+            if rng.random() < 0.3:
+                with open(os.path.join(path, rng.choice(['.gitignore', '.codedumpignore'])), 'w') as f:
+                    f.write('*.gen.py\n*.min.js\n/generated/\n!keep.gen.py\n')
+            for i in range(min(per_dir, files - created)):
+                open(os.path.join(path, f'f{i}{rng.choice(EXTENSIONS)}'), 'w').close()
+                created += 1
+    with open(os.path.join(root, '.gitignore'), 'w') as f:
+        f.write('generated/\n**/*.log\n')
+    return created
+
+
+def time_walk(root, use_ignore_files):
+    start = time.perf_counter()
+    count = sum(1 for _ in walk_files(root, use_ignore_files=use_ignore_files))
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ignore-file aware traversal.')
+    parser.add_argument('--files', type=int, default=100000, help='Number of files to generate')
+    parser.add_argument('--keep', metavar='DIR', help='Generate into DIR and keep it (reused if it exists)')
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp(prefix='codedump-bench-')
+    try:
+        if not args.keep or not os.listdir(root):
+            start = time.perf_counter()
+            created = build_tree(root, args.files)
+            print(f"Generated {created} files in {time.perf_counter() - start:.1f}s")
+
+        for use_ignore_files in (False, True):
+            count, elapsed = time_walk(root, use_ignore_files)
+            label = 'with ignore files' if use_ignore_files else 'without ignore files'
+            print(f"walk_files {label:<22}: {count:>8} files kept in {elapsed:.2f}s")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Compare the memory-mapped read path with the regular one on large files.
+
+Generates a directory of large UTF-8 text files (JSON, SQL and lockfile-like
+content), then dumps it to a file in a fresh child process once per read
+path and reports wall time, throughput and the child's peak RSS.
+
+Usage:
+    python benchmarks/bench_mmap.py [--files N] [--size MB]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child: dump DIRECTORY to OUTPUT with the given mmap threshold (or
+# None), then print the child's own peak RSS in MB
+CHILD = """
+import resource
+import sys
+sys.path.insert(0, {root!r})
+from codedump.codedump import write_dump
+with open({output!r}, 'w', encoding='utf-8') as out:
+    write_dump(out, {directory!r}, mmap_threshold={threshold!r})
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in bytes on macOS and in KB elsewhere
+print(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024)
+"""
+
+
+def build_corpus(root, files, size_mb, seed=0):
+    """Create ``files`` text files of about ``size_mb`` MB each; return the total bytes."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    kinds = ['.json', '.sql', '.lock']
+    for index in range(files):
+        kind = kinds[index % len(kinds)]
+        path = os.path.join(root, f'data{index}{kind}')
+        with open(path, 'w', encoding='utf-8') as f:
+            written = 0
+            while written < target:
+                if kind == '.json':
+                    line = json.dumps({'id': rng.randrange(10 ** 9), 'name': f'item-{rng.random():.12f}', 'tags': ['a', 'b', 'ü']}) + ',\n'
+                elif kind == '.sql':
+                    line = f"INSERT INTO t VALUES ({rng.randrange(10 ** 9)}, 'value {rng.random():.12f}');\n"
+                else:
+                    line = f'package-{rng.randrange(10 ** 6)}@^{rng.randrange(10)}.{rng.randrange(100)}.0:\n  resolved "x"\n'
+                f.write(line)
+                written += len(line.encode('utf-8'))
+    return sum(os.path.getsize(os.path.join(root, name)) for name in os.listdir(root))
+
+
+def run_child(directory, output, threshold):
+    """Dump in a child process; return (elapsed seconds, peak RSS in MB)."""
+    code = CHILD.format(root=ROOT, output=output, directory=directory, threshold=threshold)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, float(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the memory-mapped read path.')
+    parser.add_argument('--files', type=int, default=6, help='Number of large files to generate')
+    parser.add_argument('--size', type=int, default=32, help='Size of each file in MB')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='codedump-bench-')
+    try:
+        corpus = os.path.join(root, 'corpus')
+        os.makedirs(corpus)
+        total = build_corpus(corpus, args.files, args.size)
+        megabytes = total / (1024 * 1024)
+        print(f"Corpus: {args.files} files, {megabytes:.0f} MB")
+
+        # Each path runs in its own child, which reports its own peak RSS
+        output = os.path.join(root, 'dump.txt')
+        for label, threshold in (('mmap', 1), ('regular', None)):
+            elapsed, peak = run_child(corpus, output, threshold)
+            print(f"{label:<8}: {elapsed:.2f}s ({megabytes / elapsed:.0f} MB/s), peak RSS {peak:.0f} MB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
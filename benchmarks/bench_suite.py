@@ -0,0 +1,287 @@
+"""Benchmark suite over synthetic trees, with a JSON report to compare runs.
+
+Generates (or reuses) a deterministic tree per scale with
+``benchmarks/synthetic.py``, then times each stage of a dump in its own
+child process, so every result carries the peak RSS of that stage alone:
+
+- should_skip: the skip rules over every entry of the tree (with the
+  is-directory hint, as the walk gives it)
+- traversal: ``concatenate_files(list_only=True)``, i.e. the walk with
+  skip rules and ignore files
+- read: ``read_file`` on every file the walk keeps
+- write: ``write_dump`` of the whole tree to a file, as ``codedump -o`` does
+- gui_add, gui_toggle, gui_checked: the GUI's ``SelectionModel`` without a
+  display (adding every scanned entry, toggling every folder, enumerating
+  the checked files)
+
+Each result has the best and median wall time over the runs, files (or
+entries) per second, MB per second where bytes are involved, and the peak
+RSS in MB. With --compare, the best times are compared with a previous
+report.
+
+Usage:
+    python benchmarks/bench_suite.py [--scale 1k] [--scale 100k] [--scale 1m] [-o report.json]
+                                     [--compare previous.json] [--only NAME] [--repeat N] [--jobs N]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import SCALES, generate_tree
+
+BENCHMARKS = ('should_skip', 'traversal', 'read', 'write', 'gui_add', 'gui_toggle', 'gui_checked')
+
+# Version of the report layout
+REPORT_VERSION = 1
+
+
+def peak_rss_mb():
+    """Return the peak RSS of this process in MB, or None where it cannot be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def time_runs(func, repeat):
+    """Call ``func`` ``repeat`` times; return (elapsed seconds of each run, last result)."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def bench_should_skip(directory, repeat, jobs):
+    from codedump.codedump import DEFAULT_FILTER
+
+    # Every entry of the tree, including the ones inside skipped directories
+    entries = []
+    for root, dirs, files in os.walk(directory):
+        entries.extend((os.path.join(root, name), True) for name in dirs)
+        entries.extend((os.path.join(root, name), False) for name in files)
+
+    def run():
+        should_skip = DEFAULT_FILTER.should_skip
+        return sum(1 for path, is_dir in entries if should_skip(path, is_dir))
+
+    runs, skipped = time_runs(run, repeat)
+    return {'items': len(entries), 'bytes': None, 'runs': runs, 'skipped': skipped}
+
+
+def bench_traversal(directory, repeat, jobs):
+    from codedump.codedump import concatenate_files
+
+    runs, listing = time_runs(lambda: concatenate_files(directory, list_only=True), repeat)
+    return {'items': listing.count('\n') + 1 if listing else 0, 'bytes': None, 'runs': runs}
+
+
+def bench_read(directory, repeat, jobs):
+    from codedump.codedump import map_ordered, read_file, walk_files
+
+    paths = list(walk_files(directory))
+    total = sum(os.path.getsize(path) for path in paths)
+
+    def run():
+        results = map_ordered(read_file, paths, jobs) if jobs > 1 else map(read_file, paths)
+        return sum(1 for _, content in results if content is None)
+
+    runs, binary = time_runs(run, repeat)
+    return {'items': len(paths), 'bytes': total, 'runs': runs, 'binary': binary}
+
+
+def bench_write(directory, repeat, jobs):
+    from codedump.codedump import write_dump
+    from codedump.mapped import MMAP_THRESHOLD
+
+    with tempfile.TemporaryDirectory(prefix='codedump-bench-') as tmp:
+        output = os.path.join(tmp, 'dump.txt')
+
+        def run():
+            with open(output, 'w', encoding='utf-8', errors='surrogateescape') as out:
+                count = write_dump(out, directory, jobs=jobs, mmap_threshold=MMAP_THRESHOLD)
+                out.write('\n')
+            return count
+
+        runs, count = time_runs(run, repeat)
+        return {'items': count, 'bytes': os.path.getsize(output), 'runs': runs}
+
+
+def scan_entries(directory):
+    """Scan the whole tree as the GUI does; return its (kind, parent, path, name) entries."""
+    from codedump.codedump import DEFAULT_FILTER
+    from codedump.ignore import IgnoreMatcher
+    from codedump.tree_model import iter_tree_entries
+
+    return [entry for entry in iter_tree_entries(directory, DEFAULT_FILTER, IgnoreMatcher(directory))
+            if entry[0] != 'error']
+
+
+def build_model(directory, entries):
+    from codedump.tree_model import SelectionModel
+
+    model = SelectionModel(directory)
+    for kind, parent, path, _ in entries:
+        model.add(parent, path, kind == 'folder')
+    return model
+
+
+def bench_gui_add(directory, repeat, jobs):
+    entries = scan_entries(directory)
+    runs, _ = time_runs(lambda: build_model(directory, entries), repeat)
+    return {'items': len(entries), 'bytes': None, 'runs': runs}
+
+
+def bench_gui_toggle(directory, repeat, jobs):
+    entries = scan_entries(directory)
+    model = build_model(directory, entries)
+    folders = [path for kind, _, path, _ in entries if kind == 'folder']
+
+    def run():
+        # Check every folder top-down, then uncheck every other one bottom-up
+        for path in folders:
+            model.set_checked(path, True)
+        for path in reversed(folders[::2]):
+            model.set_checked(path, False)
+        return model.checked_count()
+
+    runs, checked = time_runs(run, repeat)
+    return {'items': len(folders) + len(folders[::2]), 'bytes': None, 'runs': runs, 'checked': checked}
+
+
+def bench_gui_checked(directory, repeat, jobs):
+    entries = scan_entries(directory)
+    model = build_model(directory, entries)
+    model.set_checked(directory, True)
+    # Leave a tenth of the folders unchecked so some subtrees are pruned
+    for path in [path for kind, _, path, _ in entries if kind == 'folder'][::10]:
+        model.set_checked(path, False)
+
+    runs, count = time_runs(lambda: sum(1 for _, is_dir in model.iter_checked() if not is_dir), repeat)
+    return {'items': len(entries), 'bytes': None, 'runs': runs, 'checked_files': count}
+
+
+def run_child(name, directory, repeat, jobs):
+    """Run one benchmark in a fresh child process and return its result dict."""
+    command = [sys.executable, os.path.abspath(__file__), '--child', name, '--directory', directory,
+               '--repeat', str(repeat), '--jobs', str(jobs)]
+    result = subprocess.run(command, stdout=subprocess.PIPE, check=True, cwd=ROOT)
+    return json.loads(result.stdout)
+
+
+def child_main(name, directory, repeat, jobs):
+    """Entry point of the child: run benchmark ``name`` and print its result as JSON."""
+    result = globals()[f'bench_{name}'](directory, repeat, jobs)
+    runs = result['runs']
+    best = min(runs)
+    result.update(
+        best_seconds=best,
+        median_seconds=statistics.median(runs),
+        files_per_sec=result['items'] / best if best else None,
+        mb_per_sec=result['bytes'] / (1024 * 1024) / best if best and result['bytes'] is not None else None,
+        peak_rss_mb=peak_rss_mb(),
+    )
+    json.dump(result, sys.stdout)
+
+
+def git_revision():
+    """Return the commit the suite runs against, or None outside a git checkout."""
+    try:
+        result = subprocess.run(['git', '-C', ROOT, 'rev-parse', '--short', 'HEAD'],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    return result.stdout.decode().strip() or None
+
+
+def format_result(result):
+    rate = f"{result['files_per_sec']:>12,.0f} items/s"
+    throughput = f"{result['mb_per_sec']:>8.1f} MB/s" if result['mb_per_sec'] is not None else ' ' * 13
+    rss = f"{result['peak_rss_mb']:>7.0f} MB RSS" if result['peak_rss_mb'] is not None else ''
+    return (f"{result['scale']:>5} {result['name']:<12} {result['best_seconds']:>9.3f}s {rate} "
+            f"{throughput} {rss}")
+
+
+def compare(results, baseline):
+    """Print the change in best time of every result also found in ``baseline``."""
+    previous = {(result['scale'], result['name']): result for result in baseline['results']}
+    print(f"Compared with {baseline.get('revision') or 'baseline'} ({baseline.get('created')}):")
+    for result in results:
+        old = previous.get((result['scale'], result['name']))
+        if old is None:
+            continue
+        change = (result['best_seconds'] - old['best_seconds']) / old['best_seconds'] * 100
+        print(f"{result['scale']:>5} {result['name']:<12} {old['best_seconds']:>9.3f}s -> "
+              f"{result['best_seconds']:>9.3f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the codedump benchmark suite on synthetic trees.')
+    parser.add_argument('--scale', action='append', choices=SCALES,
+                        help='Tree size to run (repeatable; default: 1k)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'codedump-bench'),
+                        help='Where the synthetic trees are generated and kept (default: %(default)s)')
+    parser.add_argument('--only', action='append', choices=BENCHMARKS, help='Run only this benchmark (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark; the best is reported')
+    parser.add_argument('--jobs', type=int, default=1, help='Reader threads for the read and write benchmarks')
+    parser.add_argument('-o', '--output', metavar='FILE', help='Write the JSON report to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with a previous JSON report')
+    parser.add_argument('--child', choices=BENCHMARKS, help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args.child, args.directory, args.repeat, args.jobs)
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = []
+    trees = {}
+    for scale in args.scale or ['1k']:
+        directory = os.path.join(args.data_dir, scale)
+        print(f"Preparing {scale} tree in {directory}...", file=sys.stderr)
+        trees[scale] = generate_tree(directory, SCALES[scale])
+        for name in args.only or BENCHMARKS:
+            result = dict(run_child(name, directory, args.repeat, args.jobs), name=name, scale=scale)
+            results.append(result)
+            print(format_result(result))
+
+    report = {
+        'version': REPORT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'jobs': args.jobs,
+        'trees': trees,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f"Report written to '{args.output}'.", file=sys.stderr)
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the token estimators on a corpus of source files.
+
+Reads every file ``walk_files`` keeps under DIR (the Python standard library
+by default), then times each available estimator over the whole corpus. When
+``tiktoken`` is installed, the error of the byte heuristic against it is
+reported too.
+
+Usage:
+    python benchmarks/bench_tokens.py [DIR] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codedump.codedump import walk_files
+from codedump.tokens import ESTIMATORS, get_estimator
+
+
+def load_corpus(directory):
+    texts = []
+    for file_path in walk_files(directory):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                texts.append(f.read())
+        except (OSError, UnicodeDecodeError):
+            continue
+    return texts
+
+
+def time_estimator(estimator, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = [estimator.count(text) for text in texts]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return counts, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the token estimators.')
+    parser.add_argument('directory', nargs='?', default=os.path.dirname(os.__file__),
+                        help='Corpus directory (default: the Python standard library)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per estimator; the best is reported')
+    args = parser.parse_args()
+
+    texts = load_corpus(args.directory)
+    megabytes = sum(len(text.encode('utf-8', 'surrogateescape')) for text in texts) / (1024 * 1024)
+    print(f"Corpus: {len(texts)} files, {megabytes:.1f} MB")
+
+    results = {}
+    for name in ESTIMATORS:
+        try:
+            estimator = get_estimator(name)
+        except ImportError:
+            print(f"{name:<10}: not installed")
+            continue
+        counts, elapsed = time_estimator(estimator, texts, args.repeat)
+        results[name] = counts
+        print(f"{name:<10}: {sum(counts):>12} tokens in {elapsed:.2f}s ({megabytes / elapsed:.1f} MB/s)")
+
+    if 'tiktoken' in results:
+        exact = sum(results['tiktoken'])
+        estimate = sum(results['bytes'])
+        print(f"byte heuristic error vs tiktoken: {100.0 * (estimate - exact) / exact:+.1f}% over the corpus")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Deterministic generator of synthetic source trees for the benchmarks.
+
+The same scale and seed always produce the same tree, byte for byte and
+with the same modification times, so timings and dump sizes can be compared
+across runs and machines. Trees mix:
+
+- code, config and documentation files that are dumped (about 80%),
+  mostly small, with a long tail of larger ones, a few latin-1 and CRLF files
+- files skipped by name (logs, backups, swap files) or detected as binary
+- directories skipped by name (node_modules, __pycache__, build, .git, ...)
+- paths excluded by the root ``.gitignore`` and nested ``.codedumpignore`` files
+
+Directory depth varies from 1 to MAX_DEPTH levels. A small marker file at the
+root records what was generated, so an existing tree is reused as is.
+
+Usage:
+    python benchmarks/synthetic.py DIR [--scale 1k|100k|1m] [--files N] [--seed S]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+
+# Number of files for each named scale
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+# Bump when the layout changes, so existing trees are regenerated
+GENERATOR_VERSION = 1
+
+# Marker written at the root; its name starts with '.', so it is never dumped
+SPEC_FILE = '.codedump-bench.json'
+
+# Files per directory on average, and the deepest directory level
+FILES_PER_DIR = 20
+MAX_DEPTH = 8
+
+# Fixed modification time of every file (2024-01-01 00:00:00 UTC), plus the file index in seconds
+BASE_MTIME = 1704067200
+
+DUMPED_EXTENSIONS = ['.py', '.py', '.py', '.js', '.ts', '.tsx', '.go', '.rs', '.c', '.h', '.java',
+                     '.md', '.json', '.yaml', '.toml', '.sql', '.sh']
+SKIPPED_SUFFIXES = ['.log', '.log.1', '.bak', '.tmp', '.swp', '~']
+BINARY_EXTENSIONS = ['.png', '.so', '.o']
+SKIPPED_DIRECTORIES = ['node_modules', '__pycache__', 'build', 'dist', '.git', 'venv', 'target']
+
+WORDS = ['alpha', 'beta', 'cache', 'client', 'config', 'core', 'data', 'engine', 'event', 'handler',
+         'index', 'io', 'model', 'net', 'parser', 'plugin', 'query', 'render', 'server', 'store',
+         'stream', 'task', 'util', 'view', 'worker']
+
+# Root .gitignore; nested .codedumpignore files add 'fixtures/'
+GITIGNORE = 'generated/\n*.gen.py\n*.min.js\n'
+NESTED_IGNORE = 'fixtures/\n'
+
+
+def size_for(rng):
+    """Pick a file size: mostly small files with a long tail (about 4 KB on average)."""
+    bucket = rng.random()
+    if bucket < 0.75:
+        return rng.randint(100, 1500)
+    if bucket < 0.97:
+        return rng.randint(1500, 8 * 1024)
+    if bucket < 0.999:
+        return rng.randint(8 * 1024, 64 * 1024)
+    return rng.randint(64 * 1024, 512 * 1024)
+
+
+def build_text(rng, size=4 * 1024 * 1024):
+    """Build a block of code-like ASCII lines that file contents are sliced from."""
+    lines = []
+    total = 0
+    while total < size:
+        word = rng.choice(WORDS)
+        kind = rng.random()
+        if kind < 0.3:
+            line = f"def {word}_{rng.randrange(1000)}(self, {rng.choice(WORDS)}, {rng.choice(WORDS)}=None):"
+        elif kind < 0.6:
+            line = f"    {word} = {rng.choice(WORDS)}.{rng.choice(WORDS)}({rng.randrange(10 ** 6)})"
+        elif kind < 0.8:
+            line = f"    # {' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))}"
+        elif kind < 0.9:
+            line = f"    return {{'{word}': {rng.random():.6f}, 'id': {rng.randrange(10 ** 9)}}}"
+        else:
+            line = ''
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines).encode('ascii') + b'\n'
+
+
+def make_directories(rng, count):
+    """Return ``count`` relative directory paths (the root is ''), parents first."""
+    dirs = ['']
+    children = {'': set()}
+    depth = {'': 0}
+    while len(dirs) < count:
+        parent = rng.choice(dirs)
+        if depth[parent] >= MAX_DEPTH:
+            continue
+        roll = rng.random()
+        if roll < 0.04:
+            name = rng.choice(SKIPPED_DIRECTORIES)
+        elif roll < 0.06:
+            name = rng.choice(['generated', 'fixtures'])
+        else:
+            name = f"{rng.choice(WORDS)}{len(dirs)}"
+        if name in children[parent]:
+            continue
+        children[parent].add(name)
+        path = f"{parent}/{name}" if parent else name
+        dirs.append(path)
+        children[path] = set()
+        depth[path] = depth[parent] + 1
+    return dirs
+
+
+def file_name(rng, index):
+    """Pick the name of the ``index``-th file: dumped, skipped by name, binary or ignored."""
+    stem = f"{rng.choice(WORDS)}_{index}"
+    roll = rng.random()
+    if roll < 0.84:
+        return stem + rng.choice(DUMPED_EXTENSIONS), 'text'
+    if roll < 0.92:
+        return stem + rng.choice(SKIPPED_SUFFIXES), 'text'
+    if roll < 0.95:
+        return stem + rng.choice(BINARY_EXTENSIONS), 'binary'
+    return stem + rng.choice(['.gen.py', '.min.js']), 'text'
+
+
+def file_content(rng, text, kind, size):
+    """Slice ``size`` bytes of content; a few files are latin-1 or use CRLF line endings."""
+    if kind == 'binary':
+        count = min(size, 4096)
+        return b'\x89PNG\r\n\x1a\n\0\0\0' + rng.getrandbits(count * 8).to_bytes(count, 'little')
+    start = rng.randrange(len(text) - size) if size < len(text) else 0
+    data = text[start:start + size]
+    roll = rng.random()
+    if roll < 0.01:
+        data = b'# caf\xe9 na\xefve\n' + data
+    elif roll < 0.03:
+        data = data.replace(b'\n', b'\r\n')
+    return data
+
+
+def read_spec(root):
+    """Return the spec recorded in an existing tree, or None."""
+    try:
+        with open(os.path.join(root, SPEC_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def generate_tree(root, files, seed=0, log=sys.stderr):
+    """Create a synthetic tree of ``files`` files under ``root`` (reused if already generated).
+
+    Returns:
+        dict: The spec of the tree ('files', 'seed', 'version', 'dirs', 'bytes')
+
+    Raises:
+        ValueError: If ``root`` exists, is not empty and was not made by this generator
+    """
+    wanted = {'files': files, 'seed': seed, 'version': GENERATOR_VERSION}
+    spec = read_spec(root)
+    if spec is not None and all(spec.get(key) == value for key, value in wanted.items()):
+        return spec
+    if os.path.isdir(root) and os.listdir(root):
+        if spec is None:
+            raise ValueError(f"'{root}' is not empty and was not made by this generator")
+        shutil.rmtree(root)
+
+    rng = random.Random(seed)
+    text = build_text(rng)
+    dirs = make_directories(rng, max(1, files // FILES_PER_DIR))
+    for rel_dir in dirs:
+        os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+    with open(os.path.join(root, '.gitignore'), 'w', encoding='utf-8') as f:
+        f.write(GITIGNORE)
+    for rel_dir in dirs[1::50]:
+        with open(os.path.join(root, rel_dir, '.codedumpignore'), 'w', encoding='utf-8') as f:
+            f.write(NESTED_IGNORE)
+
+    total = 0
+    start = time.monotonic()
+    for index in range(files):
+        name, kind = file_name(rng, index)
+        path = os.path.join(root, rng.choice(dirs), name)
+        data = file_content(rng, text, kind, size_for(rng))
+        with open(path, 'wb') as f:
+            f.write(data)
+        os.utime(path, (BASE_MTIME + index, BASE_MTIME + index))
+        total += len(data)
+        if files >= 100000 and (index + 1) % (files // 10) == 0:
+            print(f"  {index + 1} files written ({time.monotonic() - start:.0f}s)", file=log)
+
+    spec = dict(wanted, dirs=len(dirs), bytes=total)
+    with open(os.path.join(root, SPEC_FILE), 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic source tree.')
+    parser.add_argument('directory', help='Directory to create the tree in (must be empty or a previous tree)')
+    parser.add_argument('--scale', choices=SCALES, default='1k', help='Number of files (default: %(default)s)')
+    parser.add_argument('--files', type=int, help='Exact number of files (overrides --scale)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: %(default)s)')
+    args = parser.parse_args()
+
+    files = args.files if args.files is not None else SCALES[args.scale]
+    try:
+        spec = generate_tree(args.directory, files, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{args.directory}: {spec['files']} files in {spec['dirs']} directories, "
+          f"{spec['bytes'] / (1024 * 1024):.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
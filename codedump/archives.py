@@ -0,0 +1,90 @@
+import collections
+import os
+import posixpath
+import tarfile
+import time
+import zipfile
+
+# Stand-in for the ``os.stat`` result of an archive member, with the fields
+# ``get_file_info`` uses
+MemberStat = collections.namedtuple('MemberStat', 'st_size st_mtime st_mtime_ns')
+
+# Largest read used to skip forward in a streamed member
+SKIP_CHUNK = 1024 * 1024
+
+class StreamedMember:
+    """Binary file object for a member of a streamed tar archive, or of a zip archive.
+
+    The underlying stream cannot seek (zip members only can from Python
+    3.7), so seeking forward reads and discards data instead; seeking
+    backwards is not supported.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._position = 0
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self._position += len(data)
+        return data
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset):
+        if offset < self._position:
+            raise OSError('cannot seek backwards in a streamed archive member')
+        while self._position < offset:
+            if not self.read(min(offset - self._position, SKIP_CHUNK)):
+                break
+        return self._position
+
+def is_archive(path):
+    """Check whether ``path`` is a zip or tar archive (tar may be gzip, bzip2 or xz compressed)."""
+    if not os.path.isfile(path):
+        return False
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+def _member_name(name):
+    """Normalize a member name to a relative '/'-separated path ('./a/b' -> 'a/b')."""
+    return posixpath.normpath(name.lstrip('/'))
+
+def skip_member(name, file_filter):
+    """Check a '/'-separated member name against ``file_filter`` (its directories and base name)."""
+    parts = name.split('/')
+    return any(file_filter.skip_directory(part) for part in parts[:-1]) or file_filter.skip_file(parts[-1])
+
+def iter_members(archive, file_filter):
+    """Yield ``(name, stats, file)`` for the regular files of an archive that pass ``file_filter``.
+
+    Members are filtered by their names alone (the directories in a name
+    with ``skip_directory``, the base name with ``skip_file``) and yielded in
+    archive order. Nothing is extracted to disk: ``file`` is a binary file
+    object reading the member's data, valid until the next member is
+    requested. Tar archives are read as a stream, so compressed tarballs are
+    decompressed once from start to end; ``file`` can only seek forward, for
+    zip members too.
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                name = _member_name(info.filename)
+                if info.is_dir() or skip_member(name, file_filter):
+                    continue
+                # Zip timestamps are local time with a two-second resolution
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                with zf.open(info) as f:
+                    yield name, MemberStat(info.file_size, mtime, int(mtime) * 10 ** 9), StreamedMember(f)
+        return
+
+    with tarfile.open(archive, 'r|*') as tf:
+        for info in tf:
+            name = _member_name(info.name)
+            if not info.isfile() or skip_member(name, file_filter):
+                continue
+            f = StreamedMember(tf.extractfile(info))
+            yield name, MemberStat(info.size, info.mtime, int(info.mtime) * 10 ** 9), f
@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Default upper bound on the decoded content kept in the cache
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Files modified this recently are not cached: a same-size rewrite within the
+# filesystem's timestamp granularity would otherwise go unnoticed
+RACY_WINDOW_NS = 2 * 10**9
+
+# Pending writes are committed in batches of this size
+COMMIT_INTERVAL = 256
+
+def is_racy(mtime_ns):
+    """Check whether a modification time is too recent to trust (within RACY_WINDOW_NS of now)."""
+    return int(time.time() * 1e9) - mtime_ns < RACY_WINDOW_NS
+
+def default_cache_dir():
+    """Return the per-user cache directory (honours XDG_CACHE_HOME)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'codedump')
+
+class ContentCache:
+    """Persistent cache of decoded file contents and ``get_file_info`` metadata.
+
+    Entries live in a SQLite database inside ``cache_dir`` and are keyed by
+    absolute path. An entry is only served while the file's size and
+    ``st_mtime_ns`` still match. When the stored content grows beyond
+    ``max_bytes``, the least recently used entries are evicted.
+
+    The cache is safe to share between the reader threads used by ``--jobs``.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, 'cache.sqlite3'), check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            ' path TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL,'
+            ' last_modified TEXT NOT NULL,'
+            ' content TEXT NOT NULL,'
+            ' nbytes INTEGER NOT NULL,'
+            ' last_used INTEGER NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)')
+        row = self._conn.execute('SELECT COALESCE(SUM(nbytes), 0), COALESCE(MAX(last_used), 0) FROM files').fetchone()
+        self._total_bytes, self._clock = row
+
+        # A smaller limit than the previous run applies immediately
+        self._evict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= COMMIT_INTERVAL:
+            self._conn.commit()
+            self._pending = 0
+
+    def get(self, file_path, stats):
+        """Return ``(file_info, content)`` if the cached entry is still valid, else None.
+
+        Args:
+            file_path: Path of the file
+            stats: Fresh ``os.stat`` result for the file
+        """
+        key = os.path.abspath(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT size, mtime_ns, last_modified, content FROM files WHERE path = ?', (key,)
+            ).fetchone()
+            if row is None or row[0] != stats.st_size or row[1] != stats.st_mtime_ns:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute('UPDATE files SET last_used = ? WHERE path = ?', (self._tick(), key))
+            self._maybe_commit()
+
+        file_info = {'size': row[0], 'mtime_ns': row[1], 'last_modified': row[2]}
+        return file_info, row[3]
+
+    def put(self, file_path, stats, file_info, content):
+        """Store the decoded content of a file read with the given ``stats``."""
+        if is_racy(stats.st_mtime_ns):
+            return
+
+        nbytes = len(content.encode('utf-8', 'surrogatepass'))
+        if nbytes > self.max_bytes:
+            return
+
+        key = os.path.abspath(file_path)
+        with self._lock:
+            old = self._conn.execute('SELECT nbytes FROM files WHERE path = ?', (key,)).fetchone()
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns, last_modified, content, nbytes, last_used)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, stats.st_size, stats.st_mtime_ns, file_info['last_modified'], content, nbytes, self._tick())
+            )
+            self._total_bytes += nbytes
+            self._evict()
+            self._maybe_commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                'SELECT path, nbytes FROM files ORDER BY last_used LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for path, nbytes in rows:
+                if self._total_bytes <= self.max_bytes:
+                    return
+                self._conn.execute('DELETE FROM files WHERE path = ?', (path,))
+                self._total_bytes -= nbytes
+                self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current cache size."""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': self._total_bytes,
+            }
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._conn.execute('DELETE FROM files')
+            self._conn.commit()
+            self._total_bytes = 0
+            self._pending = 0
+
+    def flush(self):
+        """Commit pending writes to disk."""
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        """Commit pending writes and close the database."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Bytes copied from the socket at a time
+RECV_SIZE = 256 * 1024
+
+def default_socket_path():
+    """Return the per-user socket path of the ``codedump serve`` daemon (honours XDG_RUNTIME_DIR)."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'codedump.sock')
+    return os.path.join('/tmp', f'codedump-{os.getuid()}.sock')
+
+def request(socket_path, message):
+    """Send one request to the daemon and return ``(reply, sock)``.
+
+    ``reply`` is the decoded JSON header line; the body, if any, is the rest
+    of ``sock``'s stream until the daemon closes it.
+
+    Raises:
+        OSError: If the daemon cannot be reached
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        header = bytearray()
+        while not header.endswith(b'\n'):
+            data = sock.recv(1)
+            if not data:
+                raise OSError('the server closed the connection')
+            header += data
+    except BaseException:
+        sock.close()
+        raise
+    return json.loads(header), sock
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch a dump from a running `codedump serve` daemon.')
+    parser.add_argument('paths', nargs='*', default=['.'],
+                        help='Directories or files to dump, in order (default: current directory)')
+    parser.add_argument('-l', '--list-only', action='store_true', help='Only list file paths without content')
+    parser.add_argument('-o', '--output', metavar='FILE', help='Write the dump to FILE instead of stdout')
+    parser.add_argument('--socket', default=default_socket_path(), metavar='PATH',
+                        help='Socket of the daemon (default: %(default)s)')
+    action_group = parser.add_mutually_exclusive_group()
+    action_group.add_argument('--stats', action='store_true', help='Print the daemon\'s cache statistics')
+    action_group.add_argument('--stop', action='store_true', help='Stop the daemon')
+    args = parser.parse_args()
+
+    if args.stats or args.stop:
+        message = {'op': 'stats' if args.stats else 'stop'}
+    else:
+        message = {'op': 'list' if args.list_only else 'dump', 'cwd': os.getcwd(), 'paths': args.paths}
+    try:
+        reply, sock = request(args.socket, message)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit(f"codedump-client: no server at '{args.socket}'; start one with `codedump serve`")
+    except (OSError, ValueError) as e:
+        sys.exit(f"codedump-client: {e}")
+
+    with sock:
+        if not reply.get('ok'):
+            sys.exit(f"codedump-client: {reply.get('error', 'request failed')}")
+        if args.stats:
+            print(json.dumps(reply['stats'], indent=1))
+            return
+        if args.stop:
+            return
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            while True:
+                data = sock.recv(RECV_SIZE)
+                if not data:
+                    break
+                out.write(data)
+        finally:
+            if args.output:
+                out.close()
+            else:
+                out.flush()
+    if args.output:
+        print(f"Output for {', '.join(repr(p) for p in args.paths)} has been written to '{args.output}'.")
+
+if __name__ == '__main__':
+    main()
@@ -4,228 +4,1379 @@ import pyperclip
 import re
 import sys
 import argparse  # Add this import
+import cProfile
+import collections
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from codedump.archives import is_archive, iter_members
+from codedump.cache import ContentCache, DEFAULT_MAX_BYTES, default_cache_dir
+from codedump.compress import check_available, compression_for, open_output
+from codedump.dedup import Deduplicator
+from codedump.formats import FORMATS, open_writer
+from codedump.gitrev import iter_revision, resolve_revision
+from codedump.ignore import IgnoreMatcher
+from codedump.limits import SizeCaps, parse_size
+from codedump.mapped import MMAP_THRESHOLD, MappedText, map_text
+from codedump.manifest import load_manifest, manifest_entry, manifest_key, removed_keys, save_manifest
+from codedump.profiling import DEFAULT_SLOWEST, PhaseStats, timer
+from codedump.shards import ShardWriter, byte_length, min_limit
+from codedump.sections import SectionStore
+from codedump.sniff import read_excerpt, read_excerpt_stream, read_text, read_text_stream
+from codedump.tokens import ESTIMATORS, TokenBudget, get_estimator
+from codedump.watch import PollingWatcher, open_watcher
 
-def get_file_info(file_path):
-    """Get file information including size and last modified time."""
-    stats = os.stat(file_path)
+def get_file_info(file_path, stats=None):
+    """Get file information including size and last modified time.
+
+    An existing ``os.stat`` result can be passed in to avoid a second stat.
+    """
+    if stats is None:
+        stats = os.stat(file_path)
     return {
         'size': stats.st_size,
+        'mtime_ns': stats.st_mtime_ns,
         'last_modified': datetime.datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
     }
 
-def should_skip(path):
+# List of allowed extensions
+ALLOWED_EXTENSIONS = frozenset({
+    # General
+    '.txt', '.md', '.markdown', '.json', '.xml', '.yaml', '.yml', '.toml',
+    '.ini', '.cfg', '.conf', '.sql', '.graphql', '.proto',
+    # Python
+    '.py', '.pyx', '.pyw', '.pyi',
+    # C and C++
+    '.c', '.h', '.i', '.cpp', '.hpp', '.cc', '.hh', '.cxx', '.hxx',
+    # Julia
+    '.jl',
+    # JavaScript and TypeScript
+    '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs',
+    # Web
+    '.html', '.htm', '.css', '.scss', '.sass', '.less',
+    # Java and JVM languages
+    '.java', '.kt', '.kts', '.groovy', '.scala', '.clj', '.cljs',
+    # .NET languages
+    '.cs', '.fs', '.vb',
+    # Ruby
+    '.rb', '.rake', '.gemspec',
+    # PHP
+    '.php', '.phtml', '.php3', '.php4', '.php5', '.phps',
+    # Go
+    '.go',
+    # Rust
+    '.rs',
+    # Swift
+    '.swift',
+    # Shell scripting
+    '.sh', '.bash', '.zsh', '.fish',
+    # PowerShell
+    '.ps1', '.psm1', '.psd1',
+    # Perl
+    '.pl', '.pm',
+    # Lua
+    '.lua',
+    # Haskell
+    '.hs', '.lhs',
+    # R
+    '.r', '.R', '.Rmd',
+    # Dart
+    '.dart',
+    # Kotlin
+    '.kt', '.kts',
+    # Objective-C
+    '.m', '.mm',
+    # Elm
+    '.elm',
+    # F#
+    '.fs', '.fsi', '.fsx',
+    # Elixir
+    '.ex', '.exs',
+    # Erlang
+    '.erl', '.hrl',
+    # Lisp dialects
+    '.lisp', '.cl', '.el',
+    # Fortran
+    '.f', '.for', '.f90', '.f95', '.f03', '.f08',
+    # MATLAB/Octave
+    '.m',
+    # Scala
+    '.scala', '.sc',
+    # Terraform
+    '.tf', '.tfvars',
+    # Ansible
+    '.yml', '.yaml',
+    # LaTeX
+    '.tex', '.sty', '.cls',
+})
+
+# List of allowed filenames without extensions
+ALLOWED_FILENAMES = frozenset({
+    # General
+    'readme', 'license', 'dockerfile', 'makefile', '.gitignore', '.dockerignore',
+    '.editorconfig', '.env', 'requirements.txt', 'package.json', 'tsconfig.json',
+    # Python
+    'setup.py', 'setup.cfg', 'pyproject.toml', 'pipfile', 'manifest.in',
+    '.pylintrc', '.flake8', 'pytest.ini', 'tox.ini',
+    # C/C++
+    'makefile', 'cmakelist.txt', 'cmakelist.txt',
+    # Julia
+    'project.toml', 'manifest.toml', 'juliaconfig.toml',
+    # JavaScript/TypeScript
+    '.npmignore', '.babelrc', '.eslintrc', '.prettierrc',
+    'tslint.json', 'webpack.config.js', 'package-lock.json', 'yarn.lock',
+    # Ruby
+    'gemfile', 'rakefile',
+    # PHP
+    'composer.json', 'composer.lock',
+    # Go
+    'go.mod', 'go.sum',
+    # Rust
+    'cargo.toml', 'cargo.lock',
+    # .NET
+    'packages.config', 'nuget.config',
+    # Java
+    'pom.xml', 'build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts',
+    # Docker
+    'docker-compose.yml', 'docker-compose.yaml',
+    # Git
+    '.gitattributes',
+    # CI/CD
+    '.travis.yml', '.gitlab-ci.yml', 'jenkins.file', 'azure-pipelines.yml',
+    # Editor/IDE
+    '.vscode', '.idea',
+    # Elm
+    'elm.json',
+    # F#
+    'paket.dependencies', 'paket.lock',
+    # Elixir
+    'mix.exs', 'mix.lock',
+    # Erlang
+    'rebar.config',
+    # MATLAB/Octave
+    '.octaverc',
+    # Scala
+    'build.sbt',
+    # Terraform
+    '.terraform.lock.hcl',
+    # Ansible
+    'ansible.cfg', 'hosts',
+    # LaTeX
+    'latexmkrc',
+})
+
+# Directories to skip
+SKIP_DIRECTORIES = frozenset({
+    '__pycache__', 'node_modules', 'venv', 'env', '.venv', '.env',
+    'build', 'dist', 'target', 'out', 'bin', 'obj',
+    '.git', '.svn', '.hg',  # Version control directories
+    '.idea', '.vscode',  # IDE directories
+    'logs',  # Log directories
+    'output',  # Output directories
+})
+
+# Regex patterns for directories to skip
+SKIP_DIRECTORY_PATTERNS = (
+    r'\.egg-info$',  # Matches directories ending with .egg-info
+)
+
+# Regex patterns for files to skip
+SKIP_PATTERNS = (
+    r'\.log(\.[0-9]+)?$',  # Matches .log, .log.1, .log.2, etc.
+    r'^log\.',  # Matches log.txt, log.old, etc.
+    r'\.bak$',
+    r'\.tmp$',
+    r'\.temp$',
+    r'\.swp$',
+    r'~$',
+)
+
+
+def _compile_patterns(patterns):
+    """Combine regex patterns into one compiled alternation (None when empty)."""
+    patterns = tuple(patterns)
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+class FileFilter:
+    """Precompiled skip rules shared by the CLI and the GUI.
+
+    The rule sets are frozen and the skip patterns are combined into a single
+    compiled regex when the filter is built, so one instance can classify any
+    number of paths. Callers that already know whether a path is a directory
+    (from ``os.walk`` or a ``DirEntry``) should pass that hint to avoid a stat.
+    """
+
+    def __init__(self, allowed_extensions=ALLOWED_EXTENSIONS, allowed_filenames=ALLOWED_FILENAMES,
+                 skip_directories=SKIP_DIRECTORIES, skip_directory_patterns=SKIP_DIRECTORY_PATTERNS,
+                 skip_patterns=SKIP_PATTERNS):
+        self.allowed_extensions = frozenset(allowed_extensions)
+        self.allowed_filenames = frozenset(allowed_filenames)
+        self.skip_directories = frozenset(skip_directories)
+        self._skip_directory_re = _compile_patterns(skip_directory_patterns)
+        self._skip_file_re = _compile_patterns(skip_patterns)
+
+    def skip_directory(self, name):
+        """Check if a directory with this base name should be skipped."""
+        if name in self.skip_directories:
+            return True
+        return self._skip_directory_re is not None and self._skip_directory_re.search(name) is not None
+
+    def skip_file(self, name):
+        """Check if a file with this base name should be skipped."""
+        name_lower = name.lower()
+
+        # Check if the file matches any skip patterns
+        if self._skip_file_re is not None and self._skip_file_re.search(name_lower):
+            return True
+
+        if name_lower in self.allowed_filenames:
+            return False
+        if name.startswith('.'):
+            return True
+        return os.path.splitext(name)[1].lower() not in self.allowed_extensions
+
+    def should_skip(self, path, is_dir=None):
+        """Check if the file or directory should be skipped.
+
+        ``is_dir`` is only looked up on disk when the caller does not provide it.
+        """
+        name = os.path.basename(path)
+        if is_dir is None:
+            is_dir = os.path.isdir(path)
+        return self.skip_directory(name) if is_dir else self.skip_file(name)
+
+    def should_skip_entry(self, entry):
+        """Check if an ``os.DirEntry`` should be skipped, using its cached type."""
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        return self.skip_directory(entry.name) if is_dir else self.skip_file(entry.name)
+
+# Shared filter used by the module-level helpers
+DEFAULT_FILTER = FileFilter()
+
+def should_skip(path, is_dir=None):
     """Check if the file or directory should be skipped."""
-    name = os.path.basename(path)
-    name_lower = name.lower()
-    _, extension = os.path.splitext(name)
-    
-    # List of allowed extensions
-    allowed_extensions = {
-        # General
-        '.txt', '.md', '.markdown', '.json', '.xml', '.yaml', '.yml', '.toml',
-        '.ini', '.cfg', '.conf', '.sql', '.graphql', '.proto',
-        # Python
-        '.py', '.pyx', '.pyd', '.pyo', '.pyc', '.pyw', '.pyi',
-        # C and C++
-        '.c', '.h', '.i', '.cpp', '.hpp', '.cc', '.hh', '.cxx', '.hxx',
-        # Julia
-        '.jl',
-        # JavaScript and TypeScript
-        '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs',
-        # Web
-        '.html', '.htm', '.css', '.scss', '.sass', '.less',
-        # Java and JVM languages
-        '.java', '.kt', '.kts', '.groovy', '.scala', '.clj', '.cljs',
-        # .NET languages
-        '.cs', '.fs', '.vb',
-        # Ruby
-        '.rb', '.rake', '.gemspec',
-        # PHP
-        '.php', '.phtml', '.php3', '.php4', '.php5', '.phps',
-        # Go
-        '.go',
-        # Rust
-        '.rs',
-        # Swift
-        '.swift',
-        # Shell scripting
-        '.sh', '.bash', '.zsh', '.fish',
-        # PowerShell
-        '.ps1', '.psm1', '.psd1',
-        # Perl
-        '.pl', '.pm',
-        # Lua
-        '.lua',
-        # Haskell
-        '.hs', '.lhs',
-        # R
-        '.r', '.R', '.Rmd',
-        # Dart
-        '.dart',
-        # Kotlin
-        '.kt', '.kts',
-        # Objective-C
-        '.m', '.mm',
-        # Elm
-        '.elm',
-        # F#
-        '.fs', '.fsi', '.fsx',
-        # Elixir
-        '.ex', '.exs',
-        # Erlang
-        '.erl', '.hrl',
-        # Lisp dialects
-        '.lisp', '.cl', '.el',
-        # Fortran
-        '.f', '.for', '.f90', '.f95', '.f03', '.f08',
-        # MATLAB/Octave
-        '.m', '.mat',
-        # Scala
-        '.scala', '.sc',
-        # Terraform
-        '.tf', '.tfvars',
-        # Ansible
-        '.yml', '.yaml',
-        # LaTeX
-        '.tex', '.sty', '.cls',
-    }
+    return DEFAULT_FILTER.should_skip(path, is_dir)
+
+def walk_files(directory='.', file_filter=None, use_ignore_files=True, matcher=None, phases=None):
+    """Yield the paths of all files that pass the filter, in os.walk order.
+
+    Unless ``use_ignore_files`` is False, entries excluded by ``.gitignore``,
+    ``.ignore`` or ``.codedumpignore`` files are skipped and ignored
+    directories are pruned before descending into them. An ``IgnoreMatcher``
+    rooted at ``directory`` or one of its parents can be passed in ``matcher``
+    to share its rules.
+
+    With ``phases`` (a ``PhaseStats``), listing directories and applying the
+    rules are timed, and skipped entries are counted per rule.
+    """
+    if file_filter is None:
+        file_filter = DEFAULT_FILTER
+    if matcher is None and use_ignore_files:
+        matcher = IgnoreMatcher(directory)
+
+    walk = os.walk(directory)
+    if phases is not None:
+        walk = phases.timed('walk', walk)
+    for root, dirs, files in walk:
+        with timer(phases, 'filter'):
+            if matcher is not None:
+                # Ignore files are regular files, so the listing tells us which ones exist
+                matcher.load(root, files)
+
+            # Remove directories that should be skipped (os.walk already split dirs from files)
+            kept_dirs = [d for d in dirs if not file_filter.skip_directory(d)]
+            kept_files = [file for file in files if not file_filter.skip_file(file)]
+            if phases is not None:
+                phases.count('dirs visited')
+                phases.skip('directories by name', len(dirs) - len(kept_dirs))
+                phases.skip('files by name or extension', len(files) - len(kept_files))
+            if matcher is not None:
+                matched_dirs, matched_files = len(kept_dirs), len(kept_files)
+                kept_dirs = [d for d in kept_dirs if not matcher.is_ignored(root, d, True)]
+                kept_files = [file for file in kept_files if not matcher.is_ignored(root, file, False)]
+                if phases is not None:
+                    phases.skip('directories by ignore files', matched_dirs - len(kept_dirs))
+                    phases.skip('files by ignore files', matched_files - len(kept_files))
+            dirs[:] = kept_dirs
+
+        for file in kept_files:
+            yield os.path.join(root, file)
+
+def format_header(file_path, file_info):
+    """Build the banner that precedes each file in the dump."""
+    return (
+        f"\n\n{'=' * 80}\n"
+        f"File: {file_path}\n"
+        f"Size: {file_info['size']} bytes\n"
+        f"Last Modified: {file_info['last_modified']}\n"
+        f"{'=' * 80}\n"
+    )
+
+# Prefix of the content reported for files that cannot be read
+READ_ERROR_PREFIX = "Error reading file: "
+
+def read_file(file_path, cache=None, stats=None, max_file_size=None, phases=None):
+    """Stat and read a file as text, serving it from ``cache`` when unchanged.
+
+    The file is opened once; its first bytes decide whether it is binary and
+    which encoding to decode it with (see ``codedump.sniff``).
+
+    An existing ``os.stat`` result can be passed in to avoid a second stat.
+    Files larger than ``max_file_size`` bytes are reduced to a head/tail
+    excerpt read by seeking (see ``codedump.sniff.read_excerpt``); excerpts
+    are not cached. With ``phases`` (a ``PhaseStats``), each step is timed
+    and counted.
+
+    Returns:
+        tuple: (file_info, content); on failure the content is the error text,
+        and for binary files it is None
+    """
+    if stats is None:
+        with timer(phases, 'stat'):
+            stats = os.stat(file_path)
+    if max_file_size is not None and stats.st_size > max_file_size:
+        file_info = get_file_info(file_path, stats)
+        try:
+            with timer(phases, 'read'):
+                content, _ = read_excerpt(file_path, stats.st_size, max_file_size)
+        except Exception as e:
+            if phases is not None:
+                phases.count('read errors')
+            return file_info, f"{READ_ERROR_PREFIX}{str(e)}"
+        if phases is not None:
+            phases.count('files read')
+            phases.count('bytes read', min(stats.st_size, max_file_size))
+        return file_info, content
+    if cache is not None:
+        cached = cache.get(file_path, stats)
+        if cached is not None:
+            if phases is not None:
+                phases.count('cache hits')
+            return cached
+
+    file_info = get_file_info(file_path, stats)
+    try:
+        content, _ = read_text(file_path, phases=phases)
+    except Exception as e:
+        if phases is not None:
+            phases.count('read errors')
+        return file_info, f"{READ_ERROR_PREFIX}{str(e)}"
+    if content is None:
+        return file_info, None
+
+    if cache is not None:
+        cache.put(file_path, stats, file_info, content)
+    return file_info, content
+
+def read_section(file_path, cache=None, mmap_threshold=None, max_file_size=None, phases=None):
+    """Read one file, returning its header followed by its content (None for binary files).
+
+    Files of at least ``mmap_threshold`` bytes that are clean UTF-8 are
+    returned as a ``MappedText`` to be written without decoding. Files
+    larger than ``max_file_size`` are reduced to an excerpt.
+    """
+    stats = None
+    if mmap_threshold is not None:
+        with timer(phases, 'stat'):
+            stats = os.stat(file_path)
+        if stats.st_size >= mmap_threshold and not (max_file_size is not None and stats.st_size > max_file_size):
+            header = format_header(file_path, get_file_info(file_path, stats))
+            with timer(phases, 'read'):
+                mapped = map_text(file_path, header)
+            if mapped is not None:
+                if phases is not None:
+                    phases.count('files read')
+                    phases.count('bytes read', len(mapped.data))
+                return mapped
+    file_info, content = read_file(file_path, cache, stats, max_file_size, phases)
+    if content is None:
+        return None
+    with timer(phases, 'format'):
+        return format_header(file_path, file_info) + '\n' + content
+
+def read_record(file_path, max_file_size=None, stats=None, f=None, phases=None):
+    """Read one file into a section dict for structured output.
+
+    The dict holds the 'path', the ``get_file_info`` fields, the 'encoding'
+    the content was decoded with, a 'hash' of the raw bytes (BLAKE2b-128 as
+    in manifests) and the 'content'. Files larger than ``max_file_size`` are
+    reduced to an excerpt, flagged 'truncated' and not hashed. If the file
+    cannot be read, 'content' is None and 'error' holds the message.
+
+    An open binary file object ``f`` (such as an archive member) can be
+    read instead of ``file_path``, together with its ``stats``. With
+    ``phases`` (a ``PhaseStats``), each step is timed and counted.
+
+    Returns:
+        dict: The section, or None for binary files
+    """
+    if stats is None:
+        with timer(phases, 'stat'):
+            stats = os.stat(file_path)
+    section = {'path': file_path, **get_file_info(file_path, stats), 'encoding': None, 'hash': None}
+
+    def read(f):
+        if max_file_size is not None and stats.st_size > max_file_size:
+            section['truncated'] = True
+            with timer(phases, 'read'):
+                result = read_excerpt_stream(f, stats.st_size, max_file_size)
+            if phases is not None:
+                phases.count('files read')
+                phases.count('bytes read', max_file_size)
+            return result
+        digest = hashlib.blake2b(digest_size=16)
+        result = read_text_stream(f, digest, phases)
+        section['hash'] = digest.hexdigest()
+        return result
+
+    try:
+        if f is None:
+            with open(file_path, 'rb') as f:
+                content, encoding = read(f)
+        else:
+            content, encoding = read(f)
+    except Exception as e:
+        if phases is not None:
+            phases.count('read errors')
+        section.update(content=None, error=str(e), hash=None)
+        return section
+    if content is None:
+        return None
+    section.update(content=content, encoding=encoding)
+    return section
+
+def format_duplicate(first_path):
+    """Build the one-line content that replaces a file identical to ``first_path``."""
+    return f"[Identical to {first_path}]"
+
+def map_ordered(func, items, jobs, read_ahead=None):
+    """Apply ``func`` to ``items`` on a bounded thread pool, yielding results in input order.
+
+    At most ``read_ahead`` results (default ``2 * jobs``) are in flight or
+    buffered at any time, so memory stays bounded however fast the workers are.
+    """
+    if read_ahead is None:
+        read_ahead = 2 * jobs
+    read_ahead = max(read_ahead, jobs)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= read_ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def track_changes(paths, directory, previous=None, manifest=None, jobs=1, phases=None):
+    """Record files in a manifest and yield only those changed since ``previous``.
+
+    Every path is recorded in ``manifest`` (key -> size, mtime_ns and content
+    hash). When a ``previous`` manifest is given, only files that were added
+    or whose content hash differs are yielded; files whose size and mtime are
+    unchanged are not re-read. Files that disappear before they are hashed
+    are left out of ``manifest``, so they count as removed.
+    """
+    def check(file_path):
+        key = manifest_key(file_path, directory)
+        old = previous.get(key) if previous is not None else None
+        try:
+            with timer(phases, 'manifest'):
+                entry = manifest_entry(file_path, old)
+        except OSError:
+            # Deleted (or made unreadable) since the walk
+            return file_path, key, None, False
+        return file_path, key, entry, old is None or old['hash'] != entry['hash']
+
+    results = map_ordered(check, paths, jobs) if jobs > 1 else map(check, paths)
+    for file_path, key, entry, changed in results:
+        if entry is None:
+            continue
+        if manifest is not None:
+            manifest[key] = entry
+        if previous is None or changed:
+            yield file_path
+
+def format_removed(directory, keys):
+    """Build the summary section listing files removed since the last dump."""
+    paths = [os.path.join(directory, *key.split('/')) for key in keys]
+    return (
+        f"\n\n{'=' * 80}\n"
+        f"Removed since last dump: {len(paths)} files\n"
+        f"{'=' * 80}\n\n"
+        + '\n'.join(paths)
+    )
+
+def budget_priority(file_path, directory, size):
+    """Sort key for token-budgeted dumps: files nearer the root first, then smaller files."""
+    return (os.path.relpath(file_path, directory).count(os.sep), size)
+
+def select_within_budget(paths, budget, directory='.', list_only=False):
+    """Choose the files that fit in ``budget`` (a ``TokenBudget``) before reading any of them.
+
+    Sections are estimated from the sizes reported by ``get_file_info``. Files
+    are taken greedily in ``budget_priority`` order, skipping those that no
+    longer fit, and returned in their original order.
+    """
+    estimator = budget.estimator
+    candidates = []
+    for index, file_path in enumerate(paths):
+        try:
+            file_info = get_file_info(file_path)
+        except OSError:
+            continue
+        if list_only:
+            tokens = estimator.count(file_path)
+        else:
+            tokens = estimator.count(format_header(file_path, file_info)) + estimator.count_bytes(file_info['size'])
+        candidates.append((budget_priority(file_path, directory, file_info['size']), index, file_path, tokens))
+
+    selected = []
+    total = 0
+    for _, index, file_path, tokens in sorted(candidates):
+        if total + tokens <= budget.max_tokens:
+            total += tokens
+            selected.append((index, file_path))
+        else:
+            budget.skipped.append((file_path, tokens))
+    return [file_path for _, file_path in sorted(selected)]
+
+def select_paths(directory='.', file_filter=None, jobs=1, since=None, manifest=None, use_ignore_files=True,
+                 phases=None):
+    """Return the files to dump and the manifest to record them in.
+
+    With a ``since`` manifest and no ``manifest`` to fill in, a temporary
+    one is created to find the removed files.
+
+    Returns:
+        tuple: (iterator of paths, manifest dict or None)
+    """
+    paths = walk_files(directory, file_filter, use_ignore_files, phases=phases)
+    if since is not None and manifest is None:
+        manifest = {}
+    if manifest is not None:
+        paths = track_changes(paths, directory, since, manifest, jobs, phases)
+    return paths, manifest
+
+def open_members(directory='.', file_filter=None, rev=None):
+    """Return the files to dump when they do not come from walking ``directory``.
+
+    With a ``rev``, the files are those of that git revision under
+    ``directory`` (see ``codedump.gitrev.iter_revision``); if ``directory``
+    is a zip or tar archive, they are its members (see
+    ``codedump.archives.iter_members``).
+
+    Returns:
+        iterator: ``(name, stats, file)`` tuples, or None for a plain directory
+    """
+    if file_filter is None:
+        file_filter = DEFAULT_FILTER
+    if rev is not None:
+        return iter_revision(directory, rev, file_filter)
+    if is_archive(directory):
+        return iter_members(directory, file_filter)
+    return None
+
+def iter_member_sections(members, directory='.', list_only=False, budget=None, caps=None, phases=None):
+    """Yield ``(file_path, section)`` pairs for files read from ``open_members``.
+
+    Files are read one at a time in the order given, so memory is bounded by
+    the largest file. Paths are shown as ``<directory>/<name>``. ``budget``,
+    ``caps`` and ``phases`` apply as in ``iter_dump``, but sizes are only
+    known as files are reached, so a budget is not planned ahead.
+    """
+    if phases is not None:
+        # Finding the next member is the walk of an archive or revision
+        members = phases.timed('walk', members)
+    for name, stats, f in members:
+        file_path = os.path.join(directory, *name.split('/'))
+        if list_only:
+            section = file_path
+        else:
+            if caps is not None and not caps.admit(file_path, stats.st_size):
+                continue
+            start = time.perf_counter()
+            try:
+                if caps is not None and caps.truncates(stats.st_size):
+                    with timer(phases, 'read'):
+                        content, _ = read_excerpt_stream(f, stats.st_size, caps.max_file_size)
+                    if phases is not None:
+                        phases.count('files read')
+                        phases.count('bytes read', caps.max_file_size)
+                else:
+                    content, _ = read_text_stream(f, phases=phases)
+            except Exception as e:
+                if phases is not None:
+                    phases.count('read errors')
+                content = f"{READ_ERROR_PREFIX}{str(e)}"
+            if content is None:
+                # Binary file
+                continue
+            with timer(phases, 'format'):
+                section = format_header(file_path, get_file_info(file_path, stats)) + '\n' + content
+            if phases is not None:
+                phases.file_time(file_path, time.perf_counter() - start)
+        if budget is None or budget.admit(file_path, section):
+            yield file_path, section
+
+def iter_sections(directory='.', list_only=False, file_filter=None, jobs=1, cache=None, since=None, manifest=None,
+                  use_ignore_files=True, budget=None, dedup=None, mmap_threshold=None, caps=None, rev=None,
+                  phases=None):
+    """Yield the dump one ``(file_path, section)`` pair at a time.
+
+    ``file_path`` is None for sections that do not belong to one file (the
+    summary of removed files). See ``iter_dump`` for the options.
+    """
+    members = open_members(directory, file_filter, rev)
+    if members is not None:
+        yield from iter_member_sections(members, directory, list_only, budget, caps, phases)
+        return
+    paths, manifest = select_paths(directory, file_filter, jobs, since, manifest, use_ignore_files, phases)
+    if list_only:
+        dedup = None
+    if list_only or budget is not None or dedup is not None:
+        mmap_threshold = None
+    if dedup is not None:
+        paths = dedup.group_sizes(paths)
+    max_file_size = None
+    if caps is not None and not list_only:
+        max_file_size = caps.max_file_size
+        paths = caps.filter(paths)
+    if budget is not None:
+        paths = select_within_budget(paths, budget, directory, list_only)
+
+    def read_one(file_path):
+        if dedup is None:
+            return read_section(file_path, cache, mmap_threshold, max_file_size, phases)
+
+        # Hash on the worker thread; which copy comes first is decided in walk order below
+        file_info, content = read_file(file_path, cache, max_file_size=max_file_size, phases=phases)
+        if content is None:
+            return None
+        if content.startswith(READ_ERROR_PREFIX) or caps is not None and caps.truncates(file_info['size']):
+            # Errors and excerpts say nothing about the whole content
+            digest = None
+        else:
+            with timer(phases, 'dedup'):
+                digest = dedup.digest(file_path, file_info['size'])
+        return file_info, content, digest
+
+    def read(file_path):
+        if list_only:
+            return file_path, file_path
+        if phases is None:
+            return file_path, read_one(file_path)
+        start = time.perf_counter()
+        section = read_one(file_path)
+        phases.file_time(file_path, time.perf_counter() - start)
+        return file_path, section
+
+    sections = map_ordered(read, paths, jobs) if jobs > 1 and not list_only else map(read, paths)
+
+    for file_path, section in sections:
+        if section is None:
+            # Binary file
+            continue
+        if dedup is not None:
+            file_info, content, digest = section
+            first = dedup.first_copy(file_path, file_info['size'], digest)
+            if first is not None:
+                content = format_duplicate(first)
+            with timer(phases, 'format'):
+                section = format_header(file_path, file_info) + '\n' + content
+        if budget is None or budget.admit(file_path, section):
+            yield file_path, section
+
+    if since is not None:
+        removed = removed_keys(since, manifest)
+        if removed:
+            section = format_removed(directory, removed)
+            if budget is None or budget.admit('<removed files>', section):
+                yield None, section
+
+def iter_dump(directory='.', list_only=False, file_filter=None, jobs=1, cache=None, since=None, manifest=None,
+              use_ignore_files=True, budget=None, dedup=None, mmap_threshold=None, caps=None, rev=None, phases=None):
+    """Yield the dump one section at a time.
+
+    Each item is a file path when ``list_only`` is set, otherwise a header
+    followed by the file content. Files detected as binary are left out.
+    Consecutive items are separated by a newline in the final output. With
+    ``jobs`` > 1, files are stat'ed and read on a bounded thread pool; the
+    output order is the same as the serial walk. Unchanged files are served
+    from ``cache`` (a ``ContentCache``) if given.
+
+    Passing a ``manifest`` dict records every file's size, mtime and hash in
+    it. Passing the entries of a previous manifest as ``since`` limits the
+    dump to added or modified files, followed by a summary of removed paths.
+
+    ``use_ignore_files`` controls whether ignore files are honoured during
+    the walk (see ``walk_files``).
+
+    ``directory`` may also be a zip or tar archive, whose members are
+    streamed without extraction. With ``rev``, the files of that git
+    revision under ``directory`` are streamed from the object store instead
+    of the working tree. The ``jobs``, ``cache``, ``since``, ``manifest``,
+    ``dedup`` and ``mmap_threshold`` options do not apply to either (see
+    ``open_members``).
+
+    With a ``budget`` (a ``TokenBudget``), files are chosen from their sizes
+    to fit its token limit, and any section that would still overflow it is
+    dropped; per-file token counts are recorded in the budget.
+
+    With ``dedup`` (a ``Deduplicator``), files identical to an earlier file
+    are reduced to a one-line reference to its path.
+
+    With ``mmap_threshold``, files at least that many bytes long whose bytes
+    can be copied as is are yielded as ``MappedText`` objects instead of
+    strings; only ``write_dump`` should be given this option. It is ignored
+    with ``budget`` or ``dedup``, which need the content as text.
+
+    With ``caps`` (a ``SizeCaps``), files over its per-file size are reduced
+    to a head/tail excerpt and files that no longer fit in its total size are
+    skipped, both decided from file sizes before reading.
+
+    With ``phases`` (a ``PhaseStats``), the walk, the skip rules and the
+    reading, decoding and formatting of each file are timed, and the files
+    skipped per rule, the bytes read and the slowest files are recorded.
+    """
+    for _, section in iter_sections(directory, list_only, file_filter, jobs, cache, since, manifest,
+                                    use_ignore_files, budget, dedup, mmap_threshold, caps, rev, phases):
+        yield section
+
+def write_dump(out, directory='.', list_only=False, **options):
+    """Stream the dump to a writable text file object.
+
+    Keyword options are passed on to ``iter_dump``; pass ``mmap_threshold``
+    to copy large files from memory maps without decoding them. Writing is
+    timed in ``phases`` if given.
+
+    Returns:
+        int: Number of sections written
+    """
+    phases = options.get('phases')
+    count = 0
+    for section in iter_dump(directory, list_only, **options):
+        with timer(phases, 'write'):
+            if count:
+                out.write('\n')
+            if isinstance(section, MappedText):
+                section.write_to(out)
+            else:
+                out.write(section)
+        count += 1
+    return count
+
+def write_shards(output, limit, directory='.', list_only=False, measure=byte_length, **options):
+    """Stream the dump into numbered chunk files of at most ``limit`` each.
+
+    ``measure`` gives the size of a text in the unit of ``limit`` (UTF-8
+    bytes by default, or an estimator's ``count`` for tokens). Keyword options
+    are passed on to ``iter_sections``. See ``ShardWriter``.
+
+    Returns:
+        list: Paths of the chunks written
+
+    Raises:
+        ValueError: If ``limit`` is too small for a chunk index; no chunks
+            are left behind
+        OSError: If a chunk cannot be written; no chunks are left behind
+    """
+    phases = options.get('phases')
+    writer = ShardWriter(output, limit, measure, directory)
+    try:
+        for file_path, section in iter_sections(directory, list_only, **options):
+            with timer(phases, 'write'):
+                writer.add(file_path, section)
+        with timer(phases, 'write'):
+            return writer.close()
+    except (OSError, ValueError):
+        writer.discard()
+        raise
+
+def iter_records(directory='.', file_filter=None, jobs=1, since=None, manifest=None, use_ignore_files=True, caps=None,
+                 rev=None, phases=None):
+    """Yield the dump as section dicts (see ``read_record``) for structured output.
+
+    Files detected as binary are left out. With ``since``, the last item is
+    ``{'path': None, 'removed': [...]}`` listing the removed files, if any.
+    ``directory`` may be a zip or tar archive, or a ``rev`` may be given. The
+    other options are as for ``iter_dump``.
+    """
+    members = open_members(directory, file_filter, rev)
+    if members is not None:
+        if phases is not None:
+            members = phases.timed('walk', members)
+        for name, stats, f in members:
+            file_path = os.path.join(directory, *name.split('/'))
+            if caps is None or caps.admit(file_path, stats.st_size):
+                start = time.perf_counter()
+                section = read_record(file_path, caps.max_file_size if caps is not None else None, stats, f, phases)
+                if phases is not None:
+                    phases.file_time(file_path, time.perf_counter() - start)
+                if section is not None:
+                    yield section
+        return
+
+    paths, manifest = select_paths(directory, file_filter, jobs, since, manifest, use_ignore_files, phases)
+    max_file_size = None
+    if caps is not None:
+        max_file_size = caps.max_file_size
+        paths = caps.filter(paths)
+
+    def read(file_path):
+        start = time.perf_counter()
+        try:
+            return read_record(file_path, max_file_size, phases=phases)
+        except OSError as e:
+            # The file could not even be stat'ed
+            if phases is not None:
+                phases.count('read errors')
+            return {'path': file_path, 'content': None, 'error': str(e)}
+        finally:
+            if phases is not None:
+                phases.file_time(file_path, time.perf_counter() - start)
+
+    for section in (map_ordered(read, paths, jobs) if jobs > 1 else map(read, paths)):
+        if section is not None:
+            yield section
+
+    if since is not None:
+        removed = removed_keys(since, manifest)
+        if removed:
+            yield {'path': None, 'removed': [os.path.join(directory, *key.split('/')) for key in removed]}
+
+def write_records(out, format, directory='.', **options):
+    """Stream the dump to ``out`` in a structured ``format`` ('jsonl' or 'binary').
+
+    JSON Lines is written to a text stream and the binary format to a binary
+    one (see ``codedump.formats``). Keyword options are passed on to
+    ``iter_records``.
+
+    Returns:
+        int: Number of records written
+    """
+    phases = options.get('phases')
+    writer = open_writer(format, out)
+    for section in iter_records(directory, **options):
+        with timer(phases, 'write'):
+            writer.write(section)
+    with timer(phases, 'write'):
+        return writer.close()
+
+# A live dump's section store is compacted once it holds this many more
+# superseded sections than live ones
+COMPACT_SLACK = 256
+
+def index_path(output):
+    """Return the path of the section index written next to a live dump's ``output``."""
+    return f"{output}.index.json"
+
+def _temporary_path(path):
+    """Return a sibling path for writing ``path`` atomically, keeping its extension."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp{ext}"
+
+class LiveDump:
+    """A dump kept up to date file by file, for watch mode.
+
+    ``load`` reads the whole tree once; ``update`` then re-reads only the
+    files named in a set of changed paths (directories are rescanned, and
+    files whose size and mtime did not change are not re-read). Sections
+    live in a ``SectionStore`` in dump order: changed files keep their
+    place, new files are added at the end. ``write`` rewrites the output
+    from the store, without touching the source files.
+    """
+
+    def __init__(self, directory='.', file_filter=None, jobs=1, cache=None, use_ignore_files=True,
+                 max_file_size=None):
+        self.directory = directory
+        self.file_filter = file_filter if file_filter is not None else DEFAULT_FILTER
+        self.jobs = jobs
+        self.cache = cache
+        self.max_file_size = max_file_size
+        self.matcher = IgnoreMatcher(directory) if use_ignore_files else None
+        self.store = SectionStore()
+        # File path -> (store index, (size, mtime_ns)), in dump order
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._files)
+
+    def _included(self, path, is_dir=False):
+        """Check a path against the filter and ignore files, directory by directory."""
+        rel_path = os.path.relpath(path, self.directory)
+        parts = rel_path.split(os.sep)
+        if parts[0] == os.pardir:
+            return False
+        dir_path = self.directory
+        for part in parts[:-1]:
+            if self.file_filter.skip_directory(part):
+                return False
+            if self.matcher is not None and self.matcher.is_ignored(dir_path, part, True):
+                return False
+            dir_path = os.path.join(dir_path, part)
+        name = parts[-1]
+        if self.file_filter.skip_directory(name) if is_dir else self.file_filter.skip_file(name):
+            return False
+        return not (self.matcher is not None and self.matcher.is_ignored(dir_path, name, is_dir))
+
+    def _read(self, file_path):
+        """Stat and read a file; return (stats, file_info, content), or None if it is gone."""
+        try:
+            stats = os.stat(file_path)
+        except OSError:
+            return None
+        file_info, content = read_file(file_path, self.cache, stats, self.max_file_size)
+        return stats, file_info, content
+
+    def _store(self, file_path, result):
+        """Store the section read for ``file_path``; return True if the dump changed."""
+        if result is None or result[2] is None:
+            # Deleted, or now binary
+            return self._remove(file_path)
+        stats, file_info, content = result
+        index = self.store.append(file_path, format_header(file_path, file_info), content)
+        self._files[file_path] = (index, (stats.st_size, stats.st_mtime_ns))
+        return True
+
+    def _remove(self, file_path):
+        return self._files.pop(file_path, None) is not None
+
+    def _unchanged(self, file_path):
+        known = self._files.get(file_path)
+        if known is None:
+            return False
+        try:
+            stats = os.stat(file_path)
+        except OSError:
+            return False
+        return known[1] == (stats.st_size, stats.st_mtime_ns)
+
+    def _sync(self, dir_path):
+        """Rescan a directory: read new and modified files, drop the ones that are gone.
+
+        Returns:
+            tuple: (sections updated, sections removed)
+        """
+        updated = removed = 0
+        seen = set()
+        if dir_path == self.directory or self._included(dir_path, True):
+            paths = []
+            for file_path in walk_files(dir_path, self.file_filter, self.matcher is not None, self.matcher):
+                seen.add(file_path)
+                if not self._unchanged(file_path):
+                    paths.append(file_path)
+            results = map_ordered(self._read, paths, self.jobs) if self.jobs > 1 else map(self._read, paths)
+            for file_path, result in zip(paths, results):
+                if self._store(file_path, result):
+                    updated += 1
+
+        prefix = dir_path.rstrip(os.sep) + os.sep
+        for file_path in [p for p in self._files if p.startswith(prefix) and p not in seen]:
+            self._remove(file_path)
+            removed += 1
+        return updated, removed
+
+    def load(self):
+        """Read the whole tree; return the number of sections."""
+        self._sync(self.directory)
+        return len(self._files)
+
+    def update(self, changed):
+        """Apply a set of changed paths (files or directories, as reported by a watcher).
+
+        A change to an ignore file rescans the whole tree.
+
+        Returns:
+            tuple: (sections updated, sections removed)
+        """
+        updated = removed = 0
+        if self.matcher is not None and any(os.path.basename(p) in self.matcher.filenames for p in changed):
+            self.matcher.forget()
+            changed = {self.directory}
+
+        for path in sorted(changed):
+            if os.path.isdir(path) and not os.path.islink(path):
+                more_updated, more_removed = self._sync(path)
+                updated += more_updated
+                removed += more_removed
+            elif os.path.isfile(path) and self._included(path):
+                if not self._unchanged(path) and self._store(path, self._read(path)):
+                    if path in self._files:
+                        updated += 1
+                    else:
+                        removed += 1
+            elif self._remove(path):
+                # Deleted, renamed away or no longer included
+                removed += 1
+            else:
+                # Possibly a directory that was deleted or moved away
+                removed += self._sync(path)[1]
+
+        self._compact()
+        return updated, removed
+
+    def _compact(self):
+        """Copy the live sections into a fresh store once superseded ones dominate."""
+        if len(self.store) <= 2 * len(self._files) + COMPACT_SLACK:
+            return
+        store = SectionStore()
+        for file_path, (index, key) in self._files.items():
+            header = self.store[index]['header']
+            self._files[file_path] = (store.append(file_path, header, self.store.content(index)), key)
+        self.store.close()
+        self.store = store
+
+    def write(self, output):
+        """Atomically rewrite ``output`` (compressed for .gz/.zst) and its section index.
+
+        The index (see ``index_path``) lists each section's path, byte offset
+        and length in the uncompressed output. Both files are written to a
+        temporary name first and renamed over the old ones.
+
+        Returns:
+            int: Number of sections written
+        """
+        sections = []
+        offset = 0
+        tmp_output = _temporary_path(output)
+        with open_output(tmp_output, 'w', encoding='utf-8', errors='surrogateescape') as out:
+            for file_path, (index, _) in self._files.items():
+                if sections:
+                    out.write('\n')
+                    offset += 1
+                text = self.store.text(index)
+                out.write(text)
+                length = byte_length(text)
+                sections.append({'path': file_path, 'offset': offset, 'length': length})
+                offset += length
+            out.write('\n')
+        os.replace(tmp_output, output)
+
+        tmp_index = _temporary_path(index_path(output))
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump({'output': os.path.basename(output), 'sections': sections}, f, indent=1)
+        os.replace(tmp_index, index_path(output))
+        return len(sections)
+
+    def close(self):
+        self.store.close()
+
+def watch_dump(output, directory='.', file_filter=None, jobs=1, cache=None, use_ignore_files=True,
+               max_file_size=None, poll_interval=None, log=sys.stderr):
+    """Write the dump to ``output``, then keep it up to date until interrupted.
+
+    File system changes are picked up with inotify where available (polling
+    otherwise, or every ``poll_interval`` seconds if given), debounced, and
+    applied to a ``LiveDump``; only the affected sections are re-read before
+    the output and its index are rewritten. Progress is reported to ``log``.
+    """
+    if file_filter is None:
+        file_filter = DEFAULT_FILTER
+    # Watch before the first dump so no change slips in between
+    with open_watcher(directory, file_filter, poll_interval=poll_interval) as watcher, \
+            LiveDump(directory, file_filter, jobs, cache, use_ignore_files, max_file_size) as dump:
+        dump.load()
+        count = dump.write(output)
+        method = 'polling' if isinstance(watcher, PollingWatcher) else 'inotify'
+        print(f"Wrote {count} sections to '{output}'; watching '{directory}' ({method}), Ctrl+C to stop.", file=log)
+        try:
+            while True:
+                changed = watcher.wait()
+                if not changed:
+                    continue
+                updated, removed = dump.update(changed)
+                if updated or removed:
+                    count = dump.write(output)
+                    print(f"{time.strftime('%H:%M:%S')} {updated} sections updated, {removed} removed; "
+                          f"{count} sections in '{output}'", file=log)
+        except KeyboardInterrupt:
+            pass
+
+def concatenate_files(directory='.', list_only=False, file_filter=None, **options):
+    """Recursively concatenate all files in the directory and subdirectories with annotations and return as a string."""
+    return '\n'.join(iter_dump(directory, list_only, file_filter, **options))
+
+def main():
+    if sys.argv[1:2] == ['serve']:
+        # `codedump serve` runs the daemon queried by codedump-client
+        from codedump.daemon import main as serve_main
+        serve_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description='Concatenate files in a directory.',
+                                     epilog='Run `codedump serve --help` for the daemon mode.')
+    parser.add_argument('directory', nargs='?', default='.',
+                        help='Directory, or zip/tar archive, to process (default: current directory)')
+    parser.add_argument('-l', '--list-only', action='store_true', help='Only list file paths without content')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='Write the dump to FILE instead of stdout (implies --no-clipboard); '
+                             'FILE.gz and FILE.zst (needs zstandard) are compressed while the dump is written')
+    parser.add_argument('--no-clipboard', action='store_true', help='Do not copy the output to the clipboard; keeps memory use constant')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N', help='Read files on N threads (default: 1)')
+    parser.add_argument('--cache', action='store_true', help=f'Serve unchanged files from the cache in {default_cache_dir()}')
+    parser.add_argument('--cache-dir', metavar='DIR', help='Serve unchanged files from a cache in DIR (implies --cache)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                        help='Maximum size of cached content before LRU eviction (default: %(default)s MB)')
+    parser.add_argument('--since', metavar='MANIFEST', help='Only dump files added or modified since MANIFEST, plus a list of removed files')
+    parser.add_argument('--manifest', metavar='FILE', help='Record the path, size, mtime and hash of every file in FILE')
+    parser.add_argument('--no-ignore', action='store_true', help='Do not honour .gitignore, .ignore and .codedumpignore files')
+    parser.add_argument('--max-tokens', type=int, metavar='N', help='Fit as many files as possible in N tokens and report per-file token counts')
+    parser.add_argument('--tokenizer', choices=('auto',) + tuple(ESTIMATORS), default='auto',
+                        help='Token estimator for --max-tokens and --chunk-tokens: tiktoken if installed (auto), or a byte heuristic')
+    parser.add_argument('--mmap-threshold', type=int, default=MMAP_THRESHOLD // (1024 * 1024), metavar='MB',
+                        help='With --output or --no-clipboard, copy UTF-8 files of at least MB megabytes '
+                             'from memory maps without decoding them; 0 disables (default: %(default)s)')
+    parser.add_argument('--max-file-size', type=parse_size, metavar='SIZE',
+                        help='Reduce files larger than SIZE (e.g. 200K, 1M) to their first and last SIZE/2 bytes')
+    parser.add_argument('--max-total-size', type=parse_size, metavar='SIZE',
+                        help='Skip files once the dump holds SIZE bytes of file content (e.g. 10M)')
+    parser.add_argument('--dedup', action='store_true', help='Replace files identical to an earlier file with a one-line reference to it')
+    parser.add_argument('--rev', metavar='COMMIT',
+                        help='Dump the files of COMMIT (any git revision) under the directory, read from the '
+                             'git object store instead of the working tree')
+    parser.add_argument('--watch', action='store_true',
+                        help='After writing --output, keep it up to date as files change (inotify, or polling '
+                             'where unavailable), re-reading only changed files; also writes FILE.index.json')
+    parser.add_argument('--poll-interval', type=float, metavar='SECONDS',
+                        help='With --watch, poll for changes every SECONDS instead of using inotify')
+    parser.add_argument('--format', choices=FORMATS, default='text',
+                        help='Output format: the annotated text dump (default), JSON Lines with one record per file, '
+                             'or a length-prefixed binary format with a section index (requires --output)')
+    parser.add_argument('--stats', action='store_true',
+                        help='Report on stderr the wall and CPU time of each phase (walk, filter, stat, read, decode, '
+                             'format, write, clipboard), the directories visited, files skipped per rule, bytes read, '
+                             'decode failures and the slowest files')
+    parser.add_argument('--slowest', type=int, metavar='N',
+                        help=f'With --stats, list the N slowest files (default: {DEFAULT_SLOWEST})')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Run under cProfile and write the profile to FILE, to be read with `python -m pstats FILE`; '
+                             'with --jobs, reader threads are not profiled')
+    chunk_group = parser.add_mutually_exclusive_group()
+    chunk_group.add_argument('--chunk-bytes', type=int, metavar='N',
+                             help='Split the output into numbered files (FILE.001.ext, ...) of at most N bytes each; requires --output')
+    chunk_group.add_argument('--chunk-tokens', type=int, metavar='N',
+                             help='Split the output into numbered files of at most N tokens each; requires --output')
     
-    # List of allowed filenames without extensions
-    allowed_filenames = {
-        # General
-        'readme', 'license', 'dockerfile', 'makefile', '.gitignore', '.dockerignore',
-        '.editorconfig', '.env', 'requirements.txt', 'package.json', 'tsconfig.json',
-        # Python
-        'setup.py', 'setup.cfg', 'pyproject.toml', 'pipfile', 'manifest.in',
-        '.pylintrc', '.flake8', 'pytest.ini', 'tox.ini',
-        # C/C++
-        'makefile', 'cmakelist.txt', 'cmakelist.txt',
-        # Julia
-        'project.toml', 'manifest.toml', 'juliaconfig.toml',
-        # JavaScript/TypeScript
-        '.npmignore', '.babelrc', '.eslintrc', '.prettierrc', 
-        'tslint.json', 'webpack.config.js', 'package-lock.json', 'yarn.lock',
-        # Ruby
-        'gemfile', 'rakefile',
-        # PHP
-        'composer.json', 'composer.lock',
-        # Go
-        'go.mod', 'go.sum',
-        # Rust
-        'cargo.toml', 'cargo.lock',
-        # .NET
-        'packages.config', 'nuget.config',
-        # Java
-        'pom.xml', 'build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts',
-        # Docker
-        'docker-compose.yml', 'docker-compose.yaml',
-        # Git
-        '.gitattributes',
-        # CI/CD
-        '.travis.yml', '.gitlab-ci.yml', 'jenkins.file', 'azure-pipelines.yml',
-        # Editor/IDE
-        '.vscode', '.idea',
-        # Elm
-        'elm.json',
-        # F#
-        'paket.dependencies', 'paket.lock',
-        # Elixir
-        'mix.exs', 'mix.lock',
-        # Erlang
-        'rebar.config',
-        # MATLAB/Octave
-        '.octaverc',
-        # Scala
-        'build.sbt',
-        # Terraform
-        '.terraform.lock.hcl',
-        # Ansible
-        'ansible.cfg', 'hosts',
-        # LaTeX
-        'latexmkrc',
-    }
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    chunk_limit = args.chunk_bytes if args.chunk_bytes is not None else args.chunk_tokens
+    if chunk_limit is not None:
+        if not args.output:
+            parser.error('--chunk-bytes and --chunk-tokens require --output')
+        if chunk_limit < 1:
+            parser.error('chunk limits must be at least 1')
+    if args.watch:
+        if not args.output:
+            parser.error('--watch requires --output')
+        if os.path.isfile(args.directory) or not os.path.isdir(args.directory):
+            parser.error('--watch requires a directory')
+        for flag, value in (('--list-only', args.list_only), ('--since', args.since), ('--manifest', args.manifest),
+                            ('--max-tokens', args.max_tokens), ('--max-total-size', args.max_total_size),
+                            ('--dedup', args.dedup), ('--chunk-bytes/--chunk-tokens', chunk_limit),
+                            ('--rev', args.rev), ('--format', args.format != 'text')):
+            if value:
+                parser.error(f"{flag} is not supported with --watch")
+    if args.poll_interval is not None and (not args.watch or args.poll_interval <= 0):
+        parser.error('--poll-interval requires --watch and must be positive')
+    if args.stats and args.watch:
+        parser.error('--stats is not supported with --watch')
+    if args.slowest is not None and (not args.stats or args.slowest < 0):
+        parser.error('--slowest requires --stats and must not be negative')
+    if os.path.isfile(args.directory):
+        if args.rev is not None:
+            parser.error('--rev requires a directory in a git repository')
+        if not is_archive(args.directory):
+            parser.error(f"'{args.directory}' is neither a directory nor a zip or tar archive")
+    if args.rev is not None or os.path.isfile(args.directory):
+        source = 'archives' if args.rev is None else '--rev'
+        for flag, value in (('--since', args.since), ('--manifest', args.manifest), ('--dedup', args.dedup)):
+            if value:
+                parser.error(f"{flag} is not supported for {source}")
+    if args.rev is not None:
+        try:
+            resolve_revision(args.directory, args.rev)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read revision '{args.rev}': {e}")
+    if args.output and not os.path.isdir(os.path.dirname(args.output) or '.'):
+        parser.error(f"cannot write '{args.output}': directory '{os.path.dirname(args.output)}' does not exist")
+    if args.output and compression_for(args.output):
+        try:
+            check_available(compression_for(args.output))
+        except ImportError as e:
+            parser.error(f"cannot compress '{args.output}': {e}")
+    if args.format != 'text':
+        if args.format == 'binary' and not args.output:
+            parser.error('--format binary requires --output')
+        for flag, value in (('--list-only', args.list_only), ('--max-tokens', args.max_tokens),
+                            ('--dedup', args.dedup), ('--chunk-bytes/--chunk-tokens', chunk_limit)):
+            if value:
+                parser.error(f"{flag} is only supported with --format text")
     
-    # Directories to skip
-    skip_directories = {
-        '__pycache__', 'node_modules', 'venv', 'env', '.venv', '.env',
-        'build', 'dist', 'target', 'out', 'bin', 'obj',
-        '.git', '.svn', '.hg',  # Version control directories
-        '.idea', '.vscode',  # IDE directories
-        'logs',  # Log directories
-        'output',  # Output directories
-    }
+    options = {'jobs': args.jobs, 'use_ignore_files': not args.no_ignore}
+    if args.rev is not None:
+        options['rev'] = args.rev
+    if args.since:
+        try:
+            options['since'] = load_manifest(args.since)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load manifest '{args.since}': {e}")
+    if args.manifest:
+        options['manifest'] = {}
+    estimator = None
+    if args.max_tokens is not None or args.chunk_tokens is not None:
+        try:
+            estimator = get_estimator(args.tokenizer)
+        except ImportError as e:
+            parser.error(f"tokenizer '{args.tokenizer}' is not available: {e}")
+    if chunk_limit is not None:
+        minimum = min_limit(args.directory, estimator.count if args.chunk_tokens is not None else byte_length)
+        if chunk_limit < minimum:
+            parser.error(f"chunk limit {chunk_limit} is too small for the chunk index (at least {minimum} needed)")
+    if args.max_tokens is not None:
+        if args.max_tokens < 1:
+            parser.error('--max-tokens must be at least 1')
+        options['budget'] = TokenBudget(args.max_tokens, estimator)
+    if args.dedup:
+        options['dedup'] = Deduplicator()
+    if (args.max_file_size is not None or args.max_total_size is not None) and not args.watch:
+        options['caps'] = SizeCaps(args.max_file_size, args.max_total_size)
     
-    # Regex patterns for directories to skip
-    skip_directory_patterns = [
-        r'\.egg-info$',  # Matches directories ending with .egg-info
-    ]
+    if args.stats:
+        options['phases'] = PhaseStats(args.slowest if args.slowest is not None else DEFAULT_SLOWEST)
     
-    # Regex patterns for files to skip
-    skip_patterns = [
-        r'\.log(\.[0-9]+)?$',  # Matches .log, .log.1, .log.2, etc.
-        r'^log\.',  # Matches log.txt, log.old, etc.
-        r'\.bak$',
-        r'\.tmp$',
-        r'\.temp$',
-        r'\.swp$',
-        r'~$',
-    ]
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = ContentCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+        options['cache'] = cache
     
-    if os.path.isdir(path):
-        return (name in skip_directories or
-                any(re.search(pattern, name) for pattern in skip_directory_patterns))
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        if args.stats:
+            options['phases'].start()
+        if profiler is not None:
+            profiler.enable()
+        run_dump(args, options, estimator)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to '{args.profile}'.", file=sys.stderr)
+        if args.stats:
+            options['phases'].stop()
+        if cache is not None:
+            stats = cache.stats()
+            cache.close()
+            print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+                  f"{stats['entries']} entries ({stats['bytes']} bytes)", file=sys.stderr)
     
-    # Check if the file matches any skip patterns
-    if any(re.search(pattern, name_lower) for pattern in skip_patterns):
-        return True
+    if args.max_tokens is not None:
+        print(options['budget'].report(), file=sys.stderr)
+    if 'caps' in options:
+        print(options['caps'].report(), file=sys.stderr)
+    if args.dedup:
+        dedup = options['dedup']
+        print(f"Dedup: {dedup.duplicates} duplicate files ({dedup.bytes_saved} bytes) replaced by references",
+              file=sys.stderr)
     
-    return (
-        (name.startswith('.') and name_lower not in allowed_filenames) or
-        (extension.lower() not in allowed_extensions and name_lower not in allowed_filenames)
-    )
+    if args.manifest:
+        save_manifest(args.manifest, options['manifest'], root=args.directory)
+        print(f"Manifest of {len(options['manifest'])} files written to '{args.manifest}'.", file=sys.stderr)
+    if args.stats:
+        print(options['phases'].report(), file=sys.stderr)
 
-def concatenate_files(directory='.', list_only=False):
-    """Recursively concatenate all files in the directory and subdirectories with annotations and return as a string."""
-    output = []
-    for root, dirs, files in os.walk(directory):
-        # Remove directories that should be skipped
-        dirs[:] = [d for d in dirs if not should_skip(os.path.join(root, d))]
+def run_dump(args, options, estimator=None):
+    """Write the dump described by the parsed command line arguments.
 
-        for file in files:
-            if should_skip(file):
-                continue
-            
-            file_path = os.path.join(root, file)
-            file_info = get_file_info(file_path)
-            
-            if list_only:
-                output.append(f"{file_path}")
+    ``options`` are passed on to ``iter_dump``; ``estimator`` measures
+    chunks for ``--chunk-tokens``.
+    """
+    mmap_threshold = args.mmap_threshold * 1024 * 1024 if args.mmap_threshold > 0 else None
+
+    if args.watch:
+        watch_dump(args.output, args.directory, jobs=args.jobs, cache=options.get('cache'),
+                   use_ignore_files=not args.no_ignore, max_file_size=args.max_file_size,
+                   poll_interval=args.poll_interval)
+        return
+
+    if args.format != 'text':
+        # Structured output is for other programs, so it is never copied to the clipboard
+        options = {key: value for key, value in options.items() if key != 'cache'}
+        if args.output:
+            try:
+                if args.format == 'binary':
+                    out = open_output(args.output, 'wb')
+                else:
+                    out = open_output(args.output, 'w', encoding='utf-8', errors='surrogateescape')
+            except OSError as e:
+                sys.exit(f"codedump: cannot write '{args.output}': {e}")
+            with out:
+                count = write_records(out, args.format, args.directory, **options)
+            print(f"Output for directory '{args.directory}' has been written to '{args.output}' ({count} records).")
+        else:
+            write_records(sys.stdout, args.format, args.directory, **options)
+        return
+
+    if args.chunk_bytes is not None or args.chunk_tokens is not None:
+        try:
+            if args.chunk_bytes is not None:
+                paths = write_shards(args.output, args.chunk_bytes, args.directory, args.list_only, **options)
             else:
-                output.append(f"\n\n{'=' * 80}")
-                output.append(f"File: {file_path}")
-                output.append(f"Size: {file_info['size']} bytes")
-                output.append(f"Last Modified: {file_info['last_modified']}")
-                output.append('=' * 80 + '\n')
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        output.append(content)
-                except Exception as e:
-                    output.append(f"Error reading file: {str(e)}")
+                paths = write_shards(args.output, args.chunk_tokens, args.directory, args.list_only,
+                                     measure=estimator.count, **options)
+        except ValueError as e:
+            # A file deeper in the tree has an index entry too long for the limit
+            sys.exit(f"codedump: {e}; no chunks written")
+        except OSError as e:
+            sys.exit(f"codedump: cannot write chunk: {e}; no chunks written")
+        if paths:
+            print(f"Output for directory '{args.directory}' has been written to {len(paths)} chunks "
+                  f"({paths[0]} to {paths[-1]}).")
+        else:
+            print(f"No files found in directory '{args.directory}'; no chunks written.")
+        return
     
-    return '\n'.join(output)
-
-def main():
-    parser = argparse.ArgumentParser(description='Concatenate files in a directory.')
-    parser.add_argument('directory', nargs='?', default='.', help='Directory to process (default: current directory)')
-    parser.add_argument('-l', '--list-only', action='store_true', help='Only list file paths without content')
+    if args.output:
+        try:
+            out = open_output(args.output, 'w', encoding='utf-8')
+        except OSError as e:
+            sys.exit(f"codedump: cannot write '{args.output}': {e}")
+        with out:
+            write_dump(out, args.directory, args.list_only, mmap_threshold=mmap_threshold, **options)
+            out.write('\n')
+        print(f"Output for directory '{args.directory}' has been written to '{args.output}'.")
+        return
     
-    args = parser.parse_args()
+    if args.no_clipboard:
+        write_dump(sys.stdout, args.directory, args.list_only, mmap_threshold=mmap_threshold, **options)
+        sys.stdout.write('\n')
+        return
     
-    result = concatenate_files(args.directory, args.list_only)
-    print(result)
-    pyperclip.copy(result)
+    # The clipboard needs the whole dump, so keep a copy while streaming to stdout
+    phases = options.get('phases')
+    sections = []
+    for section in iter_dump(args.directory, args.list_only, **options):
+        with timer(phases, 'write'):
+            if sections:
+                sys.stdout.write('\n')
+            sys.stdout.write(section)
+        sections.append(section)
+    sys.stdout.write('\n')
+    with timer(phases, 'clipboard'):
+        pyperclip.copy('\n'.join(sections))
     print(f"\nOutput for directory '{args.directory}' has been copied to clipboard.")
 
 if __name__ == '__main__':
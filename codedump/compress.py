@@ -0,0 +1,141 @@
+import gzip
+import io
+import os
+import queue
+import threading
+
+# Compression chosen from the extension of an output file; zstd needs the
+# ``zstandard`` package
+COMPRESSED_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+
+# Default compression levels (gzip: 1-9, zstd: 1-22)
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+
+# Uncompressed data is handed to the compression thread in chunks of at most
+# this size, with at most QUEUE_CHUNKS of them waiting
+CHUNK_SIZE = 1024 * 1024
+QUEUE_CHUNKS = 8
+
+def compression_for(path):
+    """Return the compression ('gzip' or 'zstd') implied by the extension of ``path``, or None."""
+    return COMPRESSED_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+def strip_compression(path):
+    """Return ``path`` without a compression extension (dump.jsonl.gz -> dump.jsonl)."""
+    root, ext = os.path.splitext(path)
+    return root if ext.lower() in COMPRESSED_SUFFIXES else path
+
+def check_available(kind):
+    """Raise ImportError if the module for compression ``kind`` is not installed."""
+    if kind == 'zstd':
+        import zstandard  # noqa: F401
+
+def _open_compressor(kind, f, level):
+    if level is None:
+        level = DEFAULT_LEVELS[kind]
+    if kind == 'gzip':
+        # A fixed timestamp keeps the output reproducible
+        return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=level, mtime=0)
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).stream_writer(f)
+
+class CompressedWriter(io.RawIOBase):
+    """Binary file that compresses everything written to it on a background thread.
+
+    ``write`` copies the data into chunks and queues them; a worker thread
+    compresses them into ``path`` in order, so compression overlaps with
+    reading the files being dumped. The queue is bounded, so memory stays
+    constant when compression is the bottleneck. Errors on the worker are
+    raised by the next ``write`` or by ``close``.
+    """
+
+    def __init__(self, path, kind='gzip', level=None):
+        super().__init__()
+        self._file = open(path, 'wb')
+        try:
+            self._compressor = _open_compressor(kind, self._file, level)
+        except BaseException:
+            self._file.close()
+            raise
+        self._queue = queue.Queue(QUEUE_CHUNKS)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='codedump-compress', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            # After an error, keep draining the queue so writers never block
+            if self._error is None:
+                try:
+                    self._compressor.write(data)
+                except BaseException as e:
+                    self._error = e
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._check()
+        # The caller may reuse the buffer (or unmap it), so queue copies
+        with memoryview(data) as view, view.cast('B') as chunks:
+            for start in range(0, len(chunks), CHUNK_SIZE):
+                self._queue.put(chunks[start:start + CHUNK_SIZE].tobytes())
+            return len(chunks)
+
+    def flush(self):
+        # Data is compressed as it arrives; everything is written by close
+        pass
+
+    def close(self):
+        """Wait for the queued data to be compressed and close the file."""
+        if self.closed:
+            return
+        try:
+            self._queue.put(None)
+            self._thread.join()
+            if self._error is None:
+                self._compressor.close()
+        finally:
+            self._file.close()
+            super().close()
+        self._check()
+
+def open_output(path, mode='w', level=None, **kwargs):
+    """Open ``path`` for writing, compressing on a background thread if it ends in .gz or .zst.
+
+    ``mode`` is 'w' (text; ``kwargs`` are passed to ``io.TextIOWrapper``, as
+    to ``open``) or 'wb'. Other paths are opened with ``open``. The data read
+    back after decompression is exactly what was written.
+    """
+    kind = compression_for(path)
+    if kind is None:
+        return open(path, mode, **kwargs)
+    buffered = io.BufferedWriter(CompressedWriter(path, kind, level), CHUNK_SIZE)
+    if 'b' in mode:
+        return buffered
+    return io.TextIOWrapper(buffered, **kwargs)
+
+def open_input(path, mode='r', **kwargs):
+    """Open a possibly compressed file for reading, choosing the codec from its extension.
+
+    ``mode`` is 'r' (text; ``kwargs`` are passed to ``io.TextIOWrapper``) or
+    'rb'. Binary streams support ``peek``.
+    """
+    kind = compression_for(path)
+    if kind == 'gzip':
+        binary = gzip.open(path, 'rb')
+    elif kind == 'zstd':
+        import zstandard
+        binary = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')), CHUNK_SIZE)
+    else:
+        return open(path, mode, **kwargs)
+    if 'b' in mode:
+        return binary
+    return io.TextIOWrapper(binary, **kwargs)
@@ -0,0 +1,450 @@
+import argparse
+import collections
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from codedump.cache import is_racy
+from codedump.client import default_socket_path
+from codedump.codedump import DEFAULT_FILTER, format_header, map_ordered, read_file
+from codedump.ignore import IGNORE_FILENAMES, IgnoreMatcher
+from codedump.limits import parse_size
+
+# Default upper bound on the decoded content kept in memory
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Seconds a client may take to send its request or to read the reply
+CLIENT_TIMEOUT = 60.0
+
+# Longest request line accepted (bytes)
+MAX_REQUEST = 1024 * 1024
+
+class MemoryCache:
+    """Decoded file contents and ``get_file_info`` metadata kept in memory.
+
+    The in-memory counterpart of ``ContentCache``, with the same ``get`` and
+    ``put`` interface so it can be passed to ``read_file``: entries are keyed
+    by absolute path and only served while the file's size and
+    ``st_mtime_ns`` still match. Once the entries take more than
+    ``max_bytes`` (as counted by ``sys.getsizeof``), the least recently used
+    ones are evicted. Safe to share between reader threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_LIMIT):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Path -> (size, mtime_ns, file_info, content, nbytes), least recently used first
+        self._entries = collections.OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, file_path, stats):
+        """Return ``(file_info, content)`` if the cached entry is still valid, else None."""
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or entry[0] != stats.st_size or entry[1] != stats.st_mtime_ns:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(file_path)
+            return entry[2], entry[3]
+
+    def put(self, file_path, stats, file_info, content):
+        """Store the decoded content of a file read with the given ``stats``."""
+        if is_racy(stats.st_mtime_ns):
+            return
+        nbytes = sys.getsizeof(content)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old is not None:
+                self._total_bytes -= old[4]
+            self._entries[file_path] = (stats.st_size, stats.st_mtime_ns, file_info, content, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted[4]
+                self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current cache size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+            }
+
+class TreeIndex:
+    """Filtered directory listings, kept between requests and revalidated by mtime.
+
+    Each directory's listing is reduced to the files and subdirectories that
+    pass ``file_filter`` (the ``should_skip`` rules), plus the ignore files it
+    holds. A listing is reused while the directory's ``st_mtime_ns`` is
+    unchanged, which is the case until an entry is added, removed or renamed
+    in it; directories modified within the filesystem's timestamp
+    granularity are listed again on every walk. Ignore files are applied
+    when walking, with one ``IgnoreMatcher`` per requested root, and their
+    rules are reloaded when an ignore file changes.
+    """
+
+    def __init__(self, file_filter=None, use_ignore_files=True):
+        self.file_filter = file_filter if file_filter is not None else DEFAULT_FILTER
+        self.use_ignore_files = use_ignore_files
+        self.scans = 0
+        # Directory path -> (mtime_ns or None, files, subdirectories, ignore file names, their signature)
+        self._dirs = {}
+        # Root path -> IgnoreMatcher
+        self._matchers = {}
+
+    def __len__(self):
+        return len(self._dirs)
+
+    def _ignore_signature(self, dir_path, names):
+        signature = []
+        for name in names:
+            try:
+                stats = os.stat(os.path.join(dir_path, name))
+            except OSError:
+                continue
+            signature.append((name, stats.st_size, stats.st_mtime_ns))
+        return tuple(signature)
+
+    def _scan(self, dir_path, mtime_ns):
+        """List a directory the way ``os.walk`` does, keeping the names that pass the filter."""
+        files = []
+        subdirs = []
+        ignore_names = []
+        self.scans += 1
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # os.walk lists symlinked directories but does not descend into them
+                    if not entry.is_symlink() and not self.file_filter.skip_directory(entry.name):
+                        subdirs.append(entry.name)
+                    continue
+                if entry.name in IGNORE_FILENAMES:
+                    ignore_names.append(entry.name)
+                if not self.file_filter.skip_file(entry.name):
+                    files.append(entry.name)
+        if is_racy(mtime_ns):
+            # A change within the same timestamp tick would go unnoticed
+            mtime_ns = None
+        return mtime_ns, tuple(files), tuple(subdirs), tuple(ignore_names)
+
+    def _forget(self, dir_path):
+        """Drop the listings of ``dir_path`` and everything below it."""
+        prefix = dir_path.rstrip(os.sep) + os.sep
+        for key in [key for key in self._dirs if key == dir_path or key.startswith(prefix)]:
+            del self._dirs[key]
+
+    def listing(self, dir_path):
+        """Return ``(files, subdirectories, ignore file names)`` of a directory, or None if it cannot be read."""
+        old = self._dirs.get(dir_path)
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            if old is not None and old[0] == mtime_ns:
+                entry = old[:4]
+            else:
+                entry = self._scan(dir_path, mtime_ns)
+        except OSError:
+            self._forget(dir_path)
+            return None
+
+        _, files, subdirs, ignore_names = entry
+        signature = self._ignore_signature(dir_path, ignore_names)
+        if old is not None:
+            for name in set(old[2]) - set(subdirs):
+                self._forget(os.path.join(dir_path, name))
+            if signature != old[4]:
+                for matcher in self._matchers.values():
+                    matcher.forget(dir_path)
+        self._dirs[dir_path] = entry + (signature,)
+        return files, subdirs, ignore_names
+
+    def walk(self, root, shown_root):
+        """Yield ``(path, shown path)`` for every included file under ``root``, in ``walk_files`` order.
+
+        ``root`` is an absolute directory path; shown paths are built from
+        ``shown_root`` instead, as ``walk_files`` builds them from the
+        directory it is given.
+        """
+        matcher = None
+        if self.use_ignore_files:
+            matcher = self._matchers.get(root)
+            if matcher is None:
+                matcher = self._matchers[root] = IgnoreMatcher(root)
+
+        pending = [(root, shown_root)]
+        while pending:
+            dir_path, shown_dir = pending.pop()
+            listing = self.listing(dir_path)
+            if listing is None:
+                continue
+            files, subdirs, ignore_names = listing
+            if matcher is not None:
+                matcher.load(dir_path, ignore_names)
+            for name in files:
+                if matcher is None or not matcher.is_ignored(dir_path, name, False):
+                    yield os.path.join(dir_path, name), os.path.join(shown_dir, name)
+            # Depth first, in listing order, like os.walk
+            for name in reversed(subdirs):
+                if matcher is None or not matcher.is_ignored(dir_path, name, True):
+                    pending.append((os.path.join(dir_path, name), os.path.join(shown_dir, name)))
+
+class DumpServer:
+    """Serve dumps and file lists over a Unix domain socket from a warm index and cache.
+
+    The process stays up between requests, so the directory listings
+    (``TreeIndex``) and decoded file contents (``MemoryCache``, bounded by
+    ``memory_limit`` bytes) are reused; each request only stats the
+    directories and files it covers and re-reads the ones whose mtime or
+    size changed. The output is the same as ``codedump PATH --no-clipboard``
+    for each requested path, concatenated.
+
+    Each connection carries one request, a JSON line such as
+    ``{"op": "dump", "cwd": "/src", "paths": ["."]}`` (ops: 'dump', 'list',
+    'stats', 'stop'). The reply is a JSON line (``{"ok": true}``, or
+    ``{"ok": false, "error": ...}``) followed by the UTF-8 output until the
+    connection is closed. Requests are served one at a time.
+    """
+
+    def __init__(self, socket_path=None, memory_limit=DEFAULT_MEMORY_LIMIT, file_filter=None, jobs=1,
+                 use_ignore_files=True, log=sys.stderr):
+        self.socket_path = socket_path or default_socket_path()
+        self.file_filter = file_filter if file_filter is not None else DEFAULT_FILTER
+        self.jobs = jobs
+        self.log = log
+        self.index = TreeIndex(self.file_filter, use_ignore_files)
+        self.cache = MemoryCache(memory_limit)
+        self.requests = 0
+        self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _paths(self, paths, cwd):
+        """Resolve requested paths against the client's ``cwd``.
+
+        Raises:
+            ValueError: If a path does not exist
+        """
+        resolved = []
+        for path in paths:
+            full_path = os.path.normpath(os.path.join(cwd, path))
+            if not os.path.exists(full_path):
+                raise ValueError(f"'{path}' does not exist")
+            resolved.append((full_path, path))
+        return resolved
+
+    def _files(self, paths):
+        for full_path, shown_path in paths:
+            if os.path.isdir(full_path):
+                yield from self.index.walk(full_path, shown_path)
+            elif not self.file_filter.skip_file(os.path.basename(full_path)):
+                yield full_path, shown_path
+
+    def _read(self, item):
+        full_path, shown_path = item
+        try:
+            stats = os.stat(full_path)
+        except OSError:
+            # Deleted since the directory was listed
+            return None
+        file_info, content = read_file(full_path, self.cache, stats)
+        if content is None:
+            return None
+        return format_header(shown_path, file_info) + '\n' + content
+
+    def iter_sections(self, paths, cwd='.', list_only=False):
+        """Yield the sections of the dump of ``paths`` (file paths if ``list_only``).
+
+        Raises:
+            ValueError: If a path does not exist
+        """
+        files = self._files(self._paths(paths, cwd))
+        if list_only:
+            for _, shown_path in files:
+                yield shown_path
+            return
+        sections = map_ordered(self._read, files, self.jobs) if self.jobs > 1 else map(self._read, files)
+        for section in sections:
+            if section is not None:
+                yield section
+
+    def stats(self):
+        """Return the cache counters, the number of directories indexed and of requests served."""
+        return {**self.cache.stats(), 'memory_limit': self.cache.max_bytes, 'directories': len(self.index),
+                'directory_scans': self.index.scans, 'requests': self.requests}
+
+    def warm(self, paths):
+        """Index and read ``paths`` ahead of the first request; return the number of sections."""
+        return sum(1 for _ in self.iter_sections(paths, os.getcwd()))
+
+    def _reply(self, conn, reply):
+        conn.sendall(json.dumps(reply).encode('utf-8') + b'\n')
+
+    def handle(self, conn):
+        """Serve one connection; return False if the client asked the server to stop."""
+        conn.settimeout(CLIENT_TIMEOUT)
+        with conn.makefile('rb') as f:
+            line = f.readline(MAX_REQUEST)
+        try:
+            message = json.loads(line)
+            op = message.get('op')
+            if op not in ('dump', 'list', 'stats', 'stop'):
+                raise ValueError(f"unknown request {op!r}")
+            paths = message.get('paths') or ['.']
+            cwd = message.get('cwd', '/')
+            if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+                raise ValueError("'paths' must be a list of strings")
+            if not isinstance(cwd, str):
+                raise ValueError("'cwd' must be a string")
+        except (ValueError, AttributeError) as e:
+            self._reply(conn, {'ok': False, 'error': f"bad request: {e}"})
+            return True
+
+        self.requests += 1
+        if op == 'stop':
+            self._reply(conn, {'ok': True})
+            return False
+        if op == 'stats':
+            self._reply(conn, {'ok': True, 'stats': self.stats()})
+            return True
+
+        start = time.monotonic()
+        try:
+            sections = self.iter_sections(paths, cwd, op == 'list')
+            # Surface missing paths before the reply is committed to success
+            first = next(sections, None)
+        except ValueError as e:
+            self._reply(conn, {'ok': False, 'error': str(e)})
+            return True
+        self._reply(conn, {'ok': True})
+
+        count = 0
+        with conn.makefile('wb') as out:
+            if first is not None:
+                out.write(first.encode('utf-8', 'surrogateescape'))
+                count = 1
+            for section in sections:
+                out.write(b'\n' + section.encode('utf-8', 'surrogateescape'))
+                count += 1
+            out.write(b'\n')
+        print(f"{time.strftime('%H:%M:%S')} {op} {' '.join(paths)}: {count} sections in "
+              f"{(time.monotonic() - start) * 1000:.0f} ms", file=self.log)
+        return True
+
+    def bind(self):
+        """Listen on ``socket_path``, replacing a stale socket left by a server that died.
+
+        Raises:
+            OSError: If another server is listening on it
+        """
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise OSError(f"a server is already listening on '{self.socket_path}'")
+            finally:
+                probe.close()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the owner may connect
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(old_umask)
+        sock.listen(16)
+        self._sock = sock
+
+    def serve_forever(self):
+        """Accept and serve connections until a 'stop' request (or until interrupted)."""
+        if self._sock is None:
+            self.bind()
+        while True:
+            conn, _ = self._sock.accept()
+            with conn:
+                try:
+                    if not self.handle(conn):
+                        return
+                except OSError as e:
+                    # The client went away or stopped reading
+                    print(f"{time.strftime('%H:%M:%S')} connection dropped: {e}", file=self.log)
+                except Exception as e:
+                    # One bad request must not take the server down
+                    print(f"{time.strftime('%H:%M:%S')} request failed: {e!r}", file=self.log)
+                    try:
+                        self._reply(conn, {'ok': False, 'error': f"internal error: {e}"})
+                    except OSError:
+                        pass
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='codedump serve',
+                                     description='Keep file listings and contents in memory and serve dumps '
+                                                 'to codedump-client over a Unix domain socket.')
+    parser.add_argument('directories', nargs='*', metavar='DIRECTORY', help='Directories to index and read at startup')
+    parser.add_argument('--socket', default=default_socket_path(), metavar='PATH',
+                        help='Socket to listen on (default: %(default)s)')
+    parser.add_argument('--memory-limit', type=parse_size, default=DEFAULT_MEMORY_LIMIT, metavar='SIZE',
+                        help='Maximum size of the file contents kept in memory before LRU eviction, '
+                             'e.g. 512M (default: 256M)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N', help='Read changed files on N threads (default: 1)')
+    parser.add_argument('--no-ignore', action='store_true', help='Do not honour .gitignore, .ignore and .codedumpignore files')
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error(f"'{directory}' is not a directory")
+
+    # Stop cleanly (removing the socket) on SIGTERM as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with DumpServer(args.socket, args.memory_limit, jobs=args.jobs, use_ignore_files=not args.no_ignore) as server:
+        try:
+            server.bind()
+        except OSError as e:
+            parser.error(str(e))
+        if args.directories:
+            start = time.monotonic()
+            count = server.warm(args.directories)
+            print(f"Read {count} files in {time.monotonic() - start:.1f} s.", file=sys.stderr)
+        print(f"Serving on '{server.socket_path}' (memory limit {args.memory_limit} bytes), Ctrl+C to stop.",
+              file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
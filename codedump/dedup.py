@@ -0,0 +1,62 @@
+import os
+from codedump.manifest import hash_file
+
+class Deduplicator:
+    """Detect byte-identical files so later copies can be dumped as references.
+
+    Files are first grouped by size (``group_sizes``); only files that share
+    their size with another file are hashed. The hash covers the raw bytes
+    of the file (streamed with ``manifest.hash_file``) rather than the
+    decoded text, which BOM stripping and the latin-1 fallback can make
+    equal for different files. The first copy of each content is kept in
+    full and later copies are reported via ``first_copy``.
+    """
+
+    def __init__(self):
+        self._shared_sizes = None
+        # (size, digest) -> path of the first copy
+        self._first = {}
+        self.duplicates = 0
+        self.bytes_saved = 0
+
+    def group_sizes(self, paths):
+        """Stat ``paths`` and remember which sizes occur more than once; return the paths as a list."""
+        paths = list(paths)
+        seen = set()
+        shared = set()
+        for file_path in paths:
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                continue
+            if size in seen:
+                shared.add(size)
+            else:
+                seen.add(size)
+        self._shared_sizes = shared
+        return paths
+
+    def digest(self, file_path, size):
+        """Hash the bytes of a file if a file of ``size`` may have duplicates, else return None.
+
+        None is also returned if the file cannot be read.
+        """
+        if self._shared_sizes is not None and size not in self._shared_sizes:
+            return None
+        try:
+            return hash_file(file_path)
+        except OSError:
+            return None
+
+    def first_copy(self, file_path, size, digest):
+        """Return the path of an earlier identical file, or None if this is the first copy."""
+        if digest is None:
+            return None
+        key = (size, digest)
+        first = self._first.get(key)
+        if first is None:
+            self._first[key] = file_path
+            return None
+        self.duplicates += 1
+        self.bytes_saved += size
+        return first
@@ -0,0 +1,254 @@
+import collections
+import io
+import json
+import re
+import struct
+from codedump.compress import open_input
+
+# Output formats selectable with --format
+FORMATS = ('text', 'jsonl', 'binary')
+
+# Fields of a file record, in output order (see ``section_record``)
+RECORD_FIELDS = ('path', 'size', 'mtime', 'encoding', 'hash', 'content')
+
+# Binary format: MAGIC, then per section a RECORD_PREFIX (metadata and content
+# lengths), the metadata as UTF-8 JSON and the content as UTF-8; then an empty
+# RECORD_PREFIX ending the sections, an index of the section offsets, and a
+# FOOTER (index offset, section count, MAGIC)
+BINARY_MAGIC = b'CODEDMP1'
+RECORD_PREFIX = struct.Struct('>IQ')
+INDEX_ENTRY = struct.Struct('>Q')
+FOOTER = struct.Struct('>QQ8s')
+
+# Banner lines of the text format (see ``codedump.codedump.format_header``)
+BANNER = '=' * 80 + '\n'
+FILE_BANNER = re.compile(r'File: (.*)\nSize: (\d+) bytes\nLast Modified: (.*)\n$')
+REMOVED_BANNER = re.compile(r'Removed since last dump: \d+ files\n$')
+
+def section_record(section):
+    """Return the structured output record of a section.
+
+    ``section`` is a dict as returned by ``codedump.codedump.read_record``
+    or yielded by ``SectionStore.iter_sections``. The summary of removed
+    files (no path) becomes ``{'removed': [...]}``; 'error' and 'truncated'
+    are only included when set.
+    """
+    if section.get('path') is None:
+        return {'removed': section.get('removed', [])}
+    record = {}
+    for field in RECORD_FIELDS:
+        if field == 'mtime':
+            mtime_ns = section.get('mtime_ns')
+            record['mtime'] = mtime_ns / 1e9 if mtime_ns is not None else None
+        else:
+            record[field] = section.get(field)
+    if section.get('truncated'):
+        record['truncated'] = True
+    if section.get('error') is not None:
+        record['error'] = str(section['error'])
+    return record
+
+class JsonlWriter:
+    """Write one JSON object per section and line to a text stream."""
+
+    def __init__(self, out):
+        self.out = out
+        self.count = 0
+
+    def write(self, section):
+        self.out.write(json.dumps(section_record(section), ensure_ascii=False))
+        self.out.write('\n')
+        self.count += 1
+
+    def close(self):
+        return self.count
+
+class BinaryWriter:
+    """Write sections in the length-prefixed binary format to a binary stream.
+
+    Each section's metadata and content are prefixed with their lengths, so
+    a reader can skip over contents; the index written by ``close`` gives
+    every section's offset, so any section can be read with a single seek.
+    Only the offsets are kept in memory.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.out.write(BINARY_MAGIC)
+        self._position = len(BINARY_MAGIC)
+        self._offsets = []
+
+    @property
+    def count(self):
+        return len(self._offsets)
+
+    def write(self, section):
+        record = section_record(section)
+        content = (record.pop('content', None) or '').encode('utf-8', 'surrogateescape')
+        meta = json.dumps(record, ensure_ascii=False).encode('utf-8', 'surrogateescape')
+        self._offsets.append(self._position)
+        self.out.write(RECORD_PREFIX.pack(len(meta), len(content)))
+        self.out.write(meta)
+        self.out.write(content)
+        self._position += RECORD_PREFIX.size + len(meta) + len(content)
+
+    def close(self):
+        """Write the index and footer; return the number of sections."""
+        self.out.write(RECORD_PREFIX.pack(0, 0))
+        index_offset = self._position + RECORD_PREFIX.size
+        for offset in self._offsets:
+            self.out.write(INDEX_ENTRY.pack(offset))
+        self.out.write(FOOTER.pack(index_offset, len(self._offsets), BINARY_MAGIC))
+        return len(self._offsets)
+
+def _decode_record(meta, content):
+    record = json.loads(meta.decode('utf-8', 'surrogateescape'))
+    if content is not None and 'removed' not in record:
+        record['content'] = content.decode('utf-8', 'surrogateescape')
+    return record
+
+class BinaryReader:
+    """Random access to the sections of a dump in the binary format.
+
+    ``reader[i]`` returns the record of section ``i`` (with its content);
+    ``reader.meta(i)`` returns it without reading the content. The file must
+    support seeking from its end, so compressed dumps are read sequentially
+    with ``iter_binary`` instead.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        f.seek(0)
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError('Not a codedump binary dump')
+        f.seek(-FOOTER.size, 2)
+        index_offset, count, magic = FOOTER.unpack(f.read(FOOTER.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError('Truncated codedump binary dump (missing index)')
+        f.seek(index_offset)
+        data = f.read(count * INDEX_ENTRY.size)
+        self._offsets = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)[0] for i in range(count)]
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _read(self, index, with_content):
+        self.f.seek(self._offsets[index])
+        meta_len, content_len = RECORD_PREFIX.unpack(self.f.read(RECORD_PREFIX.size))
+        return _decode_record(self.f.read(meta_len), self.f.read(content_len) if with_content else None)
+
+    def meta(self, index):
+        return self._read(index, False)
+
+    def __getitem__(self, index):
+        return self._read(index, True)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+def open_writer(format, out):
+    """Return the writer for a structured ``format`` ('jsonl' or 'binary') on stream ``out``.
+
+    JSON Lines needs a text stream and the binary format a binary stream.
+    """
+    if format == 'jsonl':
+        return JsonlWriter(out)
+    if format == 'binary':
+        return BinaryWriter(out)
+    raise ValueError(f"Unknown structured format: {format}")
+
+def iter_binary(f):
+    """Yield the records of a binary dump from a stream, reading it sequentially."""
+    if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError('Not a codedump binary dump')
+    while True:
+        prefix = f.read(RECORD_PREFIX.size)
+        if len(prefix) < RECORD_PREFIX.size:
+            raise ValueError('Truncated codedump binary dump')
+        meta_len, content_len = RECORD_PREFIX.unpack(prefix)
+        if not meta_len:
+            return
+        yield _decode_record(f.read(meta_len), f.read(content_len))
+
+def iter_jsonl(f):
+    """Yield the records of a JSON Lines dump from a text stream."""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+def _match_banner(lines):
+    """Match the lines after an opening BANNER; return (record, lines used) or (None, 0)."""
+    if len(lines) >= 5 and lines[3] == BANNER and lines[4] == '\n':
+        match = FILE_BANNER.match(''.join(lines[:3]))
+        if match:
+            return {'path': match.group(1), 'size': int(match.group(2)), 'last_modified': match.group(3)}, 5
+    if len(lines) >= 3 and lines[1] == BANNER and lines[2] == '\n' and REMOVED_BANNER.match(lines[0]):
+        return {'path': None, 'removed': []}, 3
+    return None, 0
+
+def _finish_text_section(record, body, last):
+    # Sections are joined by a newline and the next one opens with two blank
+    # lines; the dump as a whole ends with a newline
+    text = ''.join(body)
+    trim = 1 if last else 3
+    text = text[:-trim] if text.endswith('\n' * trim) else text.rstrip('\n')
+    if record['path'] is None:
+        record['removed'] = text.split('\n') if text else []
+    else:
+        record['content'] = text
+    return record
+
+def iter_text_sections(f):
+    """Parse a text dump (as written by ``write_dump``) from a text stream into records.
+
+    File sections become ``{'path', 'size', 'last_modified', 'content'}``
+    and the summary of removed files ``{'path': None, 'removed': [...]}``.
+    Anything before the first section (such as a chunk index) is skipped,
+    so list-only dumps yield nothing. A file whose own content contains a
+    complete banner cannot be told apart from a new section.
+    """
+    lines = iter(f)
+    lookahead = collections.deque()
+    record = None
+    body = []
+    while True:
+        line = lookahead.popleft() if lookahead else next(lines, None)
+        if line is None:
+            break
+        # A section opens with two blank lines and a banner
+        if line == BANNER and body[-2:] == ['\n', '\n']:
+            while len(lookahead) < 5:
+                extra = next(lines, None)
+                if extra is None:
+                    break
+                lookahead.append(extra)
+            new_record, used = _match_banner(list(lookahead))
+            if new_record is not None:
+                for _ in range(used):
+                    lookahead.popleft()
+                if record is not None:
+                    yield _finish_text_section(record, body, False)
+                record, body = new_record, []
+                continue
+        body.append(line)
+    if record is not None:
+        yield _finish_text_section(record, body, True)
+
+def read_dump(path):
+    """Yield the records of a dump file in any format, compressed (.gz, .zst) or not.
+
+    The format is recognized from the first bytes: the binary magic, a JSON
+    object, or else the text format (see ``iter_text_sections``). Records of
+    binary and JSON Lines dumps are as written by ``section_record``.
+    """
+    with open_input(path, 'rb') as f:
+        head = f.peek(len(BINARY_MAGIC))[:len(BINARY_MAGIC)]
+        if head == BINARY_MAGIC:
+            yield from iter_binary(f)
+            return
+        text = io.TextIOWrapper(f, encoding='utf-8', errors='surrogateescape')
+        if head.lstrip().startswith(b'{'):
+            yield from iter_jsonl(text)
+        else:
+            yield from iter_text_sections(text)
@@ -0,0 +1,106 @@
+import io
+import os
+import subprocess
+import threading
+from codedump.archives import MemberStat, skip_member
+
+# File modes of tree entries that are not regular files (symlinks)
+SYMLINK_MODE = b'120000'
+
+def _git(directory, *args):
+    """Run a git command in ``directory`` and return its output.
+
+    Raises:
+        ValueError: If git reports an error (e.g. an unknown revision)
+        OSError: If git cannot be run
+    """
+    result = subprocess.run(['git', '-C', directory, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode:
+        message = result.stderr.decode('utf-8', 'replace').strip()
+        raise ValueError(message or f"git {args[0]} failed with status {result.returncode}")
+    return result.stdout
+
+def resolve_revision(directory, rev):
+    """Check that ``rev`` names a tree in the repository containing ``directory``.
+
+    Returns:
+        int: The commit time of ``rev`` (seconds since the epoch), or 0 when
+        it names a tree rather than a commit
+
+    Raises:
+        ValueError: If ``rev`` is unknown or ``directory`` is not in a git repository
+    """
+    _git(directory, 'rev-parse', '--verify', f'{rev}^{{tree}}')
+    try:
+        return int(_git(directory, 'show', '-s', '--format=%ct', f'{rev}^{{commit}}').strip() or 0)
+    except ValueError:
+        return 0
+
+def list_blobs(directory, rev, file_filter):
+    """List the files of ``rev`` under ``directory`` that pass ``file_filter``.
+
+    Names are relative to ``directory`` and in git's (sorted) order;
+    symlinks and submodules are left out.
+
+    Returns:
+        list: (name, object id, size) tuples
+    """
+    blobs = []
+    for entry in _git(directory, 'ls-tree', '-r', '-z', '--long', rev).split(b'\0'):
+        if not entry:
+            continue
+        info, path = entry.split(b'\t', 1)
+        mode, kind, oid, size = info.split()
+        if kind != b'blob' or mode == SYMLINK_MODE:
+            continue
+        name = os.fsdecode(path)
+        if not skip_member(name, file_filter):
+            blobs.append((name, oid, int(size)))
+    return blobs
+
+def iter_revision(directory, rev, file_filter):
+    """Yield ``(name, stats, file)`` for the files of ``rev`` under ``directory``, from git's object store.
+
+    The tree is listed with ``git ls-tree`` and filtered by name; the blobs
+    are then streamed from one ``git cat-file --batch`` process, fed on a
+    separate thread. Nothing is checked out and the working tree is never
+    read. ``stats`` carries the blob size and the commit time; ``file``
+    holds one blob at a time, so memory is bounded by the largest blob.
+
+    Raises:
+        ValueError: If git reports an error
+    """
+    mtime = resolve_revision(directory, rev)
+    blobs = list_blobs(directory, rev, file_filter)
+    if not blobs:
+        return
+
+    process = subprocess.Popen(['git', '-C', directory, 'cat-file', '--batch', '--buffer'],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed():
+        try:
+            for _, oid, _ in blobs:
+                process.stdin.write(oid + b'\n')
+            process.stdin.close()
+        except OSError:
+            # git exited early; the reader reports it
+            pass
+
+    feeder = threading.Thread(target=feed, name='codedump-git-feed', daemon=True)
+    feeder.start()
+    try:
+        for name, oid, size in blobs:
+            header = process.stdout.readline().split()
+            if len(header) != 3 or header[0] != oid:
+                raise ValueError(f"git cat-file returned {b' '.join(header).decode('ascii', 'replace')!r} for {name}")
+            data = process.stdout.read(int(header[2]))
+            # Each object is followed by a newline
+            process.stdout.read(1)
+            yield name, MemberStat(size, mtime, mtime * 10 ** 9), io.BytesIO(data)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+        feeder.join()
@@ -3,10 +3,41 @@ from tkinter import ttk
 from tkinter import filedialog
 import os
 import datetime
-from codedump.codedump import concatenate_files, should_skip, get_file_info
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from codedump.codedump import get_file_info, format_header, read_record, DEFAULT_FILTER, READ_ERROR_PREFIX
+from codedump.cache import ContentCache
+from codedump.compress import open_output, strip_compression
+from codedump.formats import open_writer
+from codedump.ignore import IgnoreMatcher
+from codedump.limits import SizeCaps, parse_size
+from codedump.mapped import MMAP_THRESHOLD, map_text
+from codedump.profiling import PhaseStats, timer
+from codedump.sections import SectionStore
+from codedump.sniff import read_excerpt, read_text
+from codedump.tree_model import ChangeMonitor, DirectoryScan, SelectionModel, iter_tree_entries
 import pyperclip
 from PIL import ImageTk, Image
 
+# How often (ms) the GUI drains the background scan queue, and for how long (s)
+SCAN_POLL_INTERVAL = 30
+SCAN_DRAIN_BUDGET = 0.05
+
+# How often (ms) the GUI applies the changes collected by the change monitor
+CHANGE_POLL_INTERVAL = 500
+
+# Beyond this many changed paths at once, a full refresh is cheaper than targeted updates
+FULL_REFRESH_THRESHOLD = 2000
+
+# Name of the dummy child that makes unloaded folders expandable
+PLACEHOLDER_NAME = '<loading>'
+
+# The preview only renders this many lines of the dump around the view, and
+# slides the window when the view gets within the margin of either edge
+PREVIEW_WINDOW_LINES = 2000
+PREVIEW_WINDOW_MARGIN = 500
+
 class CodeDumpApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -22,6 +53,44 @@ class CodeDumpApp(tk.Tk):
         self.status_var = tk.StringVar(value="Ready")
         self.selected_files = []
         
+        # Skip rules are compiled once and shared with the CLI
+        self.file_filter = DEFAULT_FILTER
+        self.ignore_matcher = None
+        
+        # Background folder scans in progress, keyed by folder path
+        self.active_scans = {}
+        
+        # File system changes are applied to the tree as they happen
+        self.auto_refresh = tk.BooleanVar(value=True)
+        self.change_monitor = None
+        
+        # Check state of the tree, including folders that are not loaded yet
+        self.selection = None
+        
+        # Optional on-disk content cache (opened on first use)
+        self.use_cache = tk.BooleanVar(value=False)
+        self.content_cache = None
+        
+        # Optional size caps (e.g. "200K", "10M"); empty means no limit
+        self.max_file_size = tk.StringVar(value="")
+        self.max_total_size = tk.StringVar(value="")
+        
+        # Sections of the last dump; the preview renders a window of them
+        # when showing the dump (preview_store is None for plain text)
+        self.dump_sections = SectionStore()
+        self.preview_store = None
+        self.preview_window = (0, 0)
+        self.preview_shift_pending = False
+        
+        # Sections whose file changed since the dump was generated, sections
+        # edited by hand (never re-read), and re-reads in progress
+        self.stale_sections = set()
+        self.edited_sections = set()
+        self.section_reader = None
+        self.pending_sections = []
+        self.dump_generation = 0
+        self.dump_max_file_size = None
+        
         # Load icons
         self.load_icons()
         
@@ -159,6 +228,24 @@ class CodeDumpApp(tk.Tk):
         )
         refresh_button.pack(side=tk.LEFT, padx=5)
         
+        # Auto-refresh toggle
+        auto_refresh_check = ttk.Checkbutton(
+            top_frame,
+            text="Auto Refresh",
+            variable=self.auto_refresh,
+            command=self.toggle_auto_refresh
+        )
+        auto_refresh_check.pack(side=tk.LEFT, padx=5)
+        
+        # Cancel button for long directory scans
+        self.cancel_scan_button = ttk.Button(
+            top_frame,
+            text="Cancel Loading",
+            command=self.cancel_directory_scan,
+            state='disabled'
+        )
+        self.cancel_scan_button.pack(side=tk.LEFT, padx=5)
+        
         # Directory path label
         dir_label = ttk.Label(
             top_frame,
@@ -221,6 +308,7 @@ class CodeDumpApp(tk.Tk):
         
         # Bind events
         self.tree.bind("<Button-1>", self.toggle_check)
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
         
         # Scrollbars
         vsb = ttk.Scrollbar(parent, orient="vertical", command=self.tree.yview)
@@ -282,14 +370,20 @@ class CodeDumpApp(tk.Tk):
         # Text widget for preview
         self.preview_text = tk.Text(parent, wrap=tk.NONE, state='disabled')
         
-        # Scrollbars
-        y_scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.preview_text.yview)
+        # Scrollbars; the vertical one spans the whole dump, not just the rendered window
+        self.preview_y_scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.on_preview_scrollbar)
         x_scrollbar = ttk.Scrollbar(parent, orient="horizontal", command=self.preview_text.xview)
-        self.preview_text.configure(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+        self.preview_text.configure(yscrollcommand=self.on_preview_yview, xscrollcommand=x_scrollbar.set)
+        
+        # Tags for styling
+        self.preview_text.tag_configure("header", foreground="blue", font=("Courier", 10, "bold"))
+        self.preview_text.tag_configure("content", foreground="black")
+        self.preview_text.tag_configure("error", foreground="red")
+        self.preview_text.tag_configure("stale", foreground="darkorange", font=("Courier", 10, "bold"))
         
         # Layout
         self.preview_text.grid(row=0, column=0, sticky='nsew')
-        y_scrollbar.grid(row=0, column=1, sticky='ns')
+        self.preview_y_scrollbar.grid(row=0, column=1, sticky='ns')
         x_scrollbar.grid(row=1, column=0, sticky='ew')
         
         # Configure weights
@@ -324,6 +418,28 @@ class CodeDumpApp(tk.Tk):
             command=self.copy_to_clipboard
         )
         copy_button.pack(side=tk.LEFT, padx=5)
+        
+        # Export button
+        export_button = ttk.Button(
+            bottom_frame,
+            text="Export...",
+            command=self.export_dump
+        )
+        export_button.pack(side=tk.LEFT, padx=5)
+        
+        # Cache toggle
+        cache_check = ttk.Checkbutton(
+            bottom_frame,
+            text="Use Cache",
+            variable=self.use_cache
+        )
+        cache_check.pack(side=tk.LEFT, padx=5)
+        
+        # Size caps
+        ttk.Label(bottom_frame, text="Max file:").pack(side=tk.LEFT, padx=(10, 2))
+        ttk.Entry(bottom_frame, textvariable=self.max_file_size, width=7).pack(side=tk.LEFT)
+        ttk.Label(bottom_frame, text="Max total:").pack(side=tk.LEFT, padx=(10, 2))
+        ttk.Entry(bottom_frame, textvariable=self.max_total_size, width=7).pack(side=tk.LEFT)
     
     def create_status_bar(self):
         """Create the status bar"""
@@ -351,6 +467,9 @@ class CodeDumpApp(tk.Tk):
             self.status_var.set("Loading directory...")
             self.update_idletasks()
             
+            # Stop any scans of the previous directory
+            self.cancel_directory_scan(quiet=True)
+            
             # Clear the treeview
             for item in self.tree.get_children():
                 self.tree.delete(item)
@@ -359,89 +478,198 @@ class CodeDumpApp(tk.Tk):
             self.file_listbox.delete(0, tk.END)
             
             # Clear the preview text area
-            self.preview_text.config(state='normal')
-            self.preview_text.delete(1.0, tk.END)
-            self.preview_text.config(state='disabled')
+            self.show_preview_text("")
             
             # Clear selected files list and dump content
             self.selected_files = []
             self.dump_content = ""
             
             # Populate the treeview with the selected directory
-            # Create root node for the directory
-            root_dir = os.path.basename(directory)
-            if not root_dir:  # If it's the root directory
-                root_dir = directory
-                
-            root_node = self.tree.insert('', 'end', iid=directory, 
-                                        text=f"☐ {root_dir}",
-                                        tags=('unchecked', 'folder'), 
-                                        open=True,
-                                        image=self.folder_icon if self.use_icons else '')
+            self.selection = SelectionModel(directory)
+            self.ignore_matcher = IgnoreMatcher(directory)
+            self.insert_root_node(directory)
             
-            # Populate starting from the root node
-            self.populate_treeview(directory, parent_node=root_node)
+            # Scan the top level in the background; folders load when expanded
+            self.start_directory_scan(directory)
             
-            # Update status
-            self.status_var.set(f"Directory loaded: {os.path.basename(directory)}")
+            # Follow changes to the directory from now on
+            self.start_change_monitor(directory)
         else:
             self.status_var.set("Ready")
     
-    def populate_treeview(self, directory_path, parent_node=''):
-        """Fill the treeview with directory structure using os.scandir for efficiency
+    def insert_root_node(self, directory):
+        """Create the (open) root node for the selected directory"""
+        root_dir = os.path.basename(directory)
+        if not root_dir:  # If it's the root directory
+            root_dir = directory
+        
+        state = 'checked' if self.selection.is_checked(directory) else 'unchecked'
+        symbol = '☑' if state == 'checked' else '☐'
+        self.tree.insert('', 'end', iid=directory, 
+                         text=f"{symbol} {root_dir}",
+                         tags=(state, 'folder'), 
+                         open=True,
+                         image=self.folder_icon if self.use_icons else '')
+    
+    def start_directory_scan(self, directory, on_complete=None):
+        """Scan one folder level on a worker thread and populate the tree incrementally
         
         Args:
-            directory_path: Path to the directory to populate
-            parent_node: Parent node ID in the treeview (default: root)
+            directory: Folder to scan; its node must already exist in the tree
+            on_complete: Optional callback run once the scan has finished
         """
-        try:
-            # Iterate over items in the directory using os.scandir (more efficient)
-            for item in os.scandir(directory_path):
-                # Get full path
-                item_path = item.path
-                
-                # Skip items that should be filtered out
-                if should_skip(item_path):
-                    continue
-                
-                # Determine icon to use based on whether it's a directory
-                if item.is_dir():
-                    icon = self.folder_icon if self.use_icons else ''
-                    tags = ('unchecked', 'folder')
-                else:
-                    icon = self.file_icon if self.use_icons else ''
-                    tags = ('unchecked', 'file')
-                
-                # Insert item into treeview with checkbox symbol
-                node_id = item_path
-                node = self.tree.insert(
-                    parent_node, 'end', iid=node_id, 
-                    text=f"☐ {item.name}",
-                    tags=tags, open=False,
-                    image=icon
-                )
-                
-                # Recursively process subdirectories
-                if item.is_dir():
-                    self.populate_treeview(item_path, parent_node=node_id)
-                    
-        except PermissionError:
-            # Handle permission errors
-            error_id = f"{directory_path}_error_perm"
-            self.tree.insert(parent_node, 'end', iid=error_id, 
-                            text="Access Denied (Permission Error)")
-        except Exception as e:
-            # Handle other errors
-            error_id = f"{directory_path}_error_general"
-            self.tree.insert(parent_node, 'end', iid=error_id, 
-                            text=f"Error: {str(e)}")
+        # Rescanning a folder replaces any scan of it still in progress
+        previous = self.active_scans.pop(directory, None)
+        if previous is not None:
+            previous.cancel()
+        
+        self.selection.mark_loaded(directory)
+        
+        scan = DirectoryScan(directory, self.file_filter, self.ignore_matcher, recursive=False)
+        self.active_scans[directory] = scan
+        self.cancel_scan_button.config(state='normal')
+        scan.start()
+        
+        self.after(SCAN_POLL_INTERVAL, lambda: self.drain_directory_scan(scan, on_complete))
+    
+    def drain_directory_scan(self, scan, on_complete=None):
+        """Insert entries produced by a background scan, then reschedule itself
+        
+        Args:
+            scan: The DirectoryScan being drained
+            on_complete: Optional callback run once the scan has finished
+        """
+        # Ignore scans that were cancelled or replaced
+        if self.active_scans.get(scan.directory) is not scan:
+            return
+        
+        for kind, parent, path, name in scan.drain(SCAN_DRAIN_BUDGET):
+            self.insert_tree_entry(kind, parent, path, name)
+        
+        if not scan.done:
+            self.status_var.set(f"Loading {os.path.basename(scan.directory)}... {scan.count} items")
+            self.after(SCAN_POLL_INTERVAL, lambda: self.drain_directory_scan(scan, on_complete))
+            return
+        
+        # Scan finished
+        del self.active_scans[scan.directory]
+        if not self.active_scans:
+            self.cancel_scan_button.config(state='disabled')
+        if scan.error is not None:
+            self.status_var.set(f"Error loading directory: {str(scan.error)}")
+        else:
+            self.status_var.set(f"Loaded: {os.path.basename(scan.directory)} ({scan.count} items)")
+        
+        if on_complete:
+            on_complete()
+    
+    def cancel_directory_scan(self, quiet=False):
+        """Stop all background scans; partially loaded folders collapse and reload on expand
+        
+        Args:
+            quiet: Do not report the cancellation in the status bar
+        """
+        if not self.active_scans:
+            return
+        
+        loaded = 0
+        for directory, scan in list(self.active_scans.items()):
+            scan.cancel()
+            loaded += scan.count
+            self.reset_folder(directory)
+        self.active_scans.clear()
+        self.cancel_scan_button.config(state='disabled')
+        
+        if not quiet:
+            self.status_var.set(f"Loading cancelled: {loaded} items loaded")
+    
+    def reset_folder(self, directory):
+        """Drop the loaded children of a folder so it is scanned again when expanded"""
+        if self.selection is not None:
+            self.selection.unload(directory)
+        if not self.tree.exists(directory):
+            return
+        
+        for child_id in self.tree.get_children(directory):
+            self.tree.delete(child_id)
+        self.insert_placeholder(directory)
+        self.tree.item(directory, open=False)
+    
+    def insert_placeholder(self, folder_id):
+        """Give an unloaded folder a dummy child so it can be expanded"""
+        self.tree.insert(folder_id, 'end', iid=os.path.join(folder_id, PLACEHOLDER_NAME),
+                         text="Loading...", tags=('placeholder',))
+    
+    def on_tree_open(self, event):
+        """Load the children of a folder the first time it is expanded, or redraw them"""
+        item_id = self.tree.focus()
+        if not item_id or 'folder' not in self.tree.item(item_id, 'tags'):
+            return
+        
+        placeholder_id = os.path.join(item_id, PLACEHOLDER_NAME)
+        if self.tree.exists(placeholder_id):
+            self.tree.delete(placeholder_id)
+            self.start_directory_scan(item_id)
+        elif self.selection is not None and item_id in self.selection:
+            # Children were hidden while their folder was toggled; redraw them now
+            self.update_descendants_check_state(item_id, force=True)
+    
+    def insert_tree_entry(self, kind, parent, path, name):
+        """Insert one scanned entry into the treeview and the selection model
+        
+        Args:
+            kind: 'folder', 'file' or 'error'
+            parent: Parent node ID (the containing directory path)
+            path: Node ID (the entry path, or a unique id for errors)
+            name: Display name (the error message for errors)
+        """
+        # The parent may have been removed since the entry was scanned
+        if (parent and not self.tree.exists(parent)) or self.tree.exists(path):
+            return
+        
+        if kind == 'error':
+            self.tree.insert(parent, 'end', iid=path, text=name)
+            return
+        
+        # New entries take the check state of their folder (or a restored state)
+        self.selection.add(parent, path, kind == 'folder')
+        checked = self.selection.is_checked(path)
+        state = 'checked' if checked else 'unchecked'
+        symbol = '☑' if checked else '☐'
+        
+        # Determine icon to use based on whether it's a directory
+        if kind == 'folder':
+            icon = self.folder_icon if self.use_icons else ''
+        else:
+            icon = self.file_icon if self.use_icons else ''
+        
+        # Insert item into treeview with checkbox symbol
+        self.tree.insert(
+            parent, 'end', iid=path, 
+            text=f"{symbol} {name}",
+            tags=(state, kind), open=False,
+            image=icon
+        )
+        
+        # Folders are loaded lazily when expanded
+        if kind == 'folder':
+            self.insert_placeholder(path)
+    
+    def scan_folder_entries(self, folder_path):
+        """Return the (path, is_dir) descendants of a folder that is not loaded in the tree
+        
+        Args:
+            folder_path: Folder to scan recursively
+        """
+        entries = iter_tree_entries(folder_path, self.file_filter, self.ignore_matcher)
+        return [(path, kind == 'folder') for kind, _, path, _ in entries if kind != 'error']
     
     def toggle_check(self, event):
         """Handle clicking on tree items to toggle checkboxes
         
-        This detects clicks on tree items and toggles their checked/unchecked state,
-        updating both the visual representation and the underlying tags.
-        If the item is a folder, the state is applied recursively to all children.
+        This detects clicks on tree items and toggles their checked/unchecked state
+        in the selection model. If the item is a folder, the state applies to all
+        of its descendants; only the ones currently visible are redrawn.
         """
         # Identify clicked region and item
         region = self.tree.identify_region(event.x, event.y)
@@ -450,75 +678,61 @@ class CodeDumpApp(tk.Tk):
         # Only process valid clicks on text, icon, or tree item (not on empty space)
         if not item_id or region not in ('tree', 'cell', 'text', 'image'):
             return
-            
-        # Get item properties
-        tags = list(self.tree.item(item_id, 'tags'))
-        current_text = self.tree.item(item_id, 'text')
-        item_name = current_text[2:] if current_text.startswith(('☐', '☑')) else current_text
         
-        # Determine if this is a folder
-        is_folder = 'folder' in tags
-            
-        # Toggle check state
-        if 'checked' in tags:
-            # Change to unchecked
-            new_state = 'unchecked'
-            new_tags = [tag for tag in tags if tag != 'checked'] + ['unchecked']
-            new_text = f"☐ {item_name}"
-        else:
-            # Change to checked
-            new_state = 'checked'
-            new_tags = [tag for tag in tags if tag != 'unchecked'] + ['checked']
-            new_text = f"☑ {item_name}"
+        # Placeholders and error entries have no check box
+        if self.selection is None or item_id not in self.selection:
+            return
+        
+        # Toggle check state in the model
+        checked = not self.selection.is_checked(item_id)
+        self.selection.set_checked(item_id, checked)
         
         # Update item
-        self.tree.item(item_id, text=new_text, tags=new_tags)
+        self.set_check_display(item_id, checked)
         
-        # Apply to children if it's a folder
-        if is_folder:
-            self.update_descendants_check_state(item_id, new_state)
+        # Redraw visible children if it's a folder
+        if self.selection.get(item_id).is_dir:
+            self.update_descendants_check_state(item_id)
                 
         # Update selected files list
         self.update_selected_files()
     
-    def update_descendants_check_state(self, parent_id, state):
-        """Recursively update check state of all descendants
+    def set_check_display(self, item_id, checked):
+        """Show the check state of one item in the treeview
+        
+        Args:
+            item_id: ID of the node in the treeview
+            checked: Whether the item is checked
+        """
+        node = self.selection.get(item_id)
+        name = os.path.basename(item_id) if node.parent is not None else self.tree.item(item_id, 'text')[2:]
+        symbol = '☑' if checked else '☐'
+        type_tag = 'folder' if node.is_dir else 'file'
+        self.tree.item(item_id, text=f"{symbol} {name}", tags=(type_tag, 'checked' if checked else 'unchecked'))
+    
+    def update_descendants_check_state(self, parent_id, force=False):
+        """Redraw the check state of the visible descendants of a folder from the model
+        
+        Hidden descendants (inside collapsed folders) are left alone and redrawn
+        when their folder is opened, so the cost is proportional to what is visible.
         
         Args:
             parent_id: ID of the parent node in the treeview
-            state: New state to apply ('checked' or 'unchecked')
+            force: Redraw the children even if the folder is not open yet
         """
-        # Symbol to use based on state
-        symbol = '☑' if state == 'checked' else '☐'
+        if not force and not self.tree.item(parent_id, 'open'):
+            return
         
-        # Process all children
-        for child_id in self.tree.get_children(parent_id):
-            # Get child properties
-            child_tags = list(self.tree.item(child_id, 'tags'))
-            current_text = self.tree.item(child_id, 'text')
-            item_name = current_text[2:] if current_text.startswith(('☐', '☑')) else current_text
-            
-            # Determine type (preserve folder/file tag)
-            is_folder = 'folder' in child_tags
-            type_tag = 'folder' if is_folder else 'file'
-            
-            # Create new tags: keep type tag and add new state
-            new_tags = [type_tag, state]
-            
-            # Update text with appropriate symbol
-            new_text = f"{symbol} {item_name}"
-            
-            # Update the item
-            self.tree.item(child_id, text=new_text, tags=new_tags)
-            
-            # Recursively process children if this is a folder
-            if is_folder:
-                self.update_descendants_check_state(child_id, state)
+        def is_open(folder_id):
+            return bool(self.tree.item(folder_id, 'open'))
+        
+        for item_id, checked in self.selection.iter_states(parent_id, visible=is_open):
+            self.set_check_display(item_id, checked)
     
     def update_selected_files(self):
         """Update the selected files list based on checked items"""
-        # Get selected files
-        selected_files = self.get_checked_files()
+        # Get selected files; checked folders that are not loaded are not scanned here
+        selected_files = self.get_checked_files(expand=False)
         
         # Update the listbox
         self.file_listbox.delete(0, tk.END)
@@ -528,32 +742,20 @@ class CodeDumpApp(tk.Tk):
             filename = os.path.basename(file_path)
             self.file_listbox.insert(tk.END, filename)
     
-    def get_checked_files(self, parent=''):
-        """Recursively get all checked files
+    def get_checked_files(self, expand=True):
+        """Get all checked files from the selection model
         
         Args:
-            parent: Parent node ID in the treeview (default: root)
+            expand: Also scan checked folders that have not been loaded into the tree
         
         Returns:
             list: List of checked file paths
         """
-        checked_files = []
-        
-        def collect_checked(parent_node):
-            for item_id in self.tree.get_children(parent_node):
-                tags = self.tree.item(item_id, 'tags')
-                
-                if 'checked' in tags:
-                    # If it's a file and is checked, add to list
-                    if 'file' in tags and os.path.isfile(item_id):
-                        checked_files.append(item_id)
-                
-                # Process children recursively
-                if self.tree.get_children(item_id):
-                    collect_checked(item_id)
+        if self.selection is None:
+            return []
         
-        collect_checked(parent)
-        return checked_files
+        entries = self.selection.iter_checked(self.scan_folder_entries if expand else None)
+        return [path for path, is_dir in entries if not is_dir]
     
     def edit_selected_file(self):
         """Open selected file for editing"""
@@ -571,6 +773,15 @@ class CodeDumpApp(tk.Tk):
         
         file_path = self.selected_files[file_idx]
         
+        # Load file content (binary files are detected from their first bytes)
+        try:
+            content, _ = read_text(file_path)
+        except Exception as e:
+            content = f"Error reading file: {str(e)}"
+        if content is None:
+            self.status_var.set(f"Binary file cannot be edited: {os.path.basename(file_path)}")
+            return
+        
         # Create a new window for editing
         edit_window = tk.Toplevel(self)
         edit_window.title(f"Edit File: {os.path.basename(file_path)}")
@@ -580,20 +791,7 @@ class CodeDumpApp(tk.Tk):
         editor = tk.Text(edit_window, wrap=tk.NONE)
         editor.pack(fill=tk.BOTH, expand=True)
         
-        # Load file content
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                editor.insert(tk.END, content)
-        except UnicodeDecodeError:
-            try:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-                    editor.insert(tk.END, content)
-            except Exception as e:
-                editor.insert(tk.END, f"Error reading file: {str(e)}")
-        except Exception as e:
-            editor.insert(tk.END, f"Error reading file: {str(e)}")
+        editor.insert(tk.END, content)
         
         # Button frame
         button_frame = ttk.Frame(edit_window)
@@ -663,17 +861,8 @@ class CodeDumpApp(tk.Tk):
         editor_frame.columnconfigure(0, weight=1)
         editor_frame.rowconfigure(0, weight=1)
         
-        # Get section content from the dump
-        section_tag = f"section_{section_idx}"
-        section_ranges = self.preview_text.tag_ranges(section_tag)
-        
-        if section_ranges:
-            # Get the text from the preview
-            section_text = self.preview_text.get(section_ranges[0], section_ranges[1])
-            editor.insert(tk.END, section_text)
-        else:
-            # Fallback to original content
-            editor.insert(tk.END, section_data['header'] + section_data['content'])
+        # Get section content from the section store
+        editor.insert(tk.END, self.dump_sections.text(section_idx))
         
         # Button frame
         button_frame = ttk.Frame(dialog)
@@ -706,71 +895,43 @@ class CodeDumpApp(tk.Tk):
             editor: The text editor widget containing the edited text
             section_idx: The index of the section being edited
         """
-        # Get edited text
-        edited_text = editor.get('1.0', tk.END)
+        # Get edited text (without the newline the Text widget appends)
+        edited_text = editor.get('1.0', 'end-1c')
         
-        # Get section tag
-        section_tag = f"section_{section_idx}"
-        
-        # Find the original tag range
-        ranges = self.preview_text.tag_ranges(section_tag)
-        
-        if ranges:
-            # Enable editing of the preview text
-            self.preview_text.config(state='normal')
-            
-            # Delete the old content
-            self.preview_text.delete(ranges[0], ranges[1])
-            
-            # Insert the new content
-            self.preview_text.insert(ranges[0], edited_text)
+        if section_idx < len(self.dump_sections):
+            # Update the section store; copy and export read from it
+            self.dump_sections.replace(section_idx, edited_text)
+            self.edited_sections.add(section_idx)
             
-            # Calculate new end position
-            new_end = f"{ranges[0]} + {len(edited_text)}c"
-            
-            # Reapply the tag
-            self.preview_text.tag_add(section_tag, ranges[0], new_end)
-            
-            # Make the preview text read-only again
-            self.preview_text.config(state='disabled')
-            
-            # Update the section data
-            if section_idx < len(self.dump_sections):
-                self.dump_sections[section_idx]['content'] = edited_text
-                
-                # Update the clipboard content
-                self.update_dump_content()
+            # Re-render the preview window around the current view
+            if self.preview_store is self.dump_sections:
+                self.render_preview_window(self.preview_top_line())
             
             self.status_var.set(f"Section updated: {self.dump_sections[section_idx]['name']}")
         else:
-            self.status_var.set("Error: Could not find section in the preview")
+            self.status_var.set("Error: Could not find section in the dump")
         
         # Close the dialog
         dialog.destroy()
     
-    def update_dump_content(self):
-        """Update the dump content string after editing sections"""
-        # Regenerate the dump content
-        output = []
-        
-        for section in self.dump_sections:
-            output.append(section['header'])
-            output.append(section['content'])
-        
-        # Update the dump content for clipboard
-        self.dump_content = '\n'.join(output)
-    
     def generate_dump(self):
         """Generate dump from selected files
         
         This function:
         1. Collects all checked files from the tree
         2. Generates formatted content for each file
-        3. Adds sections to the Text widget with tags
+        3. Appends each section to a section store (spooled to disk when large)
         4. Updates the file listbox with section information
+        5. Renders the part of the dump around the view in the Text widget
+        
+        Each phase is timed as for ``codedump --stats`` and summarized in the status bar.
         """
+        phases = PhaseStats()
+        phases.start()
+        
         # Collect checked files
-        selected_files = self.get_checked_files()
+        with timer(phases, 'walk'):
+            selected_files = self.get_checked_files()
         
         # Check if any files are selected
         if not selected_files:
@@ -778,21 +939,33 @@ class CodeDumpApp(tk.Tk):
             self.show_preview_text("No files selected. Please check files in the tree view.")
             return
         
+        # Parse the size caps
+        try:
+            caps = self.get_size_caps()
+        except ValueError as e:
+            self.status_var.set(f"Invalid size cap: {str(e)}")
+            return
+        
         # Update status
         self.status_var.set(f"Generating dump from {len(selected_files)} files...")
         self.update_idletasks()
         
         # Prepare for content generation
-        output = []
         total_size = 0
         error_count = 0
+        binary_count = 0
+        cache = self.get_content_cache()
+        cache_hits = cache.hits if cache else 0
         
         # Store sections for later reference
-        self.dump_sections = []
-        
-        # Make the preview text widget editable and clear it
-        self.preview_text.config(state='normal')
-        self.preview_text.delete(1.0, tk.END)
+        self.show_preview_text("")
+        self.dump_sections.close()
+        self.dump_sections = SectionStore()
+        self.dump_generation += 1
+        self.stale_sections.clear()
+        self.edited_sections.clear()
+        self.pending_sections = []
+        self.dump_max_file_size = caps.max_file_size if caps else None
         
         # Clear the file listbox
         self.file_listbox.delete(0, tk.END)
@@ -804,65 +977,99 @@ class CodeDumpApp(tk.Tk):
                 self.status_var.set(f"Processing file {index+1} of {len(selected_files)}...")
                 self.update_idletasks()
             
+            start = time.perf_counter()
             try:
-                # Get file info
-                file_info = get_file_info(file_path)
-                total_size += file_info['size']
+                # Get file info, serving unchanged files from the cache
+                with timer(phases, 'stat'):
+                    stats = os.stat(file_path)
+                
+                # Skip files that no longer fit in the total size cap
+                if caps and not caps.admit(file_path, stats.st_size):
+                    continue
+                truncate = caps is not None and caps.truncates(stats.st_size)
+                
+                cached = cache.get(file_path, stats) if cache and not truncate else None
+                if cached:
+                    file_info, cached_content = cached
+                    phases.count('cache hits')
+                else:
+                    file_info = get_file_info(file_path, stats)
                 
                 # Create header
-                header = f"\n\n{'=' * 80}\n"
-                header += f"File: {file_path}\n"
-                header += f"Size: {file_info['size']} bytes\n"
-                header += f"Last Modified: {file_info['last_modified']}\n"
-                header += '=' * 80 + '\n'
+                with timer(phases, 'format'):
+                    header = format_header(file_path, file_info)
                 
-                # Get content with error handling
-                content = ""
-                error = None
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    # Try with alternative encoding
+                # Large clean UTF-8 files are copied from a memory map into the
+                # section store without being decoded
+                mapped = None
+                if not cached and not truncate and stats.st_size >= MMAP_THRESHOLD:
+                    with timer(phases, 'read'):
+                        mapped = map_text(file_path, header)
+                # Metadata kept with the section for structured export; the hash
+                # is left out when the whole file was not read
+                meta = {'size': file_info['size'], 'mtime_ns': file_info['mtime_ns'], 'encoding': None, 'hash': None}
+                if mapped is not None:
                     try:
-                        with open(file_path, 'r', encoding='latin-1') as f:
-                            content = f.read()
-                    except Exception as e:
+                        phases.count('files read')
+                        phases.count('bytes read', len(mapped.data))
+                        meta.update(encoding='utf-8', hash=hashlib.blake2b(mapped.data, digest_size=16).hexdigest())
+                        with timer(phases, 'write'):
+                            self.dump_sections.append_bytes(file_path, header, mapped.data, **meta)
+                    finally:
+                        mapped.close()
+                else:
+                    # Get content with error handling; the file is opened once and
+                    # its first bytes decide between binary, UTF-8 and latin-1
+                    content = ""
+                    error = None
+                    try:
+                        if cached:
+                            content = cached_content
+                        elif truncate:
+                            # Only the head and tail are read, by seeking
+                            with timer(phases, 'read'):
+                                content, meta['encoding'] = read_excerpt(file_path, stats.st_size, caps.max_file_size)
+                            if content is None:
+                                binary_count += 1
+                                if caps:
+                                    # Binary files do not count against the total size cap
+                                    caps.release(file_path, stats.st_size)
+                                continue
+                            phases.count('files read')
+                            phases.count('bytes read', caps.max_file_size)
+                            meta['truncated'] = True
+                        else:
+                            digest = hashlib.blake2b(digest_size=16)
+                            content, meta['encoding'] = read_text(file_path, digest, phases)
+                            if content is None:
+                                binary_count += 1
+                                if caps:
+                                    # Binary files do not count against the total size cap
+                                    caps.release(file_path, stats.st_size)
+                                continue
+                            meta['hash'] = digest.hexdigest()
+                            if cache:
+                                cache.put(file_path, stats, file_info, content)
+                    except UnicodeDecodeError as e:
                         content = f"Error reading file (encoding issue): {str(e)}"
                         error = e
                         error_count += 1
-                except PermissionError as e:
-                    content = "Error reading file: Permission denied"
-                    error = e
-                    error_count += 1
-                except Exception as e:
-                    content = f"Error reading file: {str(e)}"
-                    error = e
-                    error_count += 1
-                
-                # Store section data
-                section_data = {
-                    'path': file_path,
-                    'name': os.path.basename(file_path),
-                    'header': header,
-                    'content': content,
-                    'error': error
-                }
-                self.dump_sections.append(section_data)
-                
-                # Add to output for clipboard
-                output.append(header)
-                output.append(content)
-                
-                # Insert into text widget with tags
-                start_index = self.preview_text.index(tk.END)
-                self.preview_text.insert(tk.END, header, "header")
-                self.preview_text.insert(tk.END, content, "content")
-                end_index = self.preview_text.index(tk.END)
-                
-                # Add a section tag for navigation
-                section_tag = f"section_{index}"
-                self.preview_text.tag_add(section_tag, start_index, end_index)
+                    except PermissionError as e:
+                        content = "Error reading file: Permission denied"
+                        error = e
+                        error_count += 1
+                        phases.count('read errors')
+                    except Exception as e:
+                        content = f"{READ_ERROR_PREFIX}{str(e)}"
+                        error = e
+                        error_count += 1
+                        phases.count('read errors')
+                    
+                    # Store section data
+                    with timer(phases, 'write'):
+                        self.dump_sections.append(file_path, header, content, error, **meta)
+                total_size += file_info['size']
+                phases.file_time(file_path, time.perf_counter() - start)
                 
                 # Add file to listbox
                 self.file_listbox.insert(tk.END, os.path.basename(file_path))
@@ -873,33 +1080,72 @@ class CodeDumpApp(tk.Tk):
                 error_msg += f"Error processing file {file_path}: {str(e)}\n"
                 error_msg += '=' * 80 + '\n'
                 
-                output.append(error_msg)
-                self.preview_text.insert(tk.END, error_msg, "error")
+                # Keep it as a section so listbox rows stay aligned with sections
+                self.dump_sections.append(file_path, error_msg, "", e)
+                self.file_listbox.insert(tk.END, os.path.basename(file_path))
                 error_count += 1
         
-        # Configure tags for styling
-        self.preview_text.tag_configure("header", foreground="blue", font=("Courier", 10, "bold"))
-        self.preview_text.tag_configure("content", foreground="black")
-        self.preview_text.tag_configure("error", foreground="red")
-        
-        # Make the text widget read-only again
-        self.preview_text.config(state='disabled')
-        
-        # Save content for clipboard
-        self.dump_content = '\n'.join(output)
+        # Render the beginning of the dump
+        self.preview_store = self.dump_sections
+        self.render_preview_window(0)
+        phases.stop()
         
         # Update status
         size_str = self.format_size(total_size)
+        cache_str = ""
+        if cache:
+            cache.flush()
+            cache_str = f", {cache.hits - cache_hits} cached"
+        if binary_count:
+            cache_str += f", {binary_count} binary skipped"
+        if caps and caps.truncated:
+            cache_str += f", {len(caps.truncated)} truncated"
+        if caps and caps.skipped:
+            skipped_size = self.format_size(sum(size for _, size in caps.skipped))
+            cache_str += f", {len(caps.skipped)} skipped ({skipped_size})"
+        cache_str += f" | {phases.summary()}"
         if error_count > 0:
-            self.status_var.set(f"Dump generated with {error_count} errors: {len(selected_files)} files, {size_str}")
+            self.status_var.set(f"Dump generated with {error_count} errors: {len(selected_files)} files, {size_str}{cache_str}")
         else:
-            self.status_var.set(f"Dump generated successfully: {len(selected_files)} files, {size_str}")
+            self.status_var.set(f"Dump generated successfully: {len(selected_files)} files, {size_str}{cache_str}")
         
         # Connect listbox selection to section navigation
         self.file_listbox.bind('<<ListboxSelect>>', self.navigate_to_section)
     
+    def get_size_caps(self):
+        """Return the size caps entered in the bottom bar, or None if there are none
+        
+        Raises:
+            ValueError: If a size cannot be parsed
+        """
+        max_file = self.max_file_size.get().strip()
+        max_total = self.max_total_size.get().strip()
+        if not max_file and not max_total:
+            return None
+        return SizeCaps(parse_size(max_file) if max_file else None,
+                        parse_size(max_total) if max_total else None)
+    
+    def get_content_cache(self):
+        """Return the content cache if enabled, opening it on first use"""
+        if not self.use_cache.get():
+            return None
+        
+        if self.content_cache is None:
+            try:
+                self.content_cache = ContentCache()
+            except Exception as e:
+                self.status_var.set(f"Cache unavailable: {str(e)}")
+                self.use_cache.set(False)
+                return None
+        
+        return self.content_cache
+    
     def show_preview_text(self, text):
         """Display text in the preview area"""
+        # Plain text is shown as is, without windowing
+        self.preview_store = None
+        self.preview_window = (0, 0)
+        
         # Enable editing
         self.preview_text.config(state='normal')
         
@@ -912,6 +1158,147 @@ class CodeDumpApp(tk.Tk):
         # Disable editing
         self.preview_text.config(state='disabled')
     
+    def render_preview_window(self, top_line):
+        """Render the lines of the dump around ``top_line`` and scroll to it
+        
+        Only PREVIEW_WINDOW_LINES lines are inserted in the Text widget, so
+        the preview stays fast however large the dump is.
+        
+        Args:
+            top_line: Line of the whole dump (0-based) to show at the top
+        """
+        store = self.preview_store
+        total = store.total_lines
+        top_line = max(0, min(top_line, total - 1))
+        start = max(0, min(top_line - PREVIEW_WINDOW_LINES // 2, total - PREVIEW_WINDOW_LINES))
+        end = min(total, start + PREVIEW_WINDOW_LINES)
+        self.preview_window = (start, end)
+        
+        self.preview_text.config(state='normal')
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(tk.END, store.read_lines(start, end - start))
+        
+        # Tag the headers, contents and sections that overlap the window
+        index = store.section_at_line(start)
+        while index < len(store) and store[index]['line_start'] < end:
+            section = store[index]
+            section_start = section['line_start']
+            section_end = section_start + section['line_count']
+            header_end = section_start + section['header'].count('\n')
+            if section['error'] is not None:
+                header_tag = "error"
+            else:
+                header_tag = "stale" if index in self.stale_sections else "header"
+            for tag, first, last in ((header_tag, section_start, header_end),
+                                     ("content", header_end, section_end),
+                                     (f"section_{index}", section_start, section_end)):
+                first, last = max(first, start), min(last, end)
+                if first < last:
+                    self.preview_text.tag_add(tag, f"{first - start + 1}.0", f"{last - start + 1}.0")
+            index += 1
+        
+        self.preview_text.config(state='disabled')
+        if end > start:
+            self.preview_text.yview_moveto((top_line - start) / (end - start))
+    
+    def preview_top_line(self):
+        """Return the line of the whole dump shown at the top of the preview"""
+        start, end = self.preview_window
+        return start + int(round(self.preview_text.yview()[0] * (end - start)))
+    
+    def scroll_preview_to(self, line):
+        """Scroll the windowed preview so ``line`` of the dump is at the top"""
+        start, end = self.preview_window
+        total = self.preview_store.total_lines
+        if ((start == 0 or line - start >= PREVIEW_WINDOW_MARGIN) and
+                (end == total or end - line >= PREVIEW_WINDOW_MARGIN)):
+            self.preview_text.yview_moveto((line - start) / max(1, end - start))
+        else:
+            self.render_preview_window(line)
+    
+    def on_preview_scrollbar(self, *args):
+        """Handle the preview scrollbar, whose range is the whole dump"""
+        if self.preview_store is None or args[0] != 'moveto':
+            # Relative scrolling moves within the window, which slides as needed
+            self.preview_text.yview(*args)
+            return
+        self.scroll_preview_to(int(float(args[1]) * self.preview_store.total_lines))
+    
+    def on_preview_yview(self, first, last):
+        """Map the view of the rendered window onto the whole dump
+        
+        Also slides the window when the view gets close to one of its edges.
+        """
+        store = self.preview_store
+        if store is None or not store.total_lines:
+            self.preview_y_scrollbar.set(first, last)
+            return
+        
+        start, end = self.preview_window
+        total = store.total_lines
+        top = start + float(first) * (end - start)
+        bottom = start + float(last) * (end - start)
+        self.preview_y_scrollbar.set(top / total, bottom / total)
+        
+        if ((start > 0 and top - start < PREVIEW_WINDOW_MARGIN) or
+                (end < total and end - bottom < PREVIEW_WINDOW_MARGIN)):
+            if not self.preview_shift_pending:
+                self.preview_shift_pending = True
+                self.after_idle(self.shift_preview_window)
+    
+    def shift_preview_window(self):
+        """Re-render the preview window centred on the current view"""
+        self.preview_shift_pending = False
+        if self.preview_store is not None:
+            self.render_preview_window(self.preview_top_line())
+    
+    def export_dump(self):
+        """Write the current dump to a file, streaming it from the section store"""
+        if self.preview_store is None and not self.preview_text.get('1.0', f"{tk.END}-1c").strip():
+            self.status_var.set("No content to export. Generate a dump first.")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("JSON Lines", "*.jsonl"), ("Binary dump", "*.cdump"),
+                       ("Compressed", "*.gz *.zst"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        # Structured formats are chosen by extension (before any .gz or .zst)
+        # and written from the section items
+        format = {'.jsonl': 'jsonl', '.cdump': 'binary'}.get(os.path.splitext(strip_compression(file_path))[1].lower())
+        if format is not None:
+            if self.preview_store is not self.dump_sections or not len(self.dump_sections):
+                self.status_var.set("Structured export needs a generated dump. Generate a dump first.")
+                return
+            try:
+                if format == 'binary':
+                    out = open_output(file_path, 'wb')
+                else:
+                    out = open_output(file_path, 'w', encoding='utf-8', errors='surrogateescape')
+                with out:
+                    writer = open_writer(format, out)
+                    for section in self.dump_sections.iter_sections():
+                        writer.write(section)
+                    count = writer.close()
+                self.status_var.set(f"Dump exported to {file_path} ({count} records)")
+            except Exception as e:
+                self.status_var.set(f"Error exporting dump: {str(e)}")
+            return
+        
+        try:
+            with open_output(file_path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                if self.preview_store is not None:
+                    self.preview_store.write_to(f)
+                else:
+                    f.write(self.preview_text.get('1.0', f"{tk.END}-1c"))
+                f.write('\n')
+            self.status_var.set(f"Dump exported to {file_path}")
+        except Exception as e:
+            self.status_var.set(f"Error exporting dump: {str(e)}")
+    
     def format_size(self, size_bytes):
         """Format size in bytes to human-readable format"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -922,8 +1309,11 @@ class CodeDumpApp(tk.Tk):
     def copy_to_clipboard(self):
         """Copy current preview text content to clipboard"""
         try:
-            # Get content directly from the Text widget
-            full_dump_text = self.preview_text.get('1.0', f"{tk.END}-1c")
+            # Get content from the section store (the widget only holds a window of it)
+            if self.preview_store is not None:
+                full_dump_text = self.preview_store.getvalue()
+            else:
+                full_dump_text = self.preview_text.get('1.0', f"{tk.END}-1c")
             
             # Check if there is any content to copy
             if not full_dump_text.strip():
@@ -973,93 +1363,319 @@ class CodeDumpApp(tk.Tk):
         # Get section tag
         section_tag = f"section_{index}"
         
-        # Find the tag range
+        # Jump by line index, rendering the window around the section if needed
         try:
-            tag_ranges = self.preview_text.tag_ranges(section_tag)
-            if tag_ranges:
-                # Scroll to the beginning of the section
-                self.preview_text.see(tag_ranges[0])
-                
-                # Highlight the section temporarily
-                self.preview_text.tag_config(section_tag, background="lightyellow")
-                
-                # Reset the highlight after a short delay
-                self.after(1000, lambda: self.preview_text.tag_config(section_tag, background=""))
-                
-                # Update status
-                section_name = self.dump_sections[index]['name']
-                self.status_var.set(f"Navigated to: {section_name}")
+            if self.preview_store is not self.dump_sections:
+                self.preview_store = self.dump_sections
+                self.render_preview_window(self.dump_sections[index]['line_start'])
+            else:
+                self.scroll_preview_to(self.dump_sections[index]['line_start'])
+            
+            # Highlight the section temporarily
+            self.preview_text.tag_config(section_tag, background="lightyellow")
+            
+            # Reset the highlight after a short delay
+            self.after(1000, lambda: self.preview_text.tag_config(section_tag, background=""))
+            
+            # Update status
+            section_name = self.dump_sections[index]['name']
+            self.status_var.set(f"Navigated to: {section_name}")
         except Exception as e:
             self.status_var.set(f"Error navigating to section: {str(e)}")
     
     def refresh_directory(self):
-        """Refresh the current directory without reselecting it"""
+        """Refresh the current directory without reselecting it
+        
+        Auto refresh updates the tree in place; this full rescan is the
+        fallback when file system events were lost.
+        """
         directory = self.selected_directory.get()
         if directory and os.path.exists(directory):
-            # Save currently checked items
-            checked_items = []
-            
-            def collect_checked_items(parent=''):
-                for item_id in self.tree.get_children(parent):
-                    tags = self.tree.item(item_id, 'tags')
-                    if 'checked' in tags:
-                        checked_items.append(item_id)
-                    
-                    if self.tree.get_children(item_id):
-                        collect_checked_items(item_id)
-            
-            # Start collecting from the root node
-            collect_checked_items()
+            # Save the check state; it is reapplied as folders are loaded again
+            check_states = self.selection.overrides() if self.selection is not None else {}
             
             # Update status
             self.status_var.set("Refreshing directory...")
             self.update_idletasks()
             
+            # Stop any scans of the old tree
+            self.cancel_directory_scan(quiet=True)
+            
             # Clear the treeview
             for item in self.tree.get_children():
                 self.tree.delete(item)
             
             # Repopulate the tree
-            root_dir = os.path.basename(directory)
-            if not root_dir:  # If it's the root directory
-                root_dir = directory
-                
-            root_node = self.tree.insert('', 'end', iid=directory, 
-                                         text=f"☐ {root_dir}",
-                                         tags=('unchecked', 'folder'), 
-                                         open=True,
-                                         image=self.folder_icon if self.use_icons else '')
+            self.selection = SelectionModel(directory, check_states)
+            self.ignore_matcher = IgnoreMatcher(directory)
+            self.insert_root_node(directory)
             
-            # Populate starting from the root node
-            self.populate_treeview(directory, parent_node=root_node)
-            
-            # Restore checked items that still exist
-            for item_id in checked_items:
-                if os.path.exists(item_id) and self.tree.exists(item_id):
-                    # Get current tags and text
-                    tags = list(self.tree.item(item_id, 'tags'))
-                    current_text = self.tree.item(item_id, 'text')
-                    item_name = current_text[2:]  # Remove checkbox symbol
-                    
-                    # Update to checked
-                    if 'unchecked' in tags:
-                        tags.remove('unchecked')
-                    if 'checked' not in tags:
-                        tags.append('checked')
-                    
-                    # Update item
-                    self.tree.item(item_id, text=f"☑ {item_name}", tags=tags)
-            
-            # Update status
-            self.status_var.set(f"Directory refreshed: {os.path.basename(directory)}")
+            # Rescan in the background starting from the root node
+            self.start_directory_scan(
+                directory,
+                on_complete=lambda: self.status_var.set(f"Directory refreshed: {os.path.basename(directory)}")
+            )
         else:
             self.status_var.set("No directory selected to refresh")
     
-    def get_checked_folders_and_files(self, parent=''):
-        """Recursively get all checked folders and files
+    def toggle_auto_refresh(self):
+        """Start or stop following file system changes when the checkbox is toggled"""
+        directory = self.selected_directory.get()
+        if self.auto_refresh.get() and directory:
+            self.start_change_monitor(directory)
+        else:
+            self.stop_change_monitor()
+    
+    def start_change_monitor(self, directory):
+        """Watch the directory on a worker thread and apply its changes periodically
+        
+        Args:
+            directory: Root of the tree shown in the treeview
+        """
+        self.stop_change_monitor()
+        if not self.auto_refresh.get():
+            return
+        
+        monitor = ChangeMonitor(directory, self.file_filter)
+        self.change_monitor = monitor
+        monitor.start()
+        self.after(CHANGE_POLL_INTERVAL, lambda: self.poll_changes(monitor))
+    
+    def stop_change_monitor(self):
+        """Stop following file system changes"""
+        if self.change_monitor is not None:
+            self.change_monitor.stop()
+            self.change_monitor = None
+    
+    def poll_changes(self, monitor):
+        """Apply the changes collected by the change monitor, then reschedule itself
+        
+        Args:
+            monitor: The ChangeMonitor being polled
+        """
+        # Ignore monitors that were stopped or replaced
+        if self.change_monitor is not monitor:
+            return
+        
+        if monitor.error is not None:
+            self.status_var.set(f"Auto refresh stopped: {str(monitor.error)}")
+            self.stop_change_monitor()
+            return
+        
+        changed, renames = monitor.drain()
+        if changed:
+            self.apply_changes(changed, renames)
+        self.after(CHANGE_POLL_INTERVAL, lambda: self.poll_changes(monitor))
+    
+    def apply_changes(self, changed, renames):
+        """Update the tree and the dump for the paths reported by the change monitor
+        
+        Entries added to or removed from loaded folders are inserted or deleted
+        in place; renamed entries keep their check state. Sections of the dump
+        whose file changed are marked stale and re-read in the background. The
+        whole tree is only refreshed when events were lost (the root itself is
+        reported) or too many paths changed at once.
+        
+        Args:
+            changed: Set of changed paths (files or folders)
+            renames: Dict mapping the old path of renamed entries to the new one
+        """
+        directory = self.selected_directory.get()
+        if self.selection is None or directory in changed or len(changed) > FULL_REFRESH_THRESHOLD:
+            self.refresh_directory()
+            return
+        
+        # Carry the check state of renamed entries over before their new paths are inserted
+        for old_path, new_path in renames.items():
+            self.selection.rename(old_path, new_path)
+        
+        # Find the loaded folders whose listing no longer matches the tree
+        folders = set()
+        modified = set(renames)
+        for path in changed:
+            node = self.selection.get(path)
+            if os.path.basename(path) in self.ignore_matcher.filenames:
+                # New rules can hide or reveal anything below the ignore file's folder
+                folder = os.path.dirname(path)
+                self.ignore_matcher.forget(folder)
+                prefix = os.path.join(folder, '')
+                folders.update(p for p, n in self.selection.nodes.items()
+                               if n.is_dir and (p == folder or p.startswith(prefix)))
+            if node is None:
+                if os.path.lexists(path) or path in renames:
+                    folders.add(self.nearest_folder(path))
+            elif not os.path.exists(path) or os.path.isdir(path) != node.is_dir:
+                folders.add(self.nearest_folder(path))
+            if node is not None and not node.is_dir:
+                modified.add(path)
+        
+        added = removed = 0
+        for folder in sorted(folders):
+            # Folders removed by an earlier sync, unloaded or still loading are skipped
+            if (self.tree.exists(folder) and self.selection.is_loaded(folder) and
+                    folder not in self.active_scans):
+                more_added, more_removed = self.sync_folder(folder)
+                added += more_added
+                removed += more_removed
+        if added or removed:
+            self.update_selected_files()
+        
+        stale = self.mark_sections_stale(modified)
+        
+        status = []
+        if added or removed:
+            status.append(f"{added} added, {removed} removed")
+        if stale:
+            status.append(f"{stale} preview sections out of date, re-reading")
+        if status:
+            self.status_var.set(f"Auto refresh: {'; '.join(status)}")
+    
+    def nearest_folder(self, path):
+        """Return the closest existing folder above ``path`` that is in the selection model
+        
+        Args:
+            path: A changed path below the selected directory
+        """
+        directory = self.selected_directory.get()
+        folder = os.path.dirname(path)
+        while folder != directory and (folder not in self.selection or not os.path.isdir(folder)):
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return directory
+            folder = parent
+        return folder
+    
+    def sync_folder(self, folder_id):
+        """Bring the children of a loaded folder in line with its current listing
+        
+        Entries that are gone (or changed between file and folder) are deleted
+        with their subtrees; new entries are appended with the check state of
+        the folder, or the state they had before a rename.
         
         Args:
-            parent: Parent node ID in the treeview (default: root)
+            folder_id: ID of the folder node in the treeview
+        
+        Returns:
+            tuple: (entries added, entries removed)
+        """
+        entries = [(kind, path, name) for kind, _, path, name
+                   in iter_tree_entries(folder_id, self.file_filter, self.ignore_matcher, recursive=False)
+                   if kind != 'error']
+        kinds = {path: kind for kind, path, _ in entries}
+        
+        removed = 0
+        for child_id in self.tree.get_children(folder_id):
+            tags = self.tree.item(child_id, 'tags')
+            # Placeholders and error entries have no type tag
+            if 'file' not in tags and 'folder' not in tags:
+                continue
+            kind = kinds.get(child_id)
+            # Entries renamed away are no longer in the model
+            if kind is None or (kind == 'folder') != ('folder' in tags) or child_id not in self.selection:
+                self.tree.delete(child_id)
+                self.selection.remove(child_id)
+                removed += 1
+        
+        added = 0
+        for kind, path, name in entries:
+            if not self.tree.exists(path):
+                self.insert_tree_entry(kind, folder_id, path, name)
+                added += 1
+        return added, removed
+    
+    def mark_sections_stale(self, paths):
+        """Mark the dump sections of changed files as stale and re-read them in the background
+        
+        Sections edited by hand are only marked. Stale section headers are
+        shown in orange until the new content replaces them.
+        
+        Args:
+            paths: Paths of the files that changed, were renamed or deleted
+        
+        Returns:
+            int: Number of sections marked stale
+        """
+        if not len(self.dump_sections) or not paths:
+            return 0
+        
+        count = 0
+        for index, section in enumerate(self.dump_sections):
+            if section['path'] not in paths:
+                continue
+            self.stale_sections.add(index)
+            count += 1
+            if index not in self.edited_sections and os.path.isfile(section['path']):
+                self.reread_section(index, section['path'])
+        
+        if count and self.preview_store is self.dump_sections:
+            self.render_preview_window(self.preview_top_line())
+        return count
+    
+    def reread_section(self, index, file_path):
+        """Read a changed file on the section reader thread and replace its section when done
+        
+        Args:
+            index: Index of the section in the dump
+            file_path: Path of the file
+        """
+        if self.section_reader is None:
+            self.section_reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='codedump-section')
+        future = self.section_reader.submit(read_record, file_path, self.dump_max_file_size)
+        self.pending_sections.append((self.dump_generation, index, future))
+        if len(self.pending_sections) == 1:
+            self.after(CHANGE_POLL_INTERVAL, self.drain_section_rereads)
+    
+    def drain_section_rereads(self):
+        """Replace the sections whose files have been re-read, then reschedule itself while some are pending"""
+        pending = []
+        updated = 0
+        for generation, index, future in self.pending_sections:
+            if not future.done():
+                pending.append((generation, index, future))
+                continue
+            # Results for an earlier dump, or sections edited in the meantime, are dropped
+            if generation != self.dump_generation or index in self.edited_sections:
+                continue
+            try:
+                record = future.result()
+            except OSError:
+                # Deleted again before it could be read; the section stays stale
+                continue
+            if record is None:
+                # Now detected as binary; the section stays stale
+                continue
+            self.replace_section(index, record)
+            updated += 1
+        self.pending_sections = pending
+        
+        if updated and self.preview_store is self.dump_sections:
+            self.render_preview_window(self.preview_top_line())
+        if pending:
+            self.after(CHANGE_POLL_INTERVAL, self.drain_section_rereads)
+        elif updated:
+            stale = f", {len(self.stale_sections)} still out of date" if self.stale_sections else ""
+            self.status_var.set(f"Auto refresh: {updated} preview sections updated{stale}")
+    
+    def replace_section(self, index, record):
+        """Replace a section of the dump with a file re-read by ``read_record``
+        
+        Args:
+            index: Index of the section in the dump
+            record: The section dict returned by ``read_record``
+        """
+        header = format_header(record['path'], record)
+        error = record.get('error')
+        content = record['content'] if error is None else f"{READ_ERROR_PREFIX}{error}"
+        self.dump_sections.replace(index, header + '\n' + content, header=header, error=error,
+                                   size=record['size'], mtime_ns=record['mtime_ns'], encoding=record['encoding'],
+                                   hash=record['hash'], truncated=record.get('truncated', False))
+        self.stale_sections.discard(index)
+    
+    def get_checked_folders_and_files(self, expand=True):
+        """Get all checked folders and files from the selection model
+        
+        Args:
+            expand: Also scan checked folders that have not been loaded into the tree
         
         Returns:
             tuple: (checked_folders, checked_files) Lists of checked folder and file paths
@@ -1067,22 +1683,14 @@ class CodeDumpApp(tk.Tk):
         checked_folders = []
         checked_files = []
         
-        def collect_checked(parent_node):
-            for item_id in self.tree.get_children(parent_node):
-                tags = self.tree.item(item_id, 'tags')
-                
-                if 'checked' in tags:
-                    # Add item to appropriate list based on type
-                    if 'folder' in tags and os.path.isdir(item_id):
-                        checked_folders.append(item_id)
-                    elif 'file' in tags and os.path.isfile(item_id):
-                        checked_files.append(item_id)
-                
-                # Process children recursively
-                if self.tree.get_children(item_id):
-                    collect_checked(item_id)
+        if self.selection is not None:
+            for path, is_dir in self.selection.iter_checked(self.scan_folder_entries if expand else None):
+                # Add item to appropriate list based on type
+                if is_dir:
+                    checked_folders.append(path)
+                else:
+                    checked_files.append(path)
         
-        collect_checked(parent)
         return (checked_folders, checked_files)
     
     def generate_folder_structure(self):
@@ -1096,8 +1704,10 @@ class CodeDumpApp(tk.Tk):
         # Get checked folders and files
         checked_folders, checked_files = self.get_checked_folders_and_files()
         
-        # Combine both for complete structure
+        # Combine both for complete structure; the model already knows which
+        # paths are folders, so nothing is looked up on disk
         all_checked_paths = checked_folders + checked_files
+        folder_paths = set(checked_folders)
         
         if not all_checked_paths:
             self.show_preview_text("No items selected. Please check some folders or files in the file tree.")
@@ -1124,15 +1734,14 @@ class CodeDumpApp(tk.Tk):
         
         # Generate the folder structure with indentation
         for path in all_checked_paths:
-            if os.path.exists(path):  # Ensure the path still exists
-                depth, rel_path = get_relative_info(path)
-                indent = "    " * depth
-                
-                # Use different symbols for files and folders
-                if os.path.isdir(path):
-                    output.append(f"{indent}📁 {os.path.basename(path)}/")
-                else:
-                    output.append(f"{indent}📄 {os.path.basename(path)}")
+            depth, rel_path = get_relative_info(path)
+            indent = "    " * depth
+            
+            # Use different symbols for files and folders
+            if path in folder_paths:
+                output.append(f"{indent}📁 {os.path.basename(path)}/")
+            else:
+                output.append(f"{indent}📄 {os.path.basename(path)}")
         
         # Display in preview area
         folder_structure_text = "\n".join(output)
@@ -1147,6 +1756,18 @@ class CodeDumpApp(tk.Tk):
 def main():
     app = CodeDumpApp()
     app.mainloop()
+    
+    # Commit any pending cache writes
+    if app.content_cache is not None:
+        app.content_cache.close()
+    
+    # Stop watching the directory and re-reading sections
+    app.stop_change_monitor()
+    if app.section_reader is not None:
+        app.section_reader.shutdown(wait=False)
+    
+    # Drop the spooled dump sections
+    app.dump_sections.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
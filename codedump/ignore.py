@@ -0,0 +1,195 @@
+import os
+import re
+
+# Ignore files read at every directory level, in increasing order of precedence
+IGNORE_FILENAMES = ('.gitignore', '.ignore', '.codedumpignore')
+
+def translate_pattern(pattern):
+    """Translate a gitignore glob (without leading '!' or trailing '/') into a regex body."""
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/'):
+                if pattern.startswith('**/', i):
+                    # Leading or middle '**/' matches zero or more directories
+                    res.append('(?:.*/)?')
+                    i += 3
+                    continue
+                if i + 2 == n:
+                    # Trailing '/**' matches everything inside
+                    res.append('.*')
+                    i += 2
+                    continue
+            while i < n and pattern[i] == '*':
+                i += 1
+            res.append('[^/]*')
+            continue
+        if c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            j = pattern.find(']', j)
+            if j == -1:
+                res.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                negate = body[:1] in ('!', '^')
+                if negate:
+                    body = body[1:]
+                body = ''.join('\\' + ch if ch in '\\[]^' else ch for ch in body)
+                res.append(f"[{'^' if negate else ''}{body}]")
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return ''.join(res)
+
+def parse_line(line):
+    """Parse one ignore file line into ``(regex, negate, dir_only, anchored)``, or None."""
+    line = line.rstrip('\n').rstrip('\r')
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line or line.startswith('#'):
+        return None
+
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    elif line.startswith('\\'):
+        line = line[1:] if line[1:2] in ('!', '#') else line
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # A separator at the beginning or middle anchors the pattern to the ignore file's directory
+    anchored = '/' in line
+    line = line.lstrip('/')
+    return translate_pattern(line), negate, dir_only, anchored
+
+class IgnoreFile:
+    """The compiled rules of the ignore files found in one directory.
+
+    Each rule is compiled once; a combined regex per rule kind is used as a
+    fast pre-check so most paths are rejected with a single search.
+    """
+
+    def __init__(self, lines):
+        self.rules = []
+        basename_parts = []
+        path_parts = []
+        for line in lines:
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            body, negate, dir_only, anchored = parsed
+            self.rules.append((re.compile(f'^{body}$'), negate, dir_only, anchored))
+            (path_parts if anchored else basename_parts).append(f'(?:{body})')
+        self._basename_re = re.compile(f"^(?:{'|'.join(basename_parts)})$") if basename_parts else None
+        self._path_re = re.compile(f"^(?:{'|'.join(path_parts)})$") if path_parts else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, rel_path, name, is_dir):
+        """Return True if ignored, False if re-included by a '!' rule, or None if no rule matches.
+
+        Args:
+            rel_path: Path relative to this ignore file's directory, '/'-separated
+            name: Base name of the path
+            is_dir: Whether the path is a directory
+        """
+        if not ((self._basename_re is not None and self._basename_re.match(name)) or
+                (self._path_re is not None and self._path_re.match(rel_path))):
+            return None
+
+        # The last matching rule wins
+        for regex, negate, dir_only, anchored in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path if anchored else name):
+                return not negate
+        return None
+
+def load_ignore_file(dir_path, names=None, filenames=IGNORE_FILENAMES):
+    """Read and compile the ignore files in ``dir_path``.
+
+    ``names`` can be the directory listing, to avoid probing for files that
+    do not exist.
+    """
+    lines = []
+    for filename in filenames:
+        if names is not None and filename not in names:
+            continue
+        try:
+            with open(os.path.join(dir_path, filename), 'r', encoding='utf-8', errors='replace') as f:
+                lines.extend(f)
+        except OSError:
+            continue
+    return IgnoreFile(lines) if lines else None
+
+class IgnoreMatcher:
+    """Decide whether paths under ``root`` are excluded by ignore files.
+
+    Ignore files are read once per directory (``.gitignore``, ``.ignore`` and
+    ``.codedumpignore``) and combined with those of its parents; rules in
+    deeper directories take precedence. Callers should prune ignored
+    directories instead of descending into them, as git does.
+    """
+
+    def __init__(self, root, filenames=IGNORE_FILENAMES):
+        self.root = os.path.normpath(root)
+        self.filenames = tuple(filenames)
+        # Directory path -> tuple of (IgnoreFile, prefix relative to that file's directory)
+        self._chains = {}
+
+    def load(self, dir_path, names=None):
+        """Load the rules that apply inside ``dir_path`` (optionally given its listing)."""
+        chain = self._chains.get(dir_path)
+        if chain is not None:
+            return chain
+
+        if os.path.normpath(dir_path) == self.root:
+            parent_chain = ()
+        else:
+            parent = os.path.dirname(dir_path)
+            if not parent or parent == dir_path:
+                parent_chain = ()
+            else:
+                base = os.path.basename(dir_path) + '/'
+                parent_chain = tuple((rules, prefix + base) for rules, prefix in self.load(parent))
+
+        own = load_ignore_file(dir_path, names, self.filenames)
+        chain = parent_chain + ((own, ''),) if own else parent_chain
+        self._chains[dir_path] = chain
+        return chain
+
+    def is_ignored(self, dir_path, name, is_dir):
+        """Check if the entry ``name`` inside ``dir_path`` is ignored."""
+        for rules, prefix in reversed(self.load(dir_path)):
+            result = rules.match(prefix + name, name, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def forget(self, dir_path=None):
+        """Drop cached rules for ``dir_path`` and below (all rules if None)."""
+        if dir_path is None:
+            self._chains.clear()
+            return
+        prefix = dir_path.rstrip(os.sep) + os.sep
+        for key in [key for key in self._chains if key == dir_path or key.startswith(prefix)]:
+            del self._chains[key]
@@ -0,0 +1,73 @@
+import os
+import re
+
+# Multipliers of the size suffixes accepted by parse_size
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_size(text):
+    """Parse a size such as '500', '64K', '10M' or '1.5G' (binary units) into bytes.
+
+    Raises:
+        ValueError: If the size cannot be parsed
+    """
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*$', text, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+class SizeCaps:
+    """Per-file and total size limits for a dump.
+
+    Files larger than ``max_file_size`` are reduced to a head/tail excerpt
+    of that many bytes (see ``codedump.sniff.read_excerpt``). Once the files
+    kept add up to ``max_total_size`` (counting truncated files at their
+    excerpt size), later files that no longer fit are skipped. Both checks
+    use sizes from ``os.stat``, before anything is read.
+    """
+
+    def __init__(self, max_file_size=None, max_total_size=None):
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.total = 0
+        # (path, size) of the files excerpted and of the files left out
+        self.truncated = []
+        self.skipped = []
+
+    def truncates(self, size):
+        """Check whether a file of ``size`` bytes is reduced to an excerpt."""
+        return self.max_file_size is not None and size > self.max_file_size
+
+    def admit(self, file_path, size):
+        """Record a file of ``size`` bytes and return True if it fits in the total cap."""
+        kept = min(size, self.max_file_size) if self.truncates(size) else size
+        if self.max_total_size is not None and self.total + kept > self.max_total_size:
+            self.skipped.append((file_path, size))
+            return False
+        self.total += kept
+        if kept < size:
+            self.truncated.append((file_path, size))
+        return True
+
+    def release(self, file_path, size):
+        """Give back the room taken by a file admitted with ``admit`` but then left out (e.g. binary)."""
+        kept = min(size, self.max_file_size) if self.truncates(size) else size
+        self.total -= kept
+        if kept < size:
+            self.truncated.remove((file_path, size))
+
+    def filter(self, paths):
+        """Yield the paths that fit in the total cap, in order."""
+        for file_path in paths:
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                # Let the reader report the error
+                yield file_path
+                continue
+            if self.admit(file_path, size):
+                yield file_path
+
+    def report(self):
+        """Return a one-line summary of the truncated and skipped files."""
+        return (f"Size caps: {len(self.truncated)} files truncated, {len(self.skipped)} files skipped "
+                f"({sum(size for _, size in self.skipped)} bytes)")
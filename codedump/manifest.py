@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+from codedump.cache import is_racy
+
+MANIFEST_VERSION = 1
+
+# Read size used when hashing file contents
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file_path):
+    """Return a fast content hash (BLAKE2b, 128-bit) of a file as hex."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_key(file_path, directory):
+    """Return the portable manifest key (relative, '/'-separated) for a file."""
+    return os.path.relpath(file_path, directory).replace(os.sep, '/')
+
+def manifest_entry(file_path, previous=None, stats=None):
+    """Build the manifest entry for a file.
+
+    The content hash of ``previous`` is reused without reading the file when
+    its size and ``mtime_ns`` still match. A modification time too recent to
+    trust when the file is hashed (see ``cache.is_racy``) is recorded as
+    None, so the next manifest hashes the file again: a same-size rewrite
+    within the same timestamp tick would otherwise go unnoticed.
+    """
+    if stats is None:
+        stats = os.stat(file_path)
+    if previous and previous['size'] == stats.st_size and previous['mtime_ns'] == stats.st_mtime_ns:
+        file_hash = previous['hash']
+    else:
+        file_hash = hash_file(file_path)
+    mtime_ns = None if is_racy(stats.st_mtime_ns) else stats.st_mtime_ns
+    return {'size': stats.st_size, 'mtime_ns': mtime_ns, 'hash': file_hash}
+
+def load_manifest(path):
+    """Load the per-file entries of a manifest written by ``save_manifest``."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version in {path}: {data.get('version')}")
+    return data['files']
+
+def save_manifest(path, files, root=None):
+    """Atomically write a manifest of ``files`` (key -> entry) to ``path``."""
+    data = {
+        'version': MANIFEST_VERSION,
+        'root': os.path.abspath(root) if root else None,
+        'files': files,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def removed_keys(previous, current):
+    """Return the sorted keys present in ``previous`` but not in ``current``."""
+    return sorted(set(previous) - set(current))
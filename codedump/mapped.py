@@ -0,0 +1,108 @@
+import codecs
+import mmap
+import os
+
+from codedump.sniff import SNIFF_SIZE, sniff
+
+# Files at least this large are memory-mapped instead of read into strings
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# Bytes validated (and, without a byte sink, written) per step
+MMAP_CHUNK_SIZE = 1024 * 1024
+
+def _for_each_chunk(data, func, size=MMAP_CHUNK_SIZE):
+    """Call ``func`` on consecutive views of ``data``, releasing each view afterwards.
+
+    The views must be released before the mapping can be closed.
+    """
+    with memoryview(data) as view:
+        for start in range(0, len(data), size):
+            with view[start:start + size] as chunk:
+                func(chunk)
+
+def _is_clean_utf8(data):
+    """Check that ``data`` is valid UTF-8 that text mode would not change.
+
+    Files with a BOM or carriage returns are rejected, since reading them as
+    text strips or translates bytes. Validation decodes one chunk at a time,
+    so only a bounded amount of text exists at once.
+    """
+    if sniff(data[:SNIFF_SIZE]) != 'utf-8' or data.find(b'\r') != -1:
+        return False
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        _for_each_chunk(data, decoder.decode)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def _byte_sink(out):
+    """Return the binary buffer under text stream ``out`` if bytes can bypass it unchanged."""
+    buffer = getattr(out, 'buffer', None)
+    encoding = getattr(out, 'encoding', None)
+    if buffer is None or encoding is None or os.linesep != '\n':
+        return None
+    try:
+        if codecs.lookup(encoding).name != 'utf-8':
+            return None
+    except LookupError:
+        return None
+    return buffer
+
+class MappedText:
+    """A large UTF-8 text file mapped into memory, with its dump header.
+
+    ``write_to`` copies the mapped bytes straight to the output's binary
+    buffer, so the content never becomes a Python string.
+    """
+
+    def __init__(self, file_path, header, data, file):
+        self.file_path = file_path
+        self.header = header
+        self.data = data
+        self._file = file
+
+    def __len__(self):
+        return len(self.data)
+
+    def write_to(self, out):
+        """Write the header, a newline and the content to text stream ``out``, then close."""
+        try:
+            out.write(self.header + '\n')
+            buffer = _byte_sink(out)
+            if buffer is not None:
+                out.flush()
+                buffer.write(self.data)
+            else:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+                _for_each_chunk(self.data, lambda chunk: out.write(decoder.decode(chunk)))
+        finally:
+            self.close()
+
+    def close(self):
+        self.data.close()
+        self._file.close()
+
+def map_text(file_path, header=''):
+    """Memory-map a file whose bytes can be dumped as is.
+
+    Returns:
+        MappedText: The mapped file, or None if it is empty, not clean UTF-8
+        (see ``_is_clean_utf8``) or cannot be mapped; callers then fall back
+        to the regular read path
+    """
+    try:
+        f = open(file_path, 'rb')
+    except OSError:
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        f.close()
+        return None
+    if not _is_clean_utf8(data):
+        data.close()
+        f.close()
+        return None
+    return MappedText(file_path, header, data, f)
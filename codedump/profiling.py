@@ -0,0 +1,184 @@
+import collections
+import heapq
+import os
+import threading
+import time
+
+# Phases in the order they are reported; any other phase follows them
+PHASES = ('walk', 'filter', 'manifest', 'stat', 'read', 'decode', 'dedup', 'format', 'write', 'clipboard')
+
+# Counters in the order they are reported
+COUNTERS = ('dirs visited', 'files read', 'bytes read', 'binary files', 'decode failures', 'read errors',
+            'cache hits')
+
+# Number of slowest files reported by default
+DEFAULT_SLOWEST = 10
+
+# CPU time of the calling thread; Python 3.6 only has the process-wide clock,
+# which counts the other reader threads too
+thread_time = getattr(time, 'thread_time', time.process_time)
+
+# Marks the end of the iterator in PhaseStats.timed
+_DONE = object()
+
+def timer(phases, name):
+    """Return a context manager adding the time spent in its block to phase ``name`` of ``phases``.
+
+    ``phases`` may be None, in which case nothing is measured.
+    """
+    return NO_TIMER if phases is None else _PhaseTimer(phases, name)
+
+class _NoTimer:
+    """Context manager that does nothing, used when no stats are collected (reusable and reentrant)."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+NO_TIMER = _NoTimer()
+
+class _PhaseTimer:
+    """Context manager measuring one block of a phase, on the thread that runs it."""
+
+    __slots__ = ('phases', 'name', 'wall', 'cpu')
+
+    def __init__(self, phases, name):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = thread_time()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.phases.add_time(self.name, time.perf_counter() - self.wall, thread_time() - self.cpu)
+
+class PhaseStats:
+    """Wall and CPU time per phase of a dump, with counters and the slowest files.
+
+    Phases are timed with ``timer`` blocks on whichever thread does the work,
+    so with several reader threads the times of the reading phases add up
+    over the threads and can exceed the wall time of the whole dump. CPU
+    times are per thread (``time.thread_time``; process-wide on Python 3.6).
+    All methods may be called from any thread.
+
+    Files skipped during the walk are counted per rule in ``skipped``; the
+    time spent on each file, from stat to formatted section, is kept for the
+    ``slowest`` ones.
+    """
+
+    def __init__(self, slowest=DEFAULT_SLOWEST):
+        self.slowest = slowest
+        # phase -> [wall seconds, CPU seconds, number of timed blocks]
+        self.times = {}
+        self.counts = collections.Counter()
+        self.skipped = collections.Counter()
+        self.wall = None
+        self.cpu = None
+        self._start = None
+        # Min-heap of (seconds, path) holding the slowest files
+        self._files = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start measuring the total wall and CPU time of the dump."""
+        self._start = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        """Stop measuring the total time started by ``start``."""
+        wall, cpu = self._start
+        self.wall = time.perf_counter() - wall
+        self.cpu = time.process_time() - cpu
+
+    def add_time(self, name, wall, cpu):
+        """Add one timed block of phase ``name``."""
+        with self._lock:
+            entry = self.times.setdefault(name, [0.0, 0.0, 0])
+            entry[0] += wall
+            entry[1] += cpu
+            entry[2] += 1
+
+    def count(self, name, amount=1):
+        """Increment counter ``name`` (see COUNTERS)."""
+        with self._lock:
+            self.counts[name] += amount
+
+    def skip(self, rule, amount=1):
+        """Count entries skipped by ``rule``, such as 'files by name or extension'."""
+        if amount:
+            with self._lock:
+                self.skipped[rule] += amount
+
+    def file_time(self, file_path, seconds):
+        """Record the time spent on one file, keeping only the slowest ones."""
+        if self.slowest <= 0:
+            return
+        with self._lock:
+            if len(self._files) < self.slowest:
+                heapq.heappush(self._files, (seconds, file_path))
+            elif seconds > self._files[0][0]:
+                heapq.heapreplace(self._files, (seconds, file_path))
+
+    def slowest_files(self):
+        """Return the ``(seconds, path)`` of the slowest files, slowest first."""
+        with self._lock:
+            return sorted(self._files, reverse=True)
+
+    def timed(self, name, iterable):
+        """Yield the items of ``iterable``, adding the time spent producing each one to phase ``name``."""
+        iterator = iter(iterable)
+        while True:
+            with timer(self, name):
+                item = next(iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+
+    def _phases(self):
+        names = [name for name in PHASES if name in self.times]
+        return names + sorted(name for name in self.times if name not in PHASES)
+
+    def report(self):
+        """Return a multi-line report of the phases, counters, skip rules and slowest files."""
+        lines = []
+        if self.wall is not None:
+            lines.append(f"Stats: {self.wall:.3f}s wall, {self.cpu:.3f}s CPU")
+        else:
+            lines.append("Stats:")
+        lines.append(f"  {'phase':<10} {'wall':>9} {'CPU':>9} {'count':>8}")
+        for name in self._phases():
+            wall, cpu, calls = self.times[name]
+            lines.append(f"  {name:<10} {wall:>8.3f}s {cpu:>8.3f}s {calls:>8}")
+        names = [name for name in COUNTERS if name in self.counts]
+        names += sorted(name for name in self.counts if name not in COUNTERS)
+        if names:
+            lines.append('  ' + ', '.join(f"{name}: {self.counts[name]}" for name in names))
+        if self.skipped:
+            lines.append('  Skipped: ' + ', '.join(f"{count} {rule}" for rule, count in sorted(self.skipped.items())))
+        slowest = self.slowest_files()
+        if slowest:
+            lines.append(f"  Slowest {len(slowest)} files:")
+            lines.extend(f"  {seconds * 1000:>9.1f} ms  {file_path}" for seconds, file_path in slowest)
+        return '\n'.join(lines)
+
+    def summary(self):
+        """Return a one-line summary: total time, the three longest phases, bytes read and failures."""
+        phases = sorted(self._phases(), key=lambda name: self.times[name][0], reverse=True)[:3]
+        timing = ', '.join(f"{name} {self.times[name][0]:.2f}s" for name in phases)
+        parts = []
+        if self.wall is not None:
+            parts.append(f"{self.wall:.2f}s ({timing})" if timing else f"{self.wall:.2f}s")
+        elif timing:
+            parts.append(timing)
+        parts.append(f"{self.counts['bytes read']} bytes read")
+        if self.counts['decode failures']:
+            parts.append(f"{self.counts['decode failures']} decode failures")
+        slowest = self.slowest_files()
+        if slowest:
+            seconds, file_path = slowest[0]
+            parts.append(f"slowest {os.path.basename(file_path)} ({seconds * 1000:.1f} ms)")
+        return '; '.join(parts)
@@ -0,0 +1,204 @@
+import bisect
+import os
+import tempfile
+
+# Section bodies are kept in memory up to this size, then spooled to a temp file
+DEFAULT_SPOOL_SIZE = 32 * 1024 * 1024
+
+# A byte offset is recorded every this many lines for random access by line
+LINE_CHECKPOINT = 256
+
+class SectionStore:
+    """Append-only store of dump sections with a line index.
+
+    Each section's text (header, blank line, content) is written to a spooled
+    temporary file; only small metadata stays in memory. The store serves
+    whole sections (for copy, export and editing) and arbitrary line ranges
+    of the full dump (for a virtualized preview) without materializing the
+    dump as one string. Sections are separated by a newline, as in the CLI.
+
+    Items are dicts with 'path', 'name', 'header', 'error', 'line_start' and
+    'line_count' keys, plus any metadata passed to ``append`` (such as the
+    'size', 'mtime_ns', 'encoding' and 'hash' of the records built by
+    ``codedump.codedump.read_record``), so the same items can be written as
+    structured output (see ``codedump.formats``).
+    """
+
+    def __init__(self, spool_size=DEFAULT_SPOOL_SIZE):
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_size, mode='w+b')
+        self._spool_size = spool_size
+        self._end = 0
+        self._sections = []
+        self._line_starts = []
+        self.total_lines = 0
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __getitem__(self, index):
+        return self._sections[index]
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, *chunks):
+        """Store UTF-8 ``chunks`` plus a separator; return (offset, nbytes, line_count, checkpoints).
+
+        Chunks may be any objects with ``find`` that can be written as bytes
+        (``bytes`` or ``mmap``), so mapped files are copied without decoding.
+        """
+        offset = self._end
+        self._file.seek(offset)
+
+        # Byte offsets (relative to the section) of every LINE_CHECKPOINT-th line
+        checkpoints = [0]
+        line = 0
+        nbytes = 0
+        for data in chunks + (b'\n',):
+            self._file.write(data)
+            pos = data.find(b'\n')
+            while pos != -1:
+                line += 1
+                if line % LINE_CHECKPOINT == 0:
+                    checkpoints.append(nbytes + pos + 1)
+                pos = data.find(b'\n', pos + 1)
+            nbytes += len(data)
+        self._end += nbytes
+        return offset, nbytes, line, checkpoints
+
+    def append(self, path, header, content, error=None, **meta):
+        """Add a section and return its index; ``meta`` is stored in its item."""
+        return self._add(path, header, error, meta, (header + '\n' + content).encode('utf-8', 'surrogateescape'))
+
+    def append_bytes(self, path, header, data, error=None, **meta):
+        """Add a section whose content is UTF-8 ``data`` (e.g. a memory map), without decoding it."""
+        if len(data) >= self._spool_size:
+            # Go straight to disk rather than copying the data into the in-memory spool first
+            self._file.rollover()
+        return self._add(path, header, error, meta, (header + '\n').encode('utf-8', 'surrogateescape'), data)
+
+    def _add(self, path, header, error, meta, *chunks):
+        offset, nbytes, line_count, checkpoints = self._write(*chunks)
+        section = {
+            **meta,
+            'path': path,
+            'name': os.path.basename(path),
+            'header': header,
+            'error': error,
+            'line_start': self.total_lines,
+            'line_count': line_count,
+            '_offset': offset,
+            '_nbytes': nbytes,
+            '_checkpoints': checkpoints,
+        }
+        self._sections.append(section)
+        self._line_starts.append(self.total_lines)
+        self.total_lines += line_count
+        self.total_bytes += nbytes
+        return len(self._sections) - 1
+
+    def _read(self, section):
+        self._file.seek(section['_offset'])
+        return self._file.read(section['_nbytes'])
+
+    def text(self, index):
+        """Return the full text of a section (header, blank line and content)."""
+        return self._read(self._sections[index])[:-1].decode('utf-8', 'surrogateescape')
+
+    def content(self, index):
+        """Return the content of a section without its header."""
+        header = self._sections[index]['header']
+        text = self.text(index)
+        return text[len(header) + 1:] if header else text
+
+    def replace(self, index, text, header=None, **meta):
+        """Replace the full text of a section (e.g. after editing it).
+
+        The header is kept only if the new text still starts with it, and
+        any 'hash' of the original file is cleared. When the file itself
+        changed, pass the new ``header`` (which ``text`` starts with) and
+        the new metadata in ``meta`` instead.
+        """
+        section = self._sections[index]
+        if section.get('hash') is not None:
+            section['hash'] = None
+        offset, nbytes, line_count, checkpoints = self._write(text.encode('utf-8', 'surrogateescape'))
+        if header is not None:
+            section['header'] = header
+            section.update(meta)
+        elif not text.startswith(section['header'] + '\n'):
+            section['header'] = ''
+        self.total_bytes += nbytes - section['_nbytes']
+        delta = line_count - section['line_count']
+        section.update(_offset=offset, _nbytes=nbytes, _checkpoints=checkpoints, line_count=line_count)
+
+        # Shift the line index of the following sections
+        if delta:
+            for later in self._sections[index + 1:]:
+                later['line_start'] += delta
+            self._line_starts = [s['line_start'] for s in self._sections]
+            self.total_lines += delta
+
+    def section_at_line(self, line):
+        """Return the index of the section containing global line ``line``."""
+        return max(0, bisect.bisect_right(self._line_starts, line) - 1)
+
+    def read_lines(self, start, count):
+        """Return ``count`` lines of the full dump starting at line ``start`` (0-based)."""
+        if not self._sections or count <= 0 or start >= self.total_lines:
+            return ''
+
+        index = self.section_at_line(start)
+        section = self._sections[index]
+        line = start - section['line_start']
+        checkpoint = min(line // LINE_CHECKPOINT, len(section['_checkpoints']) - 1)
+        self._file.seek(section['_offset'] + section['_checkpoints'][checkpoint])
+        for _ in range(line - checkpoint * LINE_CHECKPOINT):
+            self._file.readline()
+
+        # Sections are contiguous in the file unless one was replaced, so
+        # re-seek whenever a section boundary is crossed
+        lines = []
+        remaining = min(count, self.total_lines - start)
+        left_in_section = section['line_count'] - line
+        while remaining > 0:
+            if left_in_section == 0:
+                index += 1
+                section = self._sections[index]
+                self._file.seek(section['_offset'])
+                left_in_section = section['line_count']
+            lines.append(self._file.readline())
+            left_in_section -= 1
+            remaining -= 1
+        return b''.join(lines).decode('utf-8', 'surrogateescape')
+
+    def iter_texts(self):
+        """Yield the full text of every section in order."""
+        for index in range(len(self._sections)):
+            yield self.text(index)
+
+    def iter_sections(self):
+        """Yield a copy of every item in order, with its 'content' added."""
+        for index, section in enumerate(self._sections):
+            yield dict(section, content=self.content(index))
+
+    def write_to(self, out):
+        """Stream the whole dump to a writable text file object."""
+        for index, text in enumerate(self.iter_texts()):
+            if index:
+                out.write('\n')
+            out.write(text)
+
+    def getvalue(self):
+        """Return the whole dump as one string (for the clipboard)."""
+        return '\n'.join(self.iter_texts())
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,171 @@
+import os
+from codedump.compress import open_output
+
+# Label used in chunk indexes for sections that do not belong to one file
+SUMMARY_LABEL = '<removed files>'
+
+def byte_length(text):
+    """Measure text in UTF-8 bytes (the default chunk limit unit)."""
+    return len(text.encode('utf-8', 'surrogateescape'))
+
+def shard_path(output, number):
+    """Return the path of chunk ``number`` of ``output`` (dump.txt -> dump.001.txt, dump.txt.gz -> dump.txt.001.gz)."""
+    root, ext = os.path.splitext(output)
+    return f"{root}.{number:03d}{ext}"
+
+def format_shard_header(number, directory, labels):
+    """Build the index that opens each chunk: its number and the sections it holds."""
+    lines = [
+        '#' * 80,
+        f"CodeDump chunk {number}",
+        f"Directory: {directory}",
+        f"Sections: {len(labels)}",
+    ]
+    lines.extend(f"  {label}" for label in labels)
+    lines.append('#' * 80)
+    return '\n'.join(lines) + '\n'
+
+def min_limit(directory='.', measure=byte_length):
+    """Return the smallest chunk limit that can hold part of a file directly under ``directory``.
+
+    Deeper files have longer labels in the chunk index, so they may still
+    need a larger limit (see ``ShardWriter``).
+    """
+    label = os.path.join(directory, 'x')
+    return (measure(format_shard_header(99999, directory, [])) +
+            measure(f"  {label} (part 99999 of 99999)\n") + 2)
+
+def split_text(text, limit, measure=byte_length):
+    """Split ``text`` at line boundaries into parts of at most ``limit`` (as measured).
+
+    Lines longer than the limit on their own are cut between characters.
+    """
+    pieces = []
+    for line in text.splitlines(True):
+        size = measure(line)
+        if size <= limit:
+            pieces.append((line, size))
+            continue
+        step = max(1, len(line) * limit // size)
+        start = 0
+        while start < len(line):
+            piece = line[start:start + step]
+            while len(piece) > 1 and measure(piece) > limit:
+                piece = piece[:len(piece) // 2]
+            pieces.append((piece, measure(piece)))
+            start += len(piece)
+
+    parts = []
+    current = []
+    current_size = 0
+    for piece, size in pieces:
+        if current and current_size + size > limit:
+            parts.append(''.join(current))
+            current, current_size = [], 0
+        current.append(piece)
+        current_size += size
+    if current or not parts:
+        parts.append(''.join(current))
+    return parts
+
+class ShardWriter:
+    """Write dump sections to numbered chunk files, each within ``limit``.
+
+    ``measure`` gives the size of a text in the unit of the limit (UTF-8 bytes
+    by default, or tokens with ``TokenBudget``'s estimators). Sections are
+    never split unless one alone exceeds the limit, in which case it is cut
+    at line boundaries into consecutive parts. Each chunk starts with a small
+    index of its sections. Only the chunk being filled is held in memory.
+
+    ``add`` raises ValueError if the limit leaves no room for a part of a
+    section next to its index entry; ``discard`` then removes the chunks
+    already written.
+    """
+
+    def __init__(self, output, limit, measure=byte_length, directory='.'):
+        self.output = output
+        self.limit = limit
+        self.measure = measure
+        self.directory = directory
+        # Paths of the chunks written so far
+        self.paths = []
+        # Cost of the index header without entries (with room for a large chunk number)
+        self._fixed = measure(format_shard_header(99999, directory, []))
+        self._labels = []
+        self._sections = []
+        self._size = self._fixed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def _append(self, label, section, cost):
+        self._labels.append(label)
+        self._sections.append(section)
+        self._size += cost
+
+    def add(self, file_path, section):
+        """Add the section of ``file_path`` (None for summary sections)."""
+        label = file_path if file_path is not None else SUMMARY_LABEL
+        # Every section is followed by a separator or the final newline
+        cost = self.measure(f"  {label}\n") + self.measure(section) + 1
+        if self._fixed + cost > self.limit:
+            self._add_oversized(label, section)
+            return
+        if self._size + cost > self.limit:
+            self.flush()
+        self._append(label, section, cost)
+
+    def _add_oversized(self, label, section):
+        """Split a section that does not fit in an empty chunk over several chunks."""
+        self.flush()
+        # Leave room for the longest part label ("... (part N of N)")
+        label_cost = self.measure(f"  {label} (part 99999 of 99999)\n")
+        room = self.limit - self._fixed - label_cost - 1
+        if room < 1:
+            raise ValueError(f"Chunk limit {self.limit} is too small for the chunk index of {label}")
+
+        parts = split_text(section, room, self.measure)
+        for number, part in enumerate(parts, 1):
+            part_label = f"{label} (part {number} of {len(parts)})"
+            self._append(part_label, part, self.measure(f"  {part_label}\n") + self.measure(part) + 1)
+            # The last part may share its chunk with the following sections
+            if number < len(parts):
+                self.flush()
+
+    def flush(self):
+        """Write the pending sections as the next chunk."""
+        if not self._sections:
+            return
+        path = shard_path(self.output, len(self.paths) + 1)
+        with open_output(path, 'w', encoding='utf-8') as out:
+            out.write(format_shard_header(len(self.paths) + 1, self.directory, self._labels))
+            for index, section in enumerate(self._sections):
+                if index:
+                    out.write('\n')
+                out.write(section)
+            out.write('\n')
+        self.paths.append(path)
+        self._labels = []
+        self._sections = []
+        self._size = self._fixed
+
+    def discard(self):
+        """Remove the chunks written so far and drop the pending sections."""
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.paths = []
+        self._labels = []
+        self._sections = []
+        self._size = self._fixed
+
+    def close(self):
+        """Write the last chunk and return the paths of all chunks."""
+        self.flush()
+        return self.paths
@@ -0,0 +1,203 @@
+import codecs
+from codedump.profiling import timer
+
+# Bytes inspected to classify a file before reading the rest of it
+SNIFF_SIZE = 8192
+
+# Byte order marks, longest first so UTF-32 is not mistaken for UTF-16
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Control bytes that do not occur in text files (everything below 0x20
+# except tab, newline, form feed, carriage return, backspace and escape)
+BINARY_BYTES = bytes(b for b in range(0x20) if b not in b'\t\n\x0c\r\x08\x1b')
+
+# Share of control bytes above which a file without NUL bytes is considered binary
+BINARY_THRESHOLD = 0.3
+
+# Encoding used when a file is text but not valid UTF-8
+FALLBACK_ENCODING = 'latin-1'
+
+def _guess_utf16(head):
+    """Recognize BOM-less UTF-16 by its NUL bytes at every other position."""
+    even, odd = head[0::2], head[1::2]
+    if len(odd) < 2:
+        return None
+    if odd.count(0) >= 0.9 * len(odd) and not even.count(0):
+        return 'utf-16-le'
+    if even.count(0) >= 0.9 * len(even) and not odd.count(0):
+        return 'utf-16-be'
+    return None
+
+def sniff(head):
+    """Guess the encoding of a file from its first bytes.
+
+    Returns:
+        str: A codec name, or None if the file looks binary
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    if b'\0' in head:
+        return _guess_utf16(head)
+
+    if head and len(head.translate(None, BINARY_BYTES)) < (1 - BINARY_THRESHOLD) * len(head):
+        return None
+
+    try:
+        # A multi-byte character may be cut at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8'
+
+def decode(data, encoding):
+    """Decode file contents as text mode would, with universal newlines.
+
+    Content that turns out not to be valid UTF-8 past the sniffed sample is
+    decoded with FALLBACK_ENCODING instead.
+
+    Returns:
+        tuple: (content, encoding actually used)
+    """
+    try:
+        content = data.decode(encoding)
+    except UnicodeDecodeError:
+        if not encoding.startswith('utf-8'):
+            raise
+        encoding = FALLBACK_ENCODING
+        content = data.decode(encoding)
+    return _universal_newlines(content), encoding
+
+def _universal_newlines(text):
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def read_text(file_path, digest=None, phases=None):
+    """Open and read a file once, sniffing its first SNIFF_SIZE bytes.
+
+    Binary files are detected from the sample alone and not read further.
+    If a ``digest`` (a ``hashlib`` object) is given, it is updated with the
+    raw bytes of text files. With ``phases`` (a ``PhaseStats``), reading and
+    decoding are timed separately and the bytes read are counted.
+
+    Returns:
+        tuple: (content, encoding); content is None for binary files
+
+    Raises:
+        OSError: If the file cannot be read
+        UnicodeDecodeError: If a UTF-16/32 file does not decode
+    """
+    with timer(phases, 'read'):
+        f = open(file_path, 'rb')
+    with f:
+        return read_text_stream(f, digest, phases)
+
+def read_text_stream(f, digest=None, phases=None):
+    """Like ``read_text``, for a binary file object positioned at the start of the file."""
+    with timer(phases, 'read'):
+        head = f.read(SNIFF_SIZE)
+        encoding = sniff(head)
+        data = head + f.read() if encoding is not None else head
+    if phases is not None:
+        phases.count('files read')
+        phases.count('bytes read', len(data))
+        if encoding is None:
+            phases.count('binary files')
+    if encoding is None:
+        return None, None
+    if digest is not None:
+        digest.update(data)
+    if phases is None:
+        return decode(data, encoding)
+    try:
+        with timer(phases, 'decode'):
+            content, encoding = decode(data, encoding)
+    except UnicodeDecodeError:
+        phases.count('decode failures')
+        raise
+    if encoding == FALLBACK_ENCODING:
+        # Not valid UTF-8, so decoded as latin-1
+        phases.count('decode failures')
+    return content, encoding
+
+def _unit_encoding(encoding, head):
+    """Return the code unit size of ``encoding`` and a codec for data past its BOM."""
+    if encoding == 'utf-32':
+        return 4, 'utf-32-le' if head.startswith(codecs.BOM_UTF32_LE) else 'utf-32-be'
+    if encoding == 'utf-16':
+        return 2, 'utf-16-le' if head.startswith(codecs.BOM_UTF16_LE) else 'utf-16-be'
+    if encoding.startswith('utf-16'):
+        return 2, encoding
+    return 1, 'utf-8' if encoding == 'utf-8-sig' else encoding
+
+def format_omitted(omitted):
+    """Build the marker that replaces the middle of a truncated file."""
+    return f"... [{omitted} bytes omitted] ...\n"
+
+def read_excerpt(file_path, size, limit):
+    """Read the first and last ``limit / 2`` bytes of a file of ``size`` bytes by seeking.
+
+    The middle is replaced by a marker giving the number of omitted bytes.
+    For ASCII-compatible encodings the excerpt is cut at line boundaries.
+
+    Returns:
+        tuple: (content, encoding); content is None for binary files
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    with open(file_path, 'rb') as f:
+        return read_excerpt_stream(f, size, limit)
+
+def read_excerpt_stream(f, size, limit):
+    """Like ``read_excerpt``, for a binary file object positioned at the start of the file.
+
+    The file object only needs to seek forward, so archive members work too.
+    """
+    head_size = limit // 2
+    tail_size = limit - head_size
+    data = f.read(max(head_size, SNIFF_SIZE))
+    encoding = sniff(data[:SNIFF_SIZE])
+    if encoding is None:
+        return None, None
+    unit, tail_encoding = _unit_encoding(encoding, data)
+    head = data[:head_size]
+    tail_start = max(size - tail_size, len(head))
+    if tail_start < len(data):
+        # The sniffed sample already reaches into the tail; never seek backwards
+        tail = data[tail_start:] + f.read(tail_size - (len(data) - tail_start))
+    else:
+        f.seek(tail_start)
+        tail = f.read(tail_size)
+
+    if unit == 1:
+        # Avoid starting or ending the excerpt in the middle of a line
+        cut = head.rfind(b'\n')
+        if cut != -1:
+            head = head[:cut + 1]
+        cut = tail.find(b'\n')
+        if cut != -1 and cut + 1 < len(tail):
+            tail = tail[cut + 1:]
+        elif tail_encoding == 'utf-8':
+            # Do not start in the middle of a multi-byte character
+            tail = tail.lstrip(bytes(range(0x80, 0xc0)))
+    else:
+        head = head[:len(head) - len(head) % unit]
+        tail = tail[(unit - tail_start % unit) % unit:]
+
+    omitted = size - len(head) - len(tail)
+    # The incremental decoder drops a character cut at the end of the head
+    head_text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(head)
+    tail_text = tail.decode(tail_encoding, errors='replace')
+    head_text = _universal_newlines(head_text)
+    if head_text and not head_text.endswith('\n'):
+        head_text += '\n'
+    return head_text + format_omitted(omitted) + _universal_newlines(tail_text), encoding
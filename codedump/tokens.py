@@ -0,0 +1,97 @@
+import math
+
+# Average UTF-8 bytes per token of BPE tokenizers on source code and prose
+DEFAULT_BYTES_PER_TOKEN = 4.0
+
+# Encoding used by the tiktoken estimator
+TIKTOKEN_ENCODING = 'cl100k_base'
+
+class ByteEstimator:
+    """Estimate tokens from the UTF-8 byte length of the text.
+
+    Needs no dependency and costs about as much as encoding the text, which
+    makes it suitable as the default for very large trees.
+    """
+
+    name = 'bytes'
+
+    def __init__(self, bytes_per_token=DEFAULT_BYTES_PER_TOKEN):
+        self.bytes_per_token = bytes_per_token
+
+    def count_bytes(self, nbytes):
+        """Estimate the tokens of ``nbytes`` bytes of text (used before reading a file)."""
+        return math.ceil(nbytes / self.bytes_per_token)
+
+    def count(self, text):
+        """Estimate the tokens of ``text``."""
+        return self.count_bytes(len(text.encode('utf-8', 'surrogateescape')))
+
+class TiktokenEstimator(ByteEstimator):
+    """Count tokens exactly with ``tiktoken``; sizes are still estimated from bytes."""
+
+    name = 'tiktoken'
+
+    def __init__(self, encoding=TIKTOKEN_ENCODING, bytes_per_token=DEFAULT_BYTES_PER_TOKEN):
+        import tiktoken
+        super().__init__(bytes_per_token)
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+# Estimators selectable by name; 'auto' picks the most accurate installed one
+ESTIMATORS = {
+    'bytes': ByteEstimator,
+    'tiktoken': TiktokenEstimator,
+}
+
+def get_estimator(name='auto'):
+    """Return a token estimator by name ('auto', 'bytes' or 'tiktoken').
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If the requested tokenizer is not installed
+    """
+    if name == 'auto':
+        try:
+            return TiktokenEstimator()
+        except ImportError:
+            return ByteEstimator()
+    if name not in ESTIMATORS:
+        raise ValueError(f"Unknown token estimator: {name}")
+    return ESTIMATORS[name]()
+
+class TokenBudget:
+    """Token accounting for a dump limited to ``max_tokens``.
+
+    Files are first chosen from their sizes (see ``select_within_budget`` in
+    ``codedump.codedump``); each section is then counted as it is produced and
+    dropped if it would overflow the budget, so the limit holds even when the
+    size-based estimate was too low.
+    """
+
+    def __init__(self, max_tokens, estimator=None):
+        self.max_tokens = max_tokens
+        self.estimator = estimator if estimator is not None else get_estimator()
+        self.used = 0
+        # (path, tokens) of the sections kept and of the files left out
+        self.counts = []
+        self.skipped = []
+
+    def admit(self, path, text):
+        """Count a section and return True if it fits in the remaining budget."""
+        tokens = self.estimator.count(text)
+        if self.used + tokens > self.max_tokens:
+            self.skipped.append((path, tokens))
+            return False
+        self.used += tokens
+        self.counts.append((path, tokens))
+        return True
+
+    def report(self):
+        """Return a text report of per-file token counts and the total."""
+        lines = [f"{tokens:>10}  {path}" for path, tokens in self.counts]
+        lines.extend(f"{tokens:>10}  {path} (skipped)" for path, tokens in self.skipped)
+        lines.append(f"Tokens: {self.used} of {self.max_tokens} ({self.estimator.name}), "
+                     f"{len(self.counts)} sections, {len(self.skipped)} files skipped")
+        return '\n'.join(lines)
@@ -0,0 +1,552 @@
+import os
+import queue
+import threading
+import time
+from codedump.watch import PollingWatcher, open_watcher
+
+# Number of entries handed from the scan thread to the GUI at a time
+SCAN_BATCH_SIZE = 500
+
+# Maximum number of batches waiting in the queue before the scan thread blocks
+SCAN_MAX_PENDING_BATCHES = 64
+
+# How long (s) the change monitor waits for events before checking whether it was stopped
+MONITOR_WAIT = 0.5
+
+def iter_tree_entries(directory_path, file_filter, ignore_matcher=None, cancel_event=None, recursive=True):
+    """Yield the entries of a directory tree in depth-first pre-order.
+
+    Each entry is a ``(kind, parent, path, name)`` tuple where ``kind`` is
+    'folder', 'file' or 'error'. For errors, ``path`` is a unique id and
+    ``name`` the message to display. Parents are always yielded before their
+    children, so entries can be inserted into a tree as they arrive.
+
+    Args:
+        directory_path: Directory to scan
+        file_filter: ``FileFilter`` used to skip entries
+        ignore_matcher: Optional ``IgnoreMatcher`` for ignore files
+        cancel_event: Optional ``threading.Event`` that stops the scan when set
+        recursive: Whether to descend into subdirectories
+    """
+    try:
+        with os.scandir(directory_path) as it:
+            items = list(it)
+    except PermissionError:
+        yield ('error', directory_path, f"{directory_path}_error_perm", "Access Denied (Permission Error)")
+        return
+    except Exception as e:
+        yield ('error', directory_path, f"{directory_path}_error_general", f"Error: {str(e)}")
+        return
+
+    if ignore_matcher is not None:
+        ignore_matcher.load(directory_path, {item.name for item in items})
+
+    for item in items:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+
+        # Skip items that should be filtered out (uses the DirEntry type cache)
+        if file_filter.should_skip_entry(item):
+            continue
+
+        try:
+            is_dir = item.is_dir()
+        except OSError:
+            is_dir = False
+
+        # Skip items excluded by .gitignore/.ignore/.codedumpignore
+        if ignore_matcher is not None and ignore_matcher.is_ignored(directory_path, item.name, is_dir):
+            continue
+
+        yield ('folder' if is_dir else 'file', directory_path, item.path, item.name)
+
+        if is_dir and recursive:
+            yield from iter_tree_entries(item.path, file_filter, ignore_matcher, cancel_event, recursive)
+
+class DirectoryScan:
+    """Scan a directory tree on a worker thread and hand entries over in batches.
+
+    The worker never touches Tk. The GUI calls ``drain`` periodically (from
+    ``after()``) to receive entries, and ``cancel`` to stop the scan early.
+    The queue is bounded, so a slow consumer throttles the worker.
+    """
+
+    def __init__(self, directory, file_filter, ignore_matcher=None, recursive=True, batch_size=SCAN_BATCH_SIZE):
+        self.directory = directory
+        self.file_filter = file_filter
+        self.ignore_matcher = ignore_matcher
+        self.recursive = recursive
+        self.batch_size = batch_size
+        self.count = 0
+        self.done = False
+        self.error = None
+        self._queue = queue.Queue(maxsize=SCAN_MAX_PENDING_BATCHES)
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='codedump-scan', daemon=True)
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        """Ask the worker to stop; entries already queued are discarded."""
+        self._cancel_event.set()
+
+    def _put(self, item):
+        """Queue an item, giving up if the scan is cancelled while waiting."""
+        while not self._cancel_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        batch = []
+        try:
+            entries = iter_tree_entries(self.directory, self.file_filter, self.ignore_matcher,
+                                        self._cancel_event, self.recursive)
+            for entry in entries:
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(batch)
+        except Exception as e:
+            self.error = e
+        finally:
+            # None marks the end of the scan
+            self._put(None)
+
+    def drain(self, budget=0.05):
+        """Yield queued entries until the queue is empty or ``budget`` seconds have passed."""
+        deadline = time.monotonic() + budget
+        while not self.done and not self._cancel_event.is_set() and time.monotonic() < deadline:
+            try:
+                batch = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if batch is None:
+                self.done = True
+                return
+            self.count += len(batch)
+            yield from batch
+
+class ChangeMonitor:
+    """Collect file system changes under a directory on a worker thread.
+
+    The worker sets up a watcher (see ``codedump.watch.open_watcher``) and
+    accumulates the changed paths and renames it reports; it never touches
+    Tk. The GUI calls ``drain`` periodically to take what has accumulated,
+    and ``stop`` when it no longer needs updates.
+    """
+
+    def __init__(self, directory, file_filter, poll_interval=None):
+        self.directory = directory
+        self.file_filter = file_filter
+        self.poll_interval = poll_interval
+        self.method = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._renames = {}
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='codedump-monitor', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Ask the worker to stop; it closes its watcher within MONITOR_WAIT seconds."""
+        self._stop_event.set()
+
+    def _run(self):
+        try:
+            # Setting up inotify walks the whole tree, so it is done here rather than on the GUI thread
+            with open_watcher(self.directory, self.file_filter, poll_interval=self.poll_interval) as watcher:
+                self.method = 'polling' if isinstance(watcher, PollingWatcher) else 'inotify'
+                while not self._stop_event.is_set():
+                    changed = watcher.wait(MONITOR_WAIT)
+                    if not changed:
+                        continue
+                    with self._lock:
+                        self._changed |= changed
+                        for old, new in watcher.renames.items():
+                            # Follow chains of renames (a -> b, then b -> c)
+                            for first, last in self._renames.items():
+                                if last == old:
+                                    old = first
+                                    break
+                            self._renames[old] = new
+        except Exception as e:
+            self.error = e
+
+    def drain(self):
+        """Return ``(changed paths, {old path: new path})`` accumulated since the last call."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            renames, self._renames = self._renames, {}
+        return changed, renames
+
+class SelectionNode:
+    """One file or folder in a ``SelectionModel``.
+
+    ``checked`` and ``stamp`` record the state this node was last given and
+    when. ``count`` caches the number of checked loaded descendants as of
+    ``count_stamp``; ``total`` is the exact number of loaded descendants.
+    """
+
+    __slots__ = ('path', 'parent', 'is_dir', 'children', 'checked', 'stamp', 'total', 'count', 'count_stamp')
+
+    def __init__(self, path, parent, is_dir, checked, stamp):
+        self.path = path
+        self.parent = parent
+        self.is_dir = is_dir
+        # Folders start unloaded (None) until their children are scanned
+        self.children = None
+        self.checked = checked
+        self.stamp = stamp
+        self.total = 0
+        self.count = 0
+        self.count_stamp = stamp
+
+class SelectionModel:
+    """Check state of the GUI file tree, kept in a path trie instead of Treeview tags.
+
+    Nodes are keyed by path, which is also the Treeview item id. Checking a
+    folder does not visit its descendants: the folder gets a new stamp, and
+    the effective state of any node is the state of the most recently
+    stamped node on its path from the root. Every node also caches how many
+    of its loaded descendants are checked; the cache is updated along the
+    toggled path and derived from newer ancestor stamps below it. Toggling
+    therefore costs O(depth), and enumerating the checked entries skips
+    subtrees with nothing checked without touching the filesystem.
+
+    A folder whose children have not been scanned yet is "unloaded": its
+    children inherit its state when they are added, and enumeration expands
+    unloaded checked folders on demand.
+    """
+
+    def __init__(self, root, initial_states=None):
+        """
+        Args:
+            root: Root directory path
+            initial_states: Optional {path: checked} applied to nodes as they
+                are added, e.g. the ``overrides()`` of a previous model
+        """
+        self.initial_states = dict(initial_states or {})
+        self._clock = 0
+        self.root = SelectionNode(root, None, True, self.initial_states.get(root, False), 0)
+        self.nodes = {root: self.root}
+
+    def __contains__(self, path):
+        return path in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get(self, path):
+        return self.nodes.get(path)
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    @staticmethod
+    def _ancestry(node):
+        """Return the nodes from the root down to ``node`` (inclusive)."""
+        chain = []
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        chain.reverse()
+        return chain
+
+    @staticmethod
+    def _child_state(child, best):
+        """Resolve a child given ``best``, the most recently stamped node above it.
+
+        Returns:
+            tuple: (best node for the child's own descendants, checked, count)
+        """
+        if best.stamp > child.count_stamp:
+            count = child.total if best.checked else 0
+        else:
+            count = child.count
+        if child.stamp > best.stamp:
+            best = child
+        return best, best.checked, count
+
+    def _resolve(self, node):
+        """Return ``(best, checked, count)`` for a node in one pass down from the root."""
+        chain = self._ancestry(node)
+        best = chain[0]
+        checked, count = best.checked, best.count
+        for current in chain[1:]:
+            best, checked, count = self._child_state(current, best)
+        return best, checked, count
+
+    def _adjust_ancestors(self, node, total_delta, count_delta):
+        """Apply a change in the loaded/checked descendants of ``node`` to its ancestors."""
+        chain = self._ancestry(node)[:-1]
+        if not chain:
+            return
+        stamp = self._tick()
+        resolved = []
+        best = chain[0]
+        resolved.append(best.count)
+        for current in chain[1:]:
+            best, _, count = self._child_state(current, best)
+            resolved.append(count)
+        for current, count in zip(chain, resolved):
+            current.total += total_delta
+            current.count = count + count_delta
+            current.count_stamp = stamp
+
+    def add(self, parent_path, path, is_dir):
+        """Add a child under ``parent_path``; its state is inherited from the parent.
+
+        Returns:
+            SelectionNode: The new (or existing) node
+        """
+        node = self.nodes.get(path)
+        if node is not None:
+            return node
+
+        parent = self.nodes[parent_path]
+        if parent.children is None:
+            parent.children = {}
+        checked = self.initial_states.get(path)
+        if checked is None:
+            checked = self._resolve(parent)[1]
+        node = SelectionNode(path, parent, is_dir, checked, self._tick())
+        parent.children[path] = node
+        self.nodes[path] = node
+        self._adjust_ancestors(node, 1, 1 if checked else 0)
+        return node
+
+    def mark_loaded(self, path):
+        """Record that the children of folder ``path`` are being added."""
+        node = self.nodes[path]
+        if node.children is None:
+            node.children = {}
+
+    def is_loaded(self, path):
+        node = self.nodes.get(path)
+        return node is not None and node.children is not None
+
+    def _walk(self, node, best, prune=False, keep=()):
+        """Yield ``(descendant, checked, parent_checked)`` in pre-order below ``node``.
+
+        Args:
+            node: Node whose descendants are visited
+            best: The most recently stamped node on the path to ``node`` (inclusive)
+            prune: Skip the descendants of nodes with no checked descendants
+            keep: Paths of folders never pruned
+        """
+        if not node.children:
+            return
+        stack = [(iter(node.children.values()), best)]
+        while stack:
+            children, best = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            child_best, checked, count = self._child_state(child, best)
+            yield child, checked, best.checked
+            if child.children and not (prune and count == 0 and child.path not in keep):
+                stack.append((iter(child.children.values()), child_best))
+
+    def _forget_descendants(self, node):
+        """Drop the descendants of ``node``, keeping their explicit states for later."""
+        best, _, count = self._resolve(node)
+        for child, checked, parent_checked in self._walk(node, best):
+            # Keep explicit states so they are reapplied if the child is added again
+            if checked != parent_checked:
+                self.initial_states[child.path] = checked
+            else:
+                self.initial_states.pop(child.path, None)
+            del self.nodes[child.path]
+        return count
+
+    def unload(self, path):
+        """Drop the children of folder ``path`` so it is scanned again later."""
+        node = self.nodes.get(path)
+        if node is None or not node.is_dir or node.children is None:
+            return
+        count = self._forget_descendants(node)
+        self._adjust_ancestors(node, -node.total, -count)
+        node.children = None
+        node.total = node.count = 0
+        node.count_stamp = self._tick()
+
+    def remove(self, path):
+        """Remove a node and its descendants."""
+        node = self.nodes.get(path)
+        if node is None or node.parent is None:
+            return
+        _, checked, _ = self._resolve(node)
+        count = self._forget_descendants(node)
+        self._adjust_ancestors(node, -(node.total + 1), -(count + (1 if checked else 0)))
+        self.initial_states.pop(path, None)
+        del node.parent.children[path]
+        del self.nodes[path]
+
+    def rename(self, path, new_path):
+        """Remove ``path``, carrying its state and the explicit states below it over to ``new_path``.
+
+        The states are applied when ``new_path`` is added, or right away if
+        it already is.
+        """
+        node = self.nodes.get(path)
+        if node is None or node.parent is None:
+            return
+        checked = self._resolve(node)[1]
+        self.remove(path)
+        prefix = os.path.join(path, '')
+        moved = {os.path.join(new_path, key[len(prefix):]): self.initial_states.pop(key)
+                 for key in [key for key in self.initial_states if key.startswith(prefix)]}
+        if new_path in self.nodes:
+            self.set_checked(new_path, checked)
+        else:
+            self.initial_states[new_path] = checked
+        self.initial_states.update(moved)
+
+    def is_checked(self, path):
+        node = self.nodes.get(path)
+        return node is not None and self._resolve(node)[1]
+
+    def checked_count(self, path=None):
+        """Return the number of checked loaded descendants of ``path`` (default: root)."""
+        node = self.nodes.get(path) if path is not None else self.root
+        return self._resolve(node)[2] if node is not None else 0
+
+    def set_checked(self, path, checked):
+        """Set the state of a node and, implicitly, of all its descendants."""
+        node = self.nodes[path]
+
+        # Explicit states saved for descendants that are not loaded are superseded
+        if self.initial_states:
+            prefix = os.path.join(path, '')
+            for key in [key for key in self.initial_states if key == path or key.startswith(prefix)]:
+                del self.initial_states[key]
+
+        _, was_checked, old_count = self._resolve(node)
+        new_count = node.total if checked else 0
+        node.checked = checked
+        node.stamp = self._tick()
+        node.count = new_count
+        node.count_stamp = node.stamp
+        self._adjust_ancestors(node, 0, (new_count + (1 if checked else 0)) - (old_count + (1 if was_checked else 0)))
+
+    def iter_states(self, path, visible=None):
+        """Yield ``(path, checked)`` for the loaded descendants of ``path``.
+
+        Args:
+            path: Folder whose descendants are visited
+            visible: Optional predicate on a folder path; only the children
+                of folders for which it returns True are visited
+        """
+        node = self.nodes[path]
+        best = self._resolve(node)[0]
+        if not node.children:
+            return
+        stack = [(iter(node.children.values()), best)]
+        while stack:
+            children, best = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            child_best, checked, _ = self._child_state(child, best)
+            yield child.path, checked
+            if child.children and (visible is None or visible(child.path)):
+                stack.append((iter(child.children.values()), child_best))
+
+    def _pending(self):
+        """Return the explicit states saved for entries below unloaded folders.
+
+        Returns:
+            tuple: ({path: checked}, set of the folders on the path from the
+            root to the unloaded folders holding those entries)
+        """
+        states = {}
+        folders = set()
+        for path, checked in self.initial_states.items():
+            if path in self.nodes:
+                continue
+            # Find the nearest node above the entry
+            parent = os.path.dirname(path)
+            while parent not in self.nodes and parent != os.path.dirname(parent):
+                parent = os.path.dirname(parent)
+            node = self.nodes.get(parent)
+            # States left under loaded folders belong to entries that were removed
+            if node is None or node.children is not None:
+                continue
+            states[path] = checked
+            while node is not None and node.path not in folders:
+                folders.add(node.path)
+                node = node.parent
+        return states, folders
+
+    @staticmethod
+    def _filter_expanded(entries, path, checked, states):
+        """Yield the checked ``(path, is_dir)`` entries of an expanded folder.
+
+        The state of each entry is its own in ``states``, or else the state of
+        its folder; ``checked`` is the state of the expanded folder ``path``.
+        """
+        folders = {path: checked}
+        for entry_path, is_dir in entries:
+            entry_checked = states.get(entry_path)
+            if entry_checked is None:
+                entry_checked = folders.get(os.path.dirname(entry_path), checked)
+            if is_dir:
+                folders[entry_path] = entry_checked
+            if entry_checked:
+                yield entry_path, is_dir
+
+    def overrides(self):
+        """Return {path: checked} for the root, every node that differs from its parent
+        and the explicit states still waiting for their entries to be added."""
+        states = self._pending()[0]
+        states[self.root.path] = self.root.checked
+        for node, checked, parent_checked in self._walk(self.root, self.root):
+            if checked != parent_checked:
+                states[node.path] = checked
+        return states
+
+    def iter_checked(self, expand=None):
+        """Yield ``(path, is_dir)`` for every checked entry, in tree order.
+
+        Subtrees with no checked entries are skipped using the cached counts,
+        unless they hold unloaded folders with saved explicit states.
+
+        Args:
+            expand: Optional callable returning the ``(path, is_dir)``
+                descendants of an unloaded folder, in pre-order. Without it,
+                unloaded folders contribute only themselves. Explicit states
+                saved for their descendants (see ``initial_states``) are
+                applied to what it returns.
+        """
+        pending, holders = self._pending()
+
+        def emit(node, checked):
+            if checked:
+                yield node.path, node.is_dir
+            if node.is_dir and node.children is None and expand is not None:
+                if node.path in holders:
+                    yield from self._filter_expanded(expand(node.path), node.path, checked, pending)
+                elif checked:
+                    yield from expand(node.path)
+
+        yield from emit(self.root, self.root.checked)
+        for node, checked, _ in self._walk(self.root, self.root, prune=True, keep=holders):
+            yield from emit(node, checked)
@@ -0,0 +1,296 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# Seconds without events after which a burst of changes is reported
+DEFAULT_DEBOUNCE = 0.2
+
+# Longest a continuous burst of events may delay a report (seconds)
+MAX_DELAY = 2.0
+
+# Seconds between scans of the polling fallback
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Events watched on every directory; renames are reported on both ends, so
+# editors that save by writing a temporary file and renaming it over the
+# original show up as a change of the original
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+# struct inotify_event header: wd, mask, cookie, len (followed by the name)
+EVENT_HEADER = struct.Struct('iIII')
+
+# Bytes read from the inotify descriptor at a time
+READ_SIZE = 64 * 1024
+
+def _load_inotify():
+    """Return libc with the inotify functions declared, or None where inotify is not available."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class InotifyWatcher:
+    """Report changed paths under ``directory`` from Linux inotify events.
+
+    inotify is used through ``ctypes`` and the C library, so no extra
+    package is needed. Every directory not skipped by ``file_filter`` is
+    watched; directories created or moved in are watched as they appear.
+    ``wait`` returns the set of paths (files or directories) with events,
+    once no event has arrived for ``debounce`` seconds. Paths are built with
+    ``os.path.join`` from ``directory``, as ``os.walk`` builds them. When the
+    kernel queue overflows, ``directory`` itself is reported. After each
+    ``wait``, ``renames`` maps the old path of every rename within the tree
+    to its new path (both are also among the changed paths).
+
+    Raises:
+        OSError: If inotify is not available or the watch limit is reached
+    """
+
+    def __init__(self, directory, file_filter, debounce=DEFAULT_DEBOUNCE):
+        self.directory = directory
+        self.file_filter = file_filter
+        self.debounce = debounce
+        self._libc = _load_inotify()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # Watch descriptor <-> directory path
+        self._paths = {}
+        self._watches = {}
+        self.renames = {}
+        # Cookie -> old path of a rename whose second half has not been read yet
+        self._moved_from = {}
+        try:
+            self._add_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, 'inotify watch limit reached (see fs.inotify.max_user_watches)')
+            # The directory vanished or cannot be read; its parent still reports it
+            return
+        self._paths[wd] = path
+        self._watches[path] = wd
+
+    def _add_tree(self, path):
+        for root, dirs, _ in os.walk(path):
+            dirs[:] = [d for d in dirs if not self.file_filter.skip_directory(d)]
+            self._add_watch(root)
+
+    def _remove_tree(self, path):
+        prefix = path + os.sep
+        for watched in [p for p in self._watches if p == path or p.startswith(prefix)]:
+            wd = self._watches.pop(watched)
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self, changed):
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                self._handle(wd, mask, cookie, os.fsdecode(name), changed)
+
+    def _handle(self, wd, mask, cookie, name, changed):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost; only a full rescan can tell what changed
+            changed.add(self.directory)
+            return
+        dir_path = self._paths.get(wd)
+        if dir_path is None:
+            return
+        if mask & IN_IGNORED:
+            # The watch was removed (directory deleted or unmounted)
+            del self._paths[wd]
+            if self._watches.get(dir_path) == wd:
+                del self._watches[dir_path]
+            return
+        if not name:
+            # An event on the watched directory itself (deleted or moved away)
+            changed.add(dir_path)
+            return
+
+        path = os.path.join(dir_path, name)
+        # The two halves of a rename share a cookie
+        if mask & IN_MOVED_FROM:
+            self._moved_from[cookie] = path
+        elif mask & IN_MOVED_TO and cookie in self._moved_from:
+            self.renames[self._moved_from.pop(cookie)] = path
+        if mask & IN_ISDIR:
+            if self.file_filter.skip_directory(name):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(path)
+            elif mask & IN_MOVED_FROM:
+                self._remove_tree(path)
+        changed.add(path)
+
+    def _ready(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        return bool(ready)
+
+    def wait(self, timeout=None):
+        """Wait up to ``timeout`` seconds (forever if None) for changes.
+
+        Returns:
+            set: Changed paths, empty if nothing changed before the timeout
+        """
+        changed = set()
+        self.renames = {}
+        # Files moved out of the tree never get a second half
+        self._moved_from.clear()
+        if not self._ready(timeout):
+            return changed
+        deadline = time.monotonic() + MAX_DELAY
+        while True:
+            self._read_events(changed)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._ready(min(self.debounce, remaining)):
+                return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PollingWatcher:
+    """Report changed files under ``directory`` by rescanning it periodically.
+
+    The fallback where inotify is not available: every ``interval`` seconds
+    the tree (minus directories skipped by ``file_filter``) is listed and
+    each file's size and mtime compared with the previous scan. Changes are
+    reported once a scan finds nothing new for ``debounce`` seconds. Only
+    file paths are reported, and renames show up as a removal and an
+    addition (``renames`` is always empty).
+    """
+
+    def __init__(self, directory, file_filter, debounce=DEFAULT_DEBOUNCE, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.file_filter = file_filter
+        self.debounce = debounce
+        self.interval = interval
+        self.renames = {}
+        self._snapshot = self._scan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _scan(self):
+        """Return {path: (size, mtime_ns)} for the files under the directory."""
+        files = {}
+        pending = [self.directory]
+        while pending:
+            dir_path = pending.pop()
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not self.file_filter.skip_directory(entry.name):
+                                    pending.append(os.path.join(dir_path, entry.name))
+                            elif entry.is_file():
+                                stats = entry.stat()
+                                files[os.path.join(dir_path, entry.name)] = (stats.st_size, stats.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return files
+
+    def _changes(self):
+        current = self._scan()
+        previous = self._snapshot
+        self._snapshot = current
+        return {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+
+    def wait(self, timeout=None):
+        """Wait up to ``timeout`` seconds (forever if None) for changes.
+
+        Returns:
+            set: Changed file paths, empty if nothing changed before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+                if delay < 0:
+                    return set()
+            time.sleep(delay)
+            changed = self._changes()
+            if changed:
+                break
+        burst_end = time.monotonic() + MAX_DELAY
+        while time.monotonic() < burst_end:
+            time.sleep(self.debounce)
+            more = self._changes()
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def close(self):
+        pass
+
+def open_watcher(directory, file_filter, debounce=DEFAULT_DEBOUNCE, poll_interval=None):
+    """Return an ``InotifyWatcher`` for ``directory``, or a ``PollingWatcher`` if inotify cannot be used.
+
+    Passing a ``poll_interval`` forces polling at that interval.
+    """
+    if poll_interval is None:
+        try:
+            return InotifyWatcher(directory, file_filter, debounce)
+        except OSError:
+            poll_interval = DEFAULT_POLL_INTERVAL
+    return PollingWatcher(directory, file_filter, debounce, poll_interval)
@@ -31,6 +31,7 @@ setup(
     entry_points={
         "console_scripts": [
             "codedump=codedump.codedump:main",
+            "codedump-client=codedump.client:main",
         ],
     },
 )
\ No newline at end of file
@@ -0,0 +1,90 @@
+import collections
+import os
+import tempfile
+import time
+import unittest
+from codedump.cache import RACY_WINDOW_NS, ContentCache, is_racy
+
+Stats = collections.namedtuple('Stats', 'st_size st_mtime_ns')
+
+# A modification time old enough to be trusted
+OLD_MTIME_NS = int((time.time() - 60) * 1e9)
+
+def file_info(stats):
+    return {'size': stats.st_size, 'mtime_ns': stats.st_mtime_ns, 'last_modified': '2024-01-01 00:00:00'}
+
+class ContentCacheTest(unittest.TestCase):
+    """Entries are served while size and mtime match, and evicted least recently used first."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cache(self, max_bytes=1000):
+        return ContentCache(self.tmp.name, max_bytes=max_bytes)
+
+    def put(self, cache, name, content, mtime_ns=OLD_MTIME_NS):
+        stats = Stats(len(content), mtime_ns)
+        cache.put(os.path.join(self.tmp.name, name), stats, file_info(stats), content)
+        return stats
+
+    def get(self, cache, name, stats):
+        return cache.get(os.path.join(self.tmp.name, name), stats)
+
+    def test_hit_and_miss(self):
+        with self.cache() as cache:
+            stats = self.put(cache, 'a.py', 'abc')
+            self.assertEqual(self.get(cache, 'a.py', stats), (file_info(stats), 'abc'))
+            self.assertIsNone(self.get(cache, 'a.py', Stats(3, stats.st_mtime_ns + 1)))
+            self.assertIsNone(self.get(cache, 'a.py', Stats(4, stats.st_mtime_ns)))
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_persists_across_instances(self):
+        with self.cache() as cache:
+            stats = self.put(cache, 'a.py', 'abc')
+        with self.cache() as cache:
+            self.assertEqual(self.get(cache, 'a.py', stats)[1], 'abc')
+
+    def test_racy_mtime_not_cached(self):
+        with self.cache() as cache:
+            stats = self.put(cache, 'a.py', 'abc', mtime_ns=int(time.time() * 1e9))
+            self.assertIsNone(self.get(cache, 'a.py', stats))
+            self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        with self.cache(max_bytes=250) as cache:
+            first = self.put(cache, 'a.py', 'a' * 100)
+            second = self.put(cache, 'b.py', 'b' * 100)
+            # Using the first entry makes the second the least recently used
+            self.assertIsNotNone(self.get(cache, 'a.py', first))
+            self.put(cache, 'c.py', 'c' * 100)
+            self.assertIsNone(self.get(cache, 'b.py', second))
+            self.assertIsNotNone(self.get(cache, 'a.py', first))
+            self.assertEqual(cache.evictions, 1)
+            self.assertLessEqual(cache.stats()['bytes'], 250)
+
+    def test_smaller_limit_applies_on_open(self):
+        with self.cache() as cache:
+            for name in ('a.py', 'b.py', 'c.py'):
+                self.put(cache, name, name[0] * 100)
+        with self.cache(max_bytes=150) as cache:
+            self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_oversized_content_not_cached(self):
+        with self.cache(max_bytes=10) as cache:
+            self.put(cache, 'a.py', 'x' * 11)
+            self.assertEqual(cache.stats()['entries'], 0)
+
+class IsRacyTest(unittest.TestCase):
+    """Modification times within RACY_WINDOW_NS of now, or in the future, are not trusted."""
+
+    def test_is_racy(self):
+        now = int(time.time() * 1e9)
+        self.assertTrue(is_racy(now))
+        self.assertTrue(is_racy(now + 10 ** 9))
+        self.assertFalse(is_racy(now - 2 * RACY_WINDOW_NS))
+
+if __name__ == '__main__':
+    unittest.main()
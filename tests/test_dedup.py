@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from codedump.dedup import Deduplicator
+
+class DeduplicatorTest(unittest.TestCase):
+    """Only byte-identical files are reported as copies."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def first_copies(self, paths):
+        dedup = Deduplicator()
+        paths = dedup.group_sizes(paths)
+        return dedup, [dedup.first_copy(path, os.path.getsize(path), dedup.digest(path, os.path.getsize(path)))
+                       for path in paths]
+
+    def test_identical_files(self):
+        a = self.write('a.py', b'x = 1\n')
+        b = self.write('b.py', b'x = 1\n')
+        c = self.write('c.py', b'y = 2\n')
+        dedup, firsts = self.first_copies([a, b, c])
+        self.assertEqual(firsts, [None, a, None])
+        self.assertEqual((dedup.duplicates, dedup.bytes_saved), (1, 6))
+
+    def test_unique_sizes_not_hashed(self):
+        dedup = Deduplicator()
+        a = self.write('a.py', b'x = 1\n')
+        b = self.write('b.py', b'x = 10\n')
+        dedup.group_sizes([a, b])
+        self.assertIsNone(dedup.digest(a, 6))
+
+    def test_same_text_different_bytes(self):
+        # Same size, and the same text once newlines are translated
+        a = self.write('a.py', b'x = 1\r\ny = 2\n')
+        b = self.write('b.py', b'x = 1\ny = 2\r\n')
+        c = self.write('c.py', b'x = 1\r\ny = 2\n')
+        _, firsts = self.first_copies([a, b, c])
+        self.assertEqual(firsts, [None, None, a])
+
+    def test_unreadable_file_not_a_copy(self):
+        a = self.write('a.py', b'x = 1\n')
+        dedup = Deduplicator()
+        dedup.group_sizes([a, a])
+        os.remove(a)
+        self.assertIsNone(dedup.digest(a, 6))
+
+if __name__ == '__main__':
+    unittest.main()
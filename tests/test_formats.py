@@ -0,0 +1,104 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from codedump.codedump import write_dump, write_records
+from codedump.compress import open_output
+from codedump.formats import BinaryReader, read_dump
+from codedump.manifest import hash_file
+
+class FormatsRoundTripTest(unittest.TestCase):
+    """Dumps written in each format read back to the same files and contents."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'src')
+        os.makedirs(os.path.join(self.root, 'pkg'))
+        self.files = {
+            'a.py': b'print("a")\n',
+            'pkg/b.md': 'café €\n\nlast line without newline'.encode('utf-8'),
+            'pkg/c.txt': b'latin-1 \xe9\n',
+            'empty.txt': b'',
+        }
+        for rel_path, data in self.files.items():
+            self.write(rel_path, data)
+        # Binary files are left out of every format
+        self.write('pkg/image.json', b'\x89PNG\r\n\x1a\n\x00\x00')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, data):
+        with open(self.path(rel_path), 'wb') as f:
+            f.write(data)
+
+    def path(self, rel_path):
+        return os.path.join(self.root, *rel_path.split('/'))
+
+    def output(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def expected_contents(self):
+        return {
+            self.path('a.py'): 'print("a")\n',
+            self.path('pkg/b.md'): 'café €\n\nlast line without newline',
+            self.path('pkg/c.txt'): 'latin-1 é\n',
+            self.path('empty.txt'): '',
+        }
+
+    def write_structured(self, format, name):
+        output = self.output(name)
+        if format == 'binary':
+            out = open_output(output, 'wb')
+        else:
+            out = open_output(output, 'w', encoding='utf-8', errors='surrogateescape')
+        with out:
+            count = write_records(out, format, self.root)
+        self.assertEqual(count, len(self.files))
+        return output
+
+    def check_records(self, records):
+        self.assertEqual({record['path']: record['content'] for record in records}, self.expected_contents())
+        for record in records:
+            rel_path = os.path.relpath(record['path'], self.root).replace(os.sep, '/')
+            self.assertEqual(record['size'], len(self.files[rel_path]))
+            self.assertEqual(record['hash'], hash_file(record['path']))
+
+    def test_jsonl(self):
+        self.check_records(list(read_dump(self.write_structured('jsonl', 'dump.jsonl'))))
+
+    def test_jsonl_gzip(self):
+        output = self.write_structured('jsonl', 'dump.jsonl.gz')
+        with gzip.open(output, 'rb') as f:
+            self.assertEqual(f.read(1), b'{')
+        self.check_records(list(read_dump(output)))
+
+    def test_binary(self):
+        output = self.write_structured('binary', 'dump.bin')
+        records = list(read_dump(output))
+        self.check_records(records)
+        with open(output, 'rb') as f:
+            reader = BinaryReader(f)
+            self.assertEqual(len(reader), len(records))
+            self.assertEqual(reader[2], records[2])
+            self.assertNotIn('content', reader.meta(1))
+            self.assertEqual(reader.meta(1)['path'], records[1]['path'])
+
+    def test_binary_gzip(self):
+        self.check_records(list(read_dump(self.write_structured('binary', 'dump.bin.gz'))))
+
+    def test_text(self):
+        output = self.output('dump.txt')
+        with open(output, 'w', encoding='utf-8') as out:
+            write_dump(out, self.root)
+            out.write('\n')
+        records = list(read_dump(output))
+        self.assertEqual({record['path']: record['content'] for record in records}, self.expected_contents())
+
+    def test_not_a_binary_dump(self):
+        with self.assertRaises(ValueError):
+            BinaryReader(io.BytesIO(b'not a dump at all'))
+
+if __name__ == '__main__':
+    unittest.main()
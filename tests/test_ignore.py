@@ -0,0 +1,109 @@
+import os
+import re
+import tempfile
+import unittest
+from codedump.ignore import IgnoreMatcher, translate_pattern
+
+class TranslatePatternTest(unittest.TestCase):
+    """Globs translate to regexes matching '/'-separated relative paths as git does."""
+
+    def matches(self, pattern, path):
+        return re.match(f'^{translate_pattern(pattern)}$', path) is not None
+
+    def test_star_stays_in_one_directory(self):
+        self.assertTrue(self.matches('*.py', 'a.py'))
+        self.assertFalse(self.matches('*.py', 'src/a.py'))
+        self.assertTrue(self.matches('src/*.py', 'src/a.py'))
+
+    def test_double_star(self):
+        self.assertTrue(self.matches('**/gen', 'gen'))
+        self.assertTrue(self.matches('**/gen', 'a/b/gen'))
+        self.assertTrue(self.matches('a/**/b', 'a/b'))
+        self.assertTrue(self.matches('a/**/b', 'a/x/y/b'))
+        self.assertTrue(self.matches('logs/**', 'logs/x/y.txt'))
+        self.assertFalse(self.matches('logs/**', 'logs'))
+
+    def test_question_mark_and_classes(self):
+        self.assertTrue(self.matches('?.c', 'a.c'))
+        self.assertFalse(self.matches('?.c', '/.c'))
+        self.assertTrue(self.matches('[ab].txt', 'b.txt'))
+        self.assertFalse(self.matches('[!ab].txt', 'b.txt'))
+        self.assertTrue(self.matches('[!ab].txt', 'c.txt'))
+
+    def test_escapes(self):
+        self.assertTrue(self.matches('\\*.txt', '*.txt'))
+        self.assertFalse(self.matches('\\*.txt', 'a.txt'))
+        self.assertTrue(self.matches('a+b(1).txt', 'a+b(1).txt'))
+
+class IgnoreMatcherTest(unittest.TestCase):
+    """Ignore files combine down the tree; the last matching rule wins."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, 'sub', 'deep'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.root, *rel_path.split('/')), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def ignored(self, rel_path, is_dir=False, matcher=None):
+        matcher = matcher or IgnoreMatcher(self.root)
+        parts = rel_path.split('/')
+        return matcher.is_ignored(os.path.join(self.root, *parts[:-1]), parts[-1], is_dir)
+
+    def test_negation(self):
+        self.write('.gitignore', '*.log\n!keep.log\n')
+        self.assertTrue(self.ignored('a.log'))
+        self.assertFalse(self.ignored('keep.log'))
+        self.assertTrue(self.ignored('sub/b.log'))
+        self.assertFalse(self.ignored('sub/keep.log'))
+
+    def test_anchoring(self):
+        self.write('.gitignore', '/build\ndoc/*.txt\nname.py\n')
+        self.assertTrue(self.ignored('build', is_dir=True))
+        self.assertFalse(self.ignored('sub/build', is_dir=True))
+        self.assertFalse(self.ignored('sub/doc/a.txt'))
+        self.assertTrue(self.ignored('sub/deep/name.py'))
+
+    def test_directory_only(self):
+        self.write('.gitignore', 'tmp/\n')
+        self.assertTrue(self.ignored('tmp', is_dir=True))
+        self.assertTrue(self.ignored('sub/tmp', is_dir=True))
+        self.assertFalse(self.ignored('tmp'))
+
+    def test_double_star_rules(self):
+        self.write('.gitignore', 'sub/**/*.txt\n')
+        self.assertTrue(self.ignored('sub/a.txt'))
+        self.assertTrue(self.ignored('sub/deep/a.txt'))
+        self.assertFalse(self.ignored('a.txt'))
+
+    def test_deeper_files_take_precedence(self):
+        self.write('.gitignore', '*.md\n')
+        self.write('sub/.gitignore', '!*.md\n')
+        self.write('sub/deep/.codedumpignore', 'notes.md\n')
+        self.assertTrue(self.ignored('a.md'))
+        self.assertFalse(self.ignored('sub/a.md'))
+        self.assertFalse(self.ignored('sub/deep/a.md'))
+        self.assertTrue(self.ignored('sub/deep/notes.md'))
+
+    def test_comments_and_trailing_spaces(self):
+        self.write('.ignore', '# a.py\na.txt   \nb\\ \n')
+        self.assertFalse(self.ignored('# a.py'))
+        self.assertTrue(self.ignored('a.txt'))
+        self.assertTrue(self.ignored('b '))
+
+    def test_forget_rereads_rules(self):
+        matcher = IgnoreMatcher(self.root)
+        self.write('sub/.gitignore', 'a.py\n')
+        self.assertTrue(self.ignored('sub/a.py', matcher=matcher))
+        self.write('sub/.gitignore', 'b.py\n')
+        self.assertTrue(self.ignored('sub/a.py', matcher=matcher))
+        matcher.forget(os.path.join(self.root, 'sub'))
+        self.assertFalse(self.ignored('sub/a.py', matcher=matcher))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from codedump.limits import SizeCaps, parse_size
+
+class ParseSizeTest(unittest.TestCase):
+    """Sizes take optional binary unit suffixes."""
+
+    def test_units(self):
+        self.assertEqual(parse_size('500'), 500)
+        self.assertEqual(parse_size('64K'), 64 * 1024)
+        self.assertEqual(parse_size('10mb'), 10 * 1024 ** 2)
+        self.assertEqual(parse_size('1.5GiB'), int(1.5 * 1024 ** 3))
+
+    def test_invalid(self):
+        for text in ('', 'M', '-1', '10X', '1.2.3'):
+            with self.assertRaises(ValueError, msg=text):
+                parse_size(text)
+
+class SizeCapsTest(unittest.TestCase):
+    """Files are kept in order until the total cap, counting excerpts at their capped size."""
+
+    def test_total_cap(self):
+        caps = SizeCaps(max_total_size=100)
+        self.assertTrue(caps.admit('a', 60))
+        self.assertFalse(caps.admit('b', 50))
+        # A later smaller file still fits
+        self.assertTrue(caps.admit('c', 40))
+        self.assertEqual(caps.total, 100)
+        self.assertEqual(caps.skipped, [('b', 50)])
+
+    def test_truncated_files_count_at_excerpt_size(self):
+        caps = SizeCaps(max_file_size=30, max_total_size=100)
+        self.assertTrue(caps.truncates(31))
+        self.assertFalse(caps.truncates(30))
+        for name in 'abc':
+            self.assertTrue(caps.admit(name, 1000))
+        self.assertEqual(caps.total, 90)
+        self.assertEqual(len(caps.truncated), 3)
+        self.assertFalse(caps.admit('d', 1000))
+
+    def test_release(self):
+        caps = SizeCaps(max_file_size=30, max_total_size=50)
+        self.assertTrue(caps.admit('binary', 1000))
+        caps.release('binary', 1000)
+        self.assertEqual((caps.total, caps.truncated), (0, []))
+        self.assertTrue(caps.admit('a', 50))
+
+    def test_no_caps(self):
+        caps = SizeCaps()
+        self.assertFalse(caps.truncates(10 ** 12))
+        self.assertTrue(caps.admit('a', 10 ** 12))
+
+    def test_filter(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, size in (('a', 40), ('b', 40), ('c', 10)):
+                path = os.path.join(tmp, name)
+                with open(path, 'wb') as f:
+                    f.write(b'x' * size)
+                paths.append(path)
+            missing = os.path.join(tmp, 'missing')
+            caps = SizeCaps(max_total_size=50)
+            self.assertEqual(list(caps.filter(paths + [missing])), [paths[0], paths[2], missing])
+            self.assertEqual(caps.report(), "Size caps: 0 files truncated, 1 files skipped (40 bytes)")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import time
+import unittest
+from codedump.manifest import manifest_entry
+
+class ManifestEntryTest(unittest.TestCase):
+    """Content hashes are reused only for modification times old enough to trust."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'a.py')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text, mtime_ns):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_unchanged_file_reuses_hash(self):
+        old = int((time.time() - 60) * 1e9)
+        self.write('aaaa', old)
+        previous = manifest_entry(self.path)
+        self.assertEqual(previous['mtime_ns'], old)
+        # A rewrite that keeps size and mtime is (by design) not noticed
+        self.write('bbbb', old)
+        self.assertEqual(manifest_entry(self.path, previous)['hash'], previous['hash'])
+
+    def test_rewrite_in_same_tick_is_noticed(self):
+        now = int(time.time() * 1e9)
+        self.write('aaaa', now)
+        previous = manifest_entry(self.path)
+        self.assertIsNone(previous['mtime_ns'])
+        self.write('bbbb', now)
+        self.assertNotEqual(manifest_entry(self.path, previous)['hash'], previous['hash'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import io
+import unittest
+from codedump.sections import LINE_CHECKPOINT, SectionStore
+
+def section_text(header, content):
+    return header + '\n' + content
+
+class SectionStoreTest(unittest.TestCase):
+    """Line ranges and replaced sections read back exactly as the joined dump."""
+
+    def setUp(self):
+        # A small spool size so the store rolls over to disk
+        self.store = SectionStore(spool_size=1024)
+        self.sections = []
+        for index, lines in enumerate((3, LINE_CHECKPOINT * 2 + 5, 1, 40)):
+            header = f"== f{index}.py =="
+            content = ''.join(f"f{index} line {line}\n" for line in range(lines))
+            self.store.append(f"/src/f{index}.py", header, content)
+            self.sections.append((header, content))
+
+    def tearDown(self):
+        self.store.close()
+
+    def dump(self):
+        return '\n'.join(section_text(header, content) for header, content in self.sections)
+
+    def assert_lines_match(self):
+        # Like the CLI output, the lines end with a final newline
+        lines = (self.dump() + '\n').splitlines(keepends=True)
+        self.assertEqual(self.store.total_lines, len(lines))
+        for start in (0, 1, 3, 4, LINE_CHECKPOINT, LINE_CHECKPOINT + 7, len(lines) - 3, len(lines) - 1):
+            for count in (1, 5, LINE_CHECKPOINT + 3):
+                self.assertEqual(self.store.read_lines(start, count), ''.join(lines[start:start + count]),
+                                 (start, count))
+
+    def test_getvalue_and_write_to(self):
+        self.assertEqual(self.store.getvalue(), self.dump())
+        out = io.StringIO()
+        self.store.write_to(out)
+        self.assertEqual(out.getvalue(), self.dump())
+
+    def test_read_lines(self):
+        self.assert_lines_match()
+        self.assertEqual(self.store.read_lines(self.store.total_lines, 5), '')
+        self.assertEqual(self.store.read_lines(0, 0), '')
+
+    def test_section_at_line(self):
+        self.assertEqual(self.store.section_at_line(0), 0)
+        second = self.store[1]['line_start']
+        self.assertEqual(self.store.section_at_line(second - 1), 0)
+        self.assertEqual(self.store.section_at_line(second), 1)
+
+    def test_replace_shifts_following_sections(self):
+        header, _ = self.sections[1]
+        content = 'short\n'
+        self.store.replace(1, section_text(header, content))
+        self.sections[1] = (header, content)
+        self.assertEqual(self.store.content(1), content)
+        self.assertEqual(self.store.getvalue(), self.dump())
+        self.assert_lines_match()
+
+    def test_replace_without_header_clears_it(self):
+        self.store.append('/src/g.py', '== g.py ==', 'x\n', hash='abc')
+        self.store.replace(4, 'edited\n')
+        self.assertEqual(self.store[4]['header'], '')
+        self.assertIsNone(self.store[4]['hash'])
+        self.assertEqual(self.store.content(4), 'edited\n')
+
+    def test_replace_with_new_header(self):
+        self.store.replace(2, section_text('== new ==', 'y\n'), header='== new ==', size=2)
+        self.assertEqual(self.store[2]['header'], '== new ==')
+        self.assertEqual(self.store[2]['size'], 2)
+        self.assertEqual(self.store.content(2), 'y\n')
+
+    def test_append_bytes(self):
+        data = ''.join(f"big {line}\n" for line in range(300)).encode('utf-8')
+        index = self.store.append_bytes('/src/big.txt', '== big ==', data, size=len(data))
+        self.sections.append(('== big ==', data.decode('utf-8')))
+        self.assertEqual(self.store.content(index), data.decode('utf-8'))
+        self.assertEqual(self.store[index]['size'], len(data))
+        self.assert_lines_match()
+
+if __name__ == '__main__':
+    unittest.main()
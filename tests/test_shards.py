@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from codedump.shards import ShardWriter, byte_length, min_limit, shard_path, split_text
+
+class SplitTextTest(unittest.TestCase):
+    """Parts stay within the limit and join back to the original text."""
+
+    def check(self, text, limit):
+        parts = split_text(text, limit)
+        self.assertEqual(''.join(parts), text)
+        for part in parts:
+            self.assertLessEqual(byte_length(part), limit)
+        return parts
+
+    def test_splits_at_line_boundaries(self):
+        parts = self.check('aaa\nbbb\nccc\n', 8)
+        self.assertEqual(parts, ['aaa\nbbb\n', 'ccc\n'])
+
+    def test_cuts_long_lines(self):
+        self.check('x' * 50 + '\nshort\n', 7)
+
+    def test_multibyte_characters(self):
+        parts = self.check('é' * 20 + '\n' + '€' * 5, 5)
+        self.assertTrue(all(parts))
+
+    def test_empty_text(self):
+        self.assertEqual(split_text('', 10), [''])
+
+class ShardWriterTest(unittest.TestCase):
+    """Chunks stay within the byte limit and hold every section in order."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, 'dump.txt')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_chunks_within_limit(self):
+        limit = 1000
+        sections = [(f"src/f{index}.py", f"== f{index} ==\n" + 'line\n' * (index * 7)) for index in range(12)]
+        with ShardWriter(self.output, limit, directory='src') as writer:
+            for file_path, section in sections:
+                writer.add(file_path, section)
+        paths = writer.paths
+        self.assertGreater(len(paths), 1)
+        self.assertEqual(paths[0], shard_path(self.output, 1))
+        text = ''
+        for path in paths:
+            chunk = self.read(path)
+            self.assertLessEqual(byte_length(chunk), limit)
+            text += chunk
+        # Every section appears whole, in order
+        positions = [text.index(section) for _, section in sections]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_oversized_section_is_split(self):
+        section = ''.join(f"line {index}\n" for index in range(200))
+        writer = ShardWriter(self.output, 500, directory='src')
+        writer.add('src/big.py', section)
+        writer.add(None, 'removed: a.py')
+        paths = writer.close()
+        chunks = [self.read(path) for path in paths]
+        self.assertTrue(all(byte_length(chunk) <= 500 for chunk in chunks))
+        self.assertIn("src/big.py (part 1 of ", chunks[0])
+        self.assertIn('<removed files>', chunks[-1])
+
+    def test_limit_too_small(self):
+        writer = ShardWriter(self.output, min_limit('src') + 20, directory='src')
+        writer.add('src/a.py', 'a\n')
+        writer.flush()
+        self.assertEqual(len(writer.paths), 1)
+        with self.assertRaises(ValueError):
+            writer.add('src/' + 'long/' * 20 + 'b.py', 'b\n' * 200)
+        writer.discard()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_min_limit_fits_a_top_level_file(self):
+        limit = min_limit('src')
+        with ShardWriter(self.output, limit, directory='src') as writer:
+            writer.add(os.path.join('src', 'a'), 'abc\n' * 10)
+        for path in writer.paths:
+            self.assertLessEqual(byte_length(self.read(path)), limit)
+        with self.assertRaises(ValueError):
+            ShardWriter(self.output, limit - 1, directory='src').add(os.path.join('src', 'a'), 'abc\n' * 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import codecs
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from codedump.sniff import SNIFF_SIZE, decode, read_excerpt_stream, read_text, sniff
+
+class SniffTest(unittest.TestCase):
+    """Encodings are guessed from the first bytes; binaries are recognized."""
+
+    def test_text(self):
+        self.assertEqual(sniff(b'print("hi")\n'), 'utf-8')
+        self.assertEqual(sniff('café'.encode('utf-8')), 'utf-8')
+        self.assertEqual(sniff(b''), 'utf-8')
+
+    def test_multibyte_character_cut_at_end_of_sample(self):
+        self.assertEqual(sniff('é'.encode('utf-8')[:1]), 'utf-8')
+
+    def test_latin1_fallback(self):
+        self.assertEqual(sniff(b'caf\xe9 au lait'), 'latin-1')
+
+    def test_boms(self):
+        self.assertEqual(sniff(codecs.BOM_UTF8 + b'x'), 'utf-8-sig')
+        self.assertEqual(sniff('x'.encode('utf-16')), 'utf-16')
+        self.assertEqual(sniff('x'.encode('utf-32')), 'utf-32')
+
+    def test_utf16_without_bom(self):
+        self.assertEqual(sniff('hello'.encode('utf-16-le')), 'utf-16-le')
+        self.assertEqual(sniff('hello'.encode('utf-16-be')), 'utf-16-be')
+
+    def test_binary(self):
+        self.assertIsNone(sniff(b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR'))
+        self.assertIsNone(sniff(bytes(range(1, 32)) * 4))
+
+class DecodeTest(unittest.TestCase):
+    """Decoding matches text mode, falling back to latin-1 for invalid UTF-8."""
+
+    def test_universal_newlines(self):
+        self.assertEqual(decode(b'a\r\nb\rc\n', 'utf-8'), ('a\nb\nc\n', 'utf-8'))
+
+    def test_invalid_utf8_past_the_sample_falls_back(self):
+        self.assertEqual(decode(b'ok \xff', 'utf-8'), ('ok \xff', 'latin-1'))
+
+    def test_bom_is_stripped(self):
+        self.assertEqual(decode(codecs.BOM_UTF8 + b'x', 'utf-8-sig'), ('x', 'utf-8-sig'))
+
+class ReadTextTest(unittest.TestCase):
+    """Files are read once; the digest covers the raw bytes of text files."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'f')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_text_is_hashed_raw(self):
+        data = b'x = 1\r\n' * 3000
+        self.write(data)
+        digest = hashlib.blake2b(digest_size=16)
+        content, encoding = read_text(self.path, digest)
+        self.assertEqual((content, encoding), ('x = 1\n' * 3000, 'utf-8'))
+        self.assertEqual(digest.digest(), hashlib.blake2b(data, digest_size=16).digest())
+
+    def test_binary_is_not_read_further(self):
+        self.write(b'\x00\x01\x02\x03' * SNIFF_SIZE)
+        self.assertEqual(read_text(self.path), (None, None))
+
+class ReadExcerptTest(unittest.TestCase):
+    """Excerpts keep whole lines of the head and tail, reading forward only."""
+
+    def excerpt(self, data, limit):
+        return read_excerpt_stream(io.BytesIO(data), len(data), limit)
+
+    def test_head_and_tail(self):
+        data = ''.join(f"line {index}\n" for index in range(1000)).encode('utf-8')
+        content, encoding = self.excerpt(data, 100)
+        self.assertEqual(encoding, 'utf-8')
+        head, _, tail = content.partition('... [')
+        self.assertTrue(head.startswith('line 0\n'))
+        self.assertTrue(tail.endswith('line 999\n'))
+        self.assertTrue(all(line.startswith('line ') for line in (head + tail.split('\n', 1)[1]).splitlines()))
+        omitted = int(tail.split(' bytes omitted', 1)[0])
+        self.assertLessEqual(len(data) - omitted, 100)
+
+    def test_utf16(self):
+        data = ''.join(f"line {index}\n" for index in range(500)).encode('utf-16')
+        content, encoding = self.excerpt(data, 200)
+        self.assertEqual(encoding, 'utf-16')
+        self.assertTrue(content.startswith('line 0\n'))
+        self.assertTrue(content.endswith('line 499\n'))
+
+    def test_binary(self):
+        self.assertEqual(self.excerpt(bytes(range(256)) * 64, 100), (None, None))
+
+if __name__ == '__main__':
+    unittest.main()
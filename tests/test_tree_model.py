@@ -0,0 +1,102 @@
+import os
+import unittest
+from codedump.tree_model import SelectionModel
+
+ROOT = os.path.join(os.sep, 'r')
+
+def join(*parts):
+    return os.path.join(ROOT, *parts)
+
+# Folder -> (path, is_dir) children of a fake tree
+TREE = {
+    ROOT: [(join('A'), True), (join('top.py'), False)],
+    join('A'): [(join('A', 'B'), True), (join('A', 'x'), False), (join('A', 'y'), False)],
+    join('A', 'B'): [(join('A', 'B', 'z'), False)],
+}
+
+def expand(path):
+    """Return the (path, is_dir) descendants of ``path`` in pre-order, as the GUI's scan does."""
+    entries = []
+    for child, is_dir in TREE.get(path, []):
+        entries.append((child, is_dir))
+        if is_dir:
+            entries.extend(expand(child))
+    return entries
+
+def load(model, path):
+    for child, is_dir in TREE[path]:
+        model.add(path, child, is_dir)
+
+class SelectionModelTest(unittest.TestCase):
+    """Check states survive refreshes and unloads of the folders holding them."""
+
+    def checked_files(self, model):
+        return [path for path, is_dir in model.iter_checked(expand) if not is_dir]
+
+    def refresh(self, model):
+        """Return a new model seeded from ``model`` with only the root's children loaded, as Refresh does."""
+        refreshed = SelectionModel(ROOT, model.overrides())
+        load(refreshed, ROOT)
+        return refreshed
+
+    def test_checked_file_survives_refresh(self):
+        model = SelectionModel(ROOT)
+        load(model, ROOT)
+        load(model, join('A'))
+        model.set_checked(join('A', 'x'), True)
+        self.assertEqual(self.checked_files(model), [join('A', 'x')])
+        self.assertEqual(self.checked_files(self.refresh(model)), [join('A', 'x')])
+
+    def test_unchecked_file_stays_out_after_refresh(self):
+        model = SelectionModel(ROOT)
+        load(model, ROOT)
+        load(model, join('A'))
+        model.set_checked(ROOT, True)
+        model.set_checked(join('A', 'x'), False)
+        expected = [join('A', 'B', 'z'), join('A', 'y'), join('top.py')]
+        self.assertEqual(self.checked_files(model), expected)
+        self.assertEqual(self.checked_files(self.refresh(model)), expected)
+
+    def test_refresh_twice(self):
+        model = SelectionModel(ROOT)
+        load(model, ROOT)
+        load(model, join('A'))
+        model.set_checked(join('A', 'x'), True)
+        self.assertEqual(self.checked_files(self.refresh(self.refresh(model))), [join('A', 'x')])
+
+    def test_states_reapplied_when_loaded_again(self):
+        model = self.refresh(SelectionModel(ROOT, {join('A', 'x'): True}))
+        load(model, join('A'))
+        self.assertTrue(model.is_checked(join('A', 'x')))
+        self.assertFalse(model.is_checked(join('A', 'y')))
+        self.assertEqual(self.checked_files(model), [join('A', 'x')])
+
+    def test_checked_file_below_unchecked_loaded_folder(self):
+        model = SelectionModel(ROOT)
+        load(model, ROOT)
+        load(model, join('A'))
+        load(model, join('A', 'B'))
+        model.set_checked(join('A', 'B', 'z'), True)
+        refreshed = self.refresh(model)
+        load(refreshed, join('A'))
+        self.assertEqual(refreshed.checked_count(), 0)
+        self.assertEqual(self.checked_files(refreshed), [join('A', 'B', 'z')])
+
+    def test_unload_keeps_states(self):
+        model = SelectionModel(ROOT)
+        load(model, ROOT)
+        load(model, join('A'))
+        model.set_checked(join('A'), True)
+        model.set_checked(join('A', 'y'), False)
+        model.unload(join('A'))
+        self.assertEqual(self.checked_files(model), [join('A', 'B', 'z'), join('A', 'x')])
+
+    def test_checking_folder_supersedes_saved_states(self):
+        model = self.refresh(SelectionModel(ROOT, {join('A', 'x'): True}))
+        model.set_checked(join('A'), True)
+        model.set_checked(join('A'), False)
+        self.assertEqual(self.checked_files(model), [])
+        self.assertEqual(model.overrides(), {ROOT: False})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from codedump.codedump import LiveDump
+
+class LiveDumpIgnoreTest(unittest.TestCase):
+    """Watch mode honours --no-ignore on the initial load and on later rescans."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, 'src', 'sub'))
+        self.write('src/.gitignore', 'sub/\n')
+        self.write('src/a.py', 'a\n')
+        self.write('src/sub/c.md', 'c\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.root, *rel_path.split('/')), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def paths(self, dump):
+        return {os.path.relpath(path, self.root).replace(os.sep, '/') for path in dump._files}
+
+    def test_ignore_files_honoured_by_default(self):
+        with LiveDump(self.root) as dump:
+            dump.load()
+            self.assertEqual(self.paths(dump), {'src/.gitignore', 'src/a.py'})
+
+    def test_no_ignore_load(self):
+        with LiveDump(self.root, use_ignore_files=False) as dump:
+            dump.load()
+            self.assertEqual(self.paths(dump), {'src/.gitignore', 'src/a.py', 'src/sub/c.md'})
+
+    def test_no_ignore_rescan(self):
+        with LiveDump(self.root, use_ignore_files=False) as dump:
+            dump.load()
+            self.write('src/sub/d.md', 'd\n')
+            dump.update({os.path.join(self.root, 'src')})
+            self.assertEqual(self.paths(dump), {'src/.gitignore', 'src/a.py', 'src/sub/c.md', 'src/sub/d.md'})
+
+if __name__ == '__main__':
+    unittest.main()